@@ -0,0 +1,253 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+
+# Add project root to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+
+MANIFEST_FILE = "manifest.json"
+
+# Tables may be built concurrently (background loading): manifest updates
+# are read-merge-write under this lock so no entry is lost
+_MANIFEST_LOCK = threading.Lock()
+# Batches larger than this are sorted before being searched
+SORTED_PROBE_MIN = 1024
+
+
+class SortedIdTable:
+    """
+    Per-document values as two aligned NumPy arrays: ascending int64 ids and
+    their values. Replaces {id: value} dicts for PageRank and pageviews, with
+    `lookup` resolving a whole batch of ids in one searchsorted.
+
+    Attributes:
+        ids (np.ndarray): Ascending int64 ids.
+        values (np.ndarray): Value of every id.
+    """
+
+    def __init__(self, ids, values):
+        """
+        Args:
+            ids (np.ndarray): Ascending int64 ids.
+            values (np.ndarray): Values aligned with ids.
+        """
+        self.ids = ids
+        self.values = values
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_dict(cls, values, dtype):
+        """
+        Builds the table from an {id: value} dict.
+
+        Args:
+            values (dict): Value per id.
+            dtype (str): NumPy dtype of the values, e.g. '<f8'.
+
+        Returns:
+            SortedIdTable: The table.
+        """
+        ids = np.fromiter(values.keys(), dtype=np.int64, count=len(values))
+        vals = np.fromiter(values.values(), dtype=dtype, count=len(values))
+        order = np.argsort(ids, kind="stable")
+        return cls(ids[order], vals[order])
+
+    def lookup(self, ids, default=0):
+        """
+        Values of an array of ids.
+
+        Args:
+            ids (np.ndarray): int64 ids.
+            default: Value of unknown ids.
+
+        Returns:
+            np.ndarray: Values aligned with ids.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(len(ids), default, dtype=self.values.dtype)
+        if len(ids) > SORTED_PROBE_MIN:
+            # Sorted probes walk the table in order instead of missing the
+            # cache on every search of a large table
+            order = np.argsort(ids, kind="stable")
+            pos = np.empty(len(ids), dtype=np.int64)
+            pos[order] = np.searchsorted(self.ids, ids[order])
+        else:
+            pos = np.searchsorted(self.ids, ids)
+        pos = np.minimum(pos, len(self.ids) - 1)
+        return np.where(self.ids[pos] == ids, self.values[pos], default)
+
+    def get(self, doc_id, default=0):
+        """
+        Value of one id, like dict.get.
+        """
+        try:
+            doc_id = int(doc_id)
+        except (TypeError, ValueError):
+            return default
+        if not np.iinfo(np.int64).min <= doc_id <= np.iinfo(np.int64).max:
+            return default
+        return self.lookup([doc_id], default)[0].item()
+
+
+def _sha256_file(path, chunk_size=1024 ** 2):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Local cache of SortedIdTables derived from slow-to-parse sources (a
+    pickled dict, a CSV.gz in GCS). Each table is saved as `name`_ids.npy and
+    `name`_values.npy and memory-mapped when loaded. manifest.json records,
+    per table, the content hash of the source it was built from; a table is
+    reused only while that hash still matches.
+
+    Attributes:
+        directory (str): Cache directory.
+        manifest (dict): Entry per table name.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Args:
+            directory (str): Cache directory, defaults to Config.ARTIFACT_CACHE_DIR.
+        """
+        self.directory = Config.ARTIFACT_CACHE_DIR if directory is None else directory
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable artifact manifest {path}: {e}")
+        return {}
+
+    def source_hash(self, name, source):
+        """
+        Content hash of a source: the sha256 of a local file (skipped while
+        its size and mtime match the manifest) or the MD5 GCS keeps for a blob.
+
+        Args:
+            name (str): Table name.
+            source (str or google.cloud.storage.Blob): Local path or blob.
+
+        Returns:
+            str: The hash, or None if the source cannot be reached.
+        """
+        try:
+            if isinstance(source, str):
+                st = os.stat(source)
+                entry = self.manifest.get(name, {})
+                if (entry.get("source") == source
+                        and entry.get("source_stat") == [st.st_size, st.st_mtime_ns]):
+                    return entry["source_hash"]
+                return "sha256:" + _sha256_file(source)
+            source.reload()
+            if source.md5_hash:
+                return "md5:" + source.md5_hash
+            return "crc32c:" + source.crc32c
+        except Exception as e:
+            print(f"Could not hash the source of {name}: {e}")
+            return None
+
+    def load(self, name, source_hash):
+        """
+        Opens a cached table.
+
+        Args:
+            name (str): Table name.
+            source_hash (str): Hash of the current source. None when the
+                               source is unavailable: any cached table is used.
+
+        Returns:
+            SortedIdTable: The memory-mapped table, or None if it is missing or stale.
+        """
+        entry = self.manifest.get(name)
+        if entry is None:
+            return None
+        if source_hash is not None and entry["source_hash"] != source_hash:
+            print(f"Cached {name} is stale (source changed), rebuilding.")
+            return None
+        try:
+            table = SortedIdTable(
+                np.load(os.path.join(self.directory, entry["ids"]), mmap_mode="r"),
+                np.load(os.path.join(self.directory, entry["values"]), mmap_mode="r"),
+            )
+        except (OSError, ValueError) as e:
+            print(f"Could not open cached {name}: {e}")
+            return None
+        if len(table.ids) != entry["entries"] or len(table.values) != entry["entries"]:
+            print(f"Cached {name} is incomplete, rebuilding.")
+            return None
+        if (source_hash is not None and isinstance(entry.get("source"), str)
+                and os.path.exists(entry["source"])):
+            st = os.stat(entry["source"])
+            if entry.get("source_stat") != [st.st_size, st.st_mtime_ns]:
+                # Same content under a new mtime: skip hashing on the next start
+                entry["source_stat"] = [st.st_size, st.st_mtime_ns]
+                self._write_manifest(name)
+        return table
+
+    def save(self, name, source, source_hash, table):
+        """
+        Writes a table and its manifest entry, then reopens it memory-mapped.
+
+        Args:
+            name (str): Table name.
+            source (str or google.cloud.storage.Blob): The source it was built from.
+            source_hash (str): Hash of that source.
+            table (SortedIdTable): The table.
+
+        Returns:
+            SortedIdTable: The cached table.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {
+            "ids": f"{name}_ids.npy",
+            "values": f"{name}_values.npy",
+            "entries": len(table),
+            "dtype": table.values.dtype.str,
+            "source_hash": source_hash,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        if isinstance(source, str):
+            st = os.stat(source)
+            entry["source"] = source
+            entry["source_stat"] = [st.st_size, st.st_mtime_ns]
+        else:
+            entry["source"] = f"gs://{source.bucket.name}/{source.name}"
+        for key in ("ids", "values"):
+            path = os.path.join(self.directory, entry[key])
+            # np.save appends .npy to names without it
+            tmp_path = path + ".tmp.npy"
+            np.save(tmp_path, getattr(table, key))
+            os.replace(tmp_path, path)
+        self.manifest[name] = entry
+        self._write_manifest(name)
+        return self.load(name, source_hash)
+
+    def _write_manifest(self, name):
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        tmp_path = path + ".tmp"
+        with _MANIFEST_LOCK:
+            # Keep entries other caches wrote since this one was read
+            manifest = self._read_manifest()
+            manifest[name] = self.manifest[name]
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, path)
+            self.manifest = manifest
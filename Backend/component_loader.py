@@ -0,0 +1,111 @@
+import time
+import threading
+import traceback
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ComponentLoader:
+    """
+    Loads the named components of the engine, each on its own background
+    thread (or inline), and records the state and timing of every one for
+    the health endpoints. A component may wait for others to finish first.
+
+    States go pending -> loading -> ready, or failed with the error.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {}
+        self._done = {}
+        self._created = time.monotonic()
+
+    def _add(self, name):
+        with self._lock:
+            if name in self._status:
+                raise ValueError(f"Component {name} is already registered")
+            self._status[name] = {"state": PENDING}
+            self._done[name] = threading.Event()
+
+    def _set(self, name, **fields):
+        with self._lock:
+            self._status[name].update(fields)
+
+    def _run(self, name, load, after):
+        for dep in after:
+            self._done[dep].wait()
+        start = time.monotonic()
+        self._set(name, state=LOADING, started=round(start - self._created, 3))
+        try:
+            load()
+        except Exception as e:
+            traceback.print_exc()
+            print(f"Loading {name} failed: {e}")
+            self._set(name, state=FAILED, error=repr(e),
+                      seconds=round(time.monotonic() - start, 3))
+        else:
+            self._set(name, state=READY, seconds=round(time.monotonic() - start, 3))
+        finally:
+            self._done[name].set()
+
+    def load(self, name, load, after=(), background=False):
+        """
+        Loads one component.
+
+        Args:
+            name (str): Component name.
+            load (callable): Loads it and publishes it on the engine; an
+                             exception marks the component failed.
+            after (tuple): Components that must finish (or fail) first.
+            background (bool): Load on a daemon thread instead of inline.
+        """
+        self._add(name)
+        if not background:
+            self._run(name, load, after)
+            return
+        threading.Thread(
+            target=self._run, args=(name, load, after), name=f"load-{name}", daemon=True
+        ).start()
+
+    def mark_ready(self, name, seconds=0.0):
+        """
+        Records a component that was loaded elsewhere, e.g. from a snapshot.
+        """
+        self._add(name)
+        self._set(name, state=READY, started=0.0, seconds=round(seconds, 3))
+        self._done[name].set()
+
+    def is_ready(self, name):
+        with self._lock:
+            return self._status.get(name, {}).get("state") == READY
+
+    def wait(self, timeout=None):
+        """
+        Waits until every component has finished loading or failed.
+
+        Args:
+            timeout (float): Seconds to wait at most.
+
+        Returns:
+            bool: True if all of them finished.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for event in list(self._done.values()):
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not event.wait(remaining):
+                return False
+        return True
+
+    def status(self):
+        """
+        State of every component.
+
+        Returns:
+            dict: Per component its state, and when it started loading and
+                  how long it took (seconds), plus the error if it failed.
+        """
+        with self._lock:
+            return {name: dict(status) for name, status in self._status.items()}
@@ -2,47 +2,40 @@ import sys
 import os
 import pickle
 import pandas as pd
-from google.cloud import storage
 import io
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import inverted_index_gcp
 from inverted_index_gcp import InvertedIndex
+from Backend.title_store import TitleStore, TITLE_STORE_FILES
+from Backend.artifact_cache import ArtifactCache, SortedIdTable
 from config import Config
 
 # Global cache
 _ID_TO_TITLE = None
 _PAGERANK = None
-
-
-def get_storage_client():
-    """
-    Creates and returns a Google Cloud Storage client.
-
-    Returns:
-        google.cloud.storage.Client: The GCS client.
-    """
-    return storage.Client(project=Config.PROJECT_ID)
+_ID_TABLES = {}
 
 
 def get_bucket():
     """
-    Retrieves the GCS bucket object configured in Config.
+    Retrieves the GCS bucket object configured in Config, through the
+    process-wide pooled storage client of inverted_index_gcp.
 
     Returns:
         google.cloud.storage.Bucket: The GCS bucket.
     """
-    client = get_storage_client()
-    return client.bucket(Config.BUCKET_NAME)
+    return inverted_index_gcp.get_bucket(Config.BUCKET_NAME)
 
 
 def load_index(index_type):
     """
-    Load an inverted index based on type ('text', 'title', 'anchor').
+    Load an inverted index based on type ('text', 'title', 'anchor', 'champion').
     Source controlled by INDEX_SOURCE env var ('local', 'gcs', 'auto').
 
     Args:
-        index_type (str): The type of index to load ('text', 'title', 'anchor').
+        index_type (str): The type of index to load ('text', 'title', 'anchor', 'champion').
 
     Returns:
         InvertedIndex: The loaded inverted index object.
@@ -58,6 +51,7 @@ def load_index(index_type):
         "text": "data/postings_gcp",
         "title": "data/postings_title",
         "anchor": "data/postings_anchor",
+        "champion": "data/postings_champion",
     }
 
     if index_type not in dir_map:
@@ -69,6 +63,8 @@ def load_index(index_type):
     bucket_base_dir = None
     if index_type == "text":
         bucket_base_dir = "postings_gcp"
+    elif index_type == "champion":
+        bucket_base_dir = "postings_champion"
 
     name = "index"
     print(f"Loading {index_type} index (Source Mode: {index_source})...")
@@ -113,6 +109,27 @@ def load_index(index_type):
     return InvertedIndex()
 
 
+def load_champion_tier():
+    """
+    Loads the champion tier of the body index (scripts/build_champion_index.py).
+    Unless RETRIEVAL_STRATEGY is 'tiered', only a local copy is looked for.
+
+    Returns:
+        InvertedIndex: The champion index, or None if it is not available.
+    """
+    local_file = os.path.join("data", "postings_champion", "index.pkl")
+    if Config.RETRIEVAL_STRATEGY != "tiered" and not os.path.exists(local_file):
+        return None
+    try:
+        champion = load_index("champion")
+    except Exception as e:
+        print(f"Could not load champion tier: {e}")
+        return None
+    if not champion.posting_locs:
+        return None
+    return champion
+
+
 def load_pagerank():
     """
     Loads PageRank data from local file or GCS.
@@ -192,6 +209,105 @@ def load_pageviews():
     return {}
 
 
+def read_id_to_title_parquet():
+    """
+    Reads the id_to_title parquet files from GCS
+    (Config.ID_TO_TITLE_PARQUET_DIR_GCS).
+
+    Returns:
+        tuple: (ids, titles) columns, or None if there are no parquet files.
+    """
+    bucket = get_bucket()
+    blobs = list(bucket.list_blobs(prefix=Config.ID_TO_TITLE_PARQUET_DIR_GCS))
+
+    dfs = []
+    for blob in blobs:
+        if blob.name.endswith(".parquet"):
+            data = blob.download_as_bytes()
+            dfs.append(pd.read_parquet(io.BytesIO(data)))
+
+    if not dfs:
+        return None
+    full_df = pd.concat(dfs)
+    # Assuming standard format: 'id', 'title'
+    if "id" in full_df.columns and "title" in full_df.columns:
+        return full_df["id"], full_df["title"]
+    return full_df.iloc[:, 0], full_df.iloc[:, 1]
+
+
+def _load_id_table(name, source, load_values, dtype):
+    """
+    Loads a SortedIdTable through the artifact cache: reused while the content
+    hash of `source` matches the manifest, otherwise rebuilt from
+    `load_values()` and cached. An empty Config.ARTIFACT_CACHE_DIR disables
+    the cache.
+
+    Args:
+        name (str): Table name ('pagerank' or 'pageviews').
+        source (str or google.cloud.storage.Blob): Local path or blob the
+                                                   values come from, or None.
+        load_values (callable): Returns the {doc_id: value} dict.
+        dtype (str): NumPy dtype of the values.
+
+    Returns:
+        SortedIdTable: The table (empty if no data was found).
+    """
+    if name in _ID_TABLES:
+        return _ID_TABLES[name]
+    if not Config.ARTIFACT_CACHE_DIR:
+        table = SortedIdTable.from_dict(load_values(), dtype)
+        _ID_TABLES[name] = table
+        return table
+
+    cache = ArtifactCache()
+    source_hash = None if source is None else cache.source_hash(name, source)
+    table = cache.load(name, source_hash)
+    if table is not None:
+        print(f"Loaded {name} from artifact cache ({len(table)} entries).")
+    else:
+        table = SortedIdTable.from_dict(load_values(), dtype)
+        if source_hash is not None and len(table):
+            table = cache.save(name, source, source_hash, table)
+            print(f"Cached {name} in {cache.directory} ({len(table)} entries).")
+    _ID_TABLES[name] = table
+    return table
+
+
+def load_pagerank_table():
+    """
+    PageRank as a SortedIdTable, from the artifact cache when the local pickle
+    or GCS CSV.gz it was built from is unchanged (see load_pagerank).
+
+    Returns:
+        SortedIdTable: PageRank per doc_id.
+    """
+    index_source = os.environ.get("INDEX_SOURCE", "auto")
+    path = os.path.join("data", "pagerank.pkl")
+    source = None
+    if index_source in ["local", "auto"] and os.path.exists(path):
+        source = path
+    elif index_source in ["gcs", "auto"]:
+        try:
+            source = get_bucket().blob(Config.PAGERANK_CSV_GZ_GCS)
+        except Exception as e:
+            print(f"Error connecting to GCS for PageRank: {e}")
+    return _load_id_table("pagerank", source, load_pagerank, "<f8")
+
+
+def load_pageviews_table():
+    """
+    Page views as a SortedIdTable, from the artifact cache when the local
+    pickle it was built from is unchanged (see load_pageviews).
+
+    Returns:
+        SortedIdTable: Page views per doc_id.
+    """
+    index_source = os.environ.get("INDEX_SOURCE", "auto")
+    path = os.path.join("data", "pageviews.pkl")
+    source = path if index_source in ["local", "auto"] and os.path.exists(path) else None
+    return _load_id_table("pageviews", source, load_pageviews, "<i8")
+
+
 def load_id_to_title():
     """
     Loads the mapping from document ID to title.
@@ -230,22 +346,9 @@ def load_id_to_title():
             print(
                 f"Loading id_to_title from GCS Parquet: gs://{Config.BUCKET_NAME}/{Config.ID_TO_TITLE_PARQUET_DIR_GCS}"
             )
-            bucket = get_bucket()
-            blobs = list(bucket.list_blobs(prefix=Config.ID_TO_TITLE_PARQUET_DIR_GCS))
-
-            dfs = []
-            for blob in blobs:
-                if blob.name.endswith(".parquet"):
-                    data = blob.download_as_bytes()
-                    dfs.append(pd.read_parquet(io.BytesIO(data)))
-
-            if dfs:
-                full_df = pd.concat(dfs)
-                # Assuming standard format: 'id', 'title'
-                if "id" in full_df.columns and "title" in full_df.columns:
-                    _ID_TO_TITLE = dict(zip(full_df["id"], full_df["title"]))
-                else:
-                    _ID_TO_TITLE = dict(zip(full_df.iloc[:, 0], full_df.iloc[:, 1]))
+            columns = read_id_to_title_parquet()
+            if columns is not None:
+                _ID_TO_TITLE = dict(zip(*columns))
                 print(f"Loaded id_to_title from GCS ({len(_ID_TO_TITLE)} entries).")
                 return _ID_TO_TITLE
             else:
@@ -257,3 +360,44 @@ def load_id_to_title():
 
     print("Warning: id_to_title not found. Returning empty dict.")
     return {}
+
+
+def load_titles():
+    """
+    Loads the title lookup used for results: the memory-mapped TitleStore
+    (Config.TITLE_STORE_DIR, downloaded from Config.TITLE_STORE_DIR_GCS when
+    missing locally), or the id_to_title dict when no store was built.
+
+    Returns:
+        TitleStore or dict: Supports `get(wiki_id, default)`.
+    """
+    index_source = os.environ.get("INDEX_SOURCE", "auto")
+    directory = Config.TITLE_STORE_DIR
+
+    if not TitleStore.exists(directory) and index_source in ["gcs", "auto"]:
+        try:
+            bucket = get_bucket()
+            blobs = {
+                name: bucket.blob(f"{Config.TITLE_STORE_DIR_GCS}/{name}")
+                for name in TITLE_STORE_FILES.values()
+            }
+            if all(blob.exists() for blob in blobs.values()):
+                print(
+                    f"Downloading title store from gs://{Config.BUCKET_NAME}/{Config.TITLE_STORE_DIR_GCS}"
+                )
+                os.makedirs(directory, exist_ok=True)
+                for name, blob in blobs.items():
+                    # Rename once complete, so a partial download is never opened
+                    tmp_path = os.path.join(directory, name + ".tmp")
+                    blob.download_to_filename(tmp_path)
+                    os.replace(tmp_path, os.path.join(directory, name))
+        except Exception as e:
+            print(f"Error downloading title store from GCS: {e}")
+
+    if TitleStore.exists(directory):
+        titles = TitleStore.load(directory)
+        print(f"Opened title store {directory} ({len(titles)} entries).")
+        return titles
+
+    print("No title store found, loading id_to_title.")
+    return load_id_to_title()
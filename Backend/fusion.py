@@ -0,0 +1,168 @@
+import os
+import sys
+import numpy as np
+
+# Add project root to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from Backend.artifact_cache import SortedIdTable
+
+
+class PageRankPrior:
+    """
+    Normalized log PageRank prior in [0, 1], precomputed for every document.
+
+    log(PR + 1) is scaled linearly between its smallest and largest value over
+    the documents that have a PageRank; documents without one get 0.
+
+    Attributes:
+        values (np.ndarray): float64 prior per document.
+        doc_ids (np.ndarray): Ascending doc ids aligned with `values`, or None
+                              when `values` is indexed by dense doc id.
+        min_log_pr (float): Smallest log(PR + 1) in the data.
+        max_log_pr (float): Largest log(PR + 1) in the data.
+    """
+
+    def __init__(self, pagerank, doc_ids=None):
+        """
+        Args:
+            pagerank (np.ndarray): PageRank per document (0 when unknown).
+            doc_ids (np.ndarray): Ascending doc ids aligned with `pagerank`,
+                                  None when `pagerank` is indexed by dense id.
+        """
+        pagerank = np.asarray(pagerank, dtype=np.float64)
+        log_pr = np.log(pagerank + 1)
+        known = log_pr[pagerank > 0]
+        self.min_log_pr = float(known.min()) if len(known) else 0.0
+        self.max_log_pr = float(known.max()) if len(known) else 0.0
+        span = self.max_log_pr - self.min_log_pr
+        if span > 0:
+            values = (log_pr - self.min_log_pr) / span
+        else:
+            values = (pagerank > 0).astype(np.float64)
+        # Documents without PageRank have log(PR + 1) = 0, below the range
+        self.values = np.clip(values, 0.0, 1.0)
+        self.doc_ids = doc_ids
+
+    @classmethod
+    def from_dict(cls, pagerank):
+        """
+        Builds the prior from a {doc_id: PageRank} dict.
+
+        Args:
+            pagerank (dict): PageRank per doc id.
+
+        Returns:
+            PageRankPrior: The prior, looked up by binary search.
+        """
+        doc_ids = np.fromiter(pagerank.keys(), dtype=np.int64, count=len(pagerank))
+        values = np.fromiter(pagerank.values(), dtype=np.float64, count=len(pagerank))
+        order = np.argsort(doc_ids, kind="stable")
+        return cls(values[order], doc_ids[order])
+
+    @classmethod
+    def from_arrays(cls, values, doc_ids, min_log_pr, max_log_pr):
+        """
+        Wraps priors computed earlier (e.g. stored in an engine snapshot)
+        without recomputing them.
+
+        Args:
+            values (np.ndarray): float64 prior per document.
+            doc_ids (np.ndarray): Ascending doc ids aligned with `values`, or None.
+            min_log_pr (float): Smallest log(PR + 1) they were scaled with.
+            max_log_pr (float): Largest log(PR + 1) they were scaled with.
+
+        Returns:
+            PageRankPrior: The prior.
+        """
+        prior = cls.__new__(cls)
+        prior.values = values
+        prior.doc_ids = doc_ids
+        prior.min_log_pr = float(min_log_pr)
+        prior.max_log_pr = float(max_log_pr)
+        return prior
+
+    def lookup(self, doc_ids):
+        """
+        Prior of every doc id in the array (0 for documents without PageRank).
+
+        Args:
+            doc_ids (np.ndarray): Doc ids in the space the prior was built for.
+
+        Returns:
+            np.ndarray: float64 priors aligned with doc_ids.
+        """
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        if self.doc_ids is None:
+            return self.values[doc_ids]
+        if len(self.doc_ids) == 0:
+            return np.zeros(len(doc_ids))
+        pos = np.minimum(np.searchsorted(self.doc_ids, doc_ids), len(self.doc_ids) - 1)
+        return np.where(self.doc_ids[pos] == doc_ids, self.values[pos], 0.0)
+
+
+def load_pagerank_prior(doc_store=None, pagerank=None):
+    """
+    The prior for the body index: from the DocStore column of a dense index,
+    otherwise from the PageRank table (or dict).
+
+    Args:
+        doc_store (DocStore): Per-document arrays of a dense index, or None.
+        pagerank (SortedIdTable or dict): PageRank per wiki id, used without a DocStore.
+
+    Returns:
+        PageRankPrior: The prior.
+    """
+    if doc_store is not None:
+        return PageRankPrior(doc_store.pagerank)
+    if isinstance(pagerank, SortedIdTable):
+        return PageRankPrior(pagerank.values, pagerank.ids)
+    return PageRankPrior.from_dict(pagerank or {})
+
+
+def fuse_scores(doc_ids, bm25_scores, prior, text_weight=None, pagerank_weight=None):
+    """
+    Stage 2 score of every candidate in one vectorized step:
+    text_weight * BM25 / max BM25 + pagerank_weight * prior.
+
+    Args:
+        doc_ids (np.ndarray): Candidate doc ids.
+        bm25_scores (np.ndarray): Stage 1 scores aligned with doc_ids.
+        prior (PageRankPrior): Prior for the doc id space of the candidates.
+        text_weight (float): Defaults to Config.FUSION_TEXT_WEIGHT.
+        pagerank_weight (float): Defaults to Config.FUSION_PAGERANK_WEIGHT.
+
+    Returns:
+        np.ndarray: float64 fused scores aligned with doc_ids.
+    """
+    if text_weight is None:
+        text_weight = Config.FUSION_TEXT_WEIGHT
+    if pagerank_weight is None:
+        pagerank_weight = Config.FUSION_PAGERANK_WEIGHT
+    bm25_scores = np.asarray(bm25_scores, dtype=np.float64)
+    max_score = bm25_scores.max() if len(bm25_scores) else 1.0
+    if max_score <= 0:
+        max_score = 1.0
+    return text_weight * (bm25_scores / max_score) + pagerank_weight * prior.lookup(doc_ids)
+
+
+def fuse_top_n(candidates, prior, n=100, text_weight=None, pagerank_weight=None):
+    """
+    Fuses Stage 1 candidates with the PageRank prior and keeps the n best.
+    Equal fused scores keep the candidate order.
+
+    Args:
+        candidates (list): (doc_id, bm25_score) tuples, best first.
+        prior (PageRankPrior): Prior for the doc id space of the candidates.
+        n (int): Number of results.
+        text_weight (float): Defaults to Config.FUSION_TEXT_WEIGHT.
+        pagerank_weight (float): Defaults to Config.FUSION_PAGERANK_WEIGHT.
+
+    Returns:
+        tuple: (doc_ids, scores) arrays of the n best, best first.
+    """
+    doc_ids = np.fromiter((d for d, _ in candidates), dtype=np.int64, count=len(candidates))
+    bm25 = np.fromiter((s for _, s in candidates), dtype=np.float64, count=len(candidates))
+    scores = fuse_scores(doc_ids, bm25, prior, text_weight, pagerank_weight)
+    order = np.argsort(-scores, kind="stable")[:n]
+    return doc_ids[order], scores[order]
@@ -0,0 +1,314 @@
+import os
+import sys
+import asyncio
+import itertools
+import threading
+from contextlib import contextmanager
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inverted_index_gcp import get_bucket, read_blob_range
+from config import Config
+
+# One byte-range download: [start, end) of `f_name`, serving the posting list
+# fragments in `members` as (f_name, offset, length, term, part) tuples.
+RangeRequest = namedtuple("RangeRequest", ["f_name", "start", "end", "members"])
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+_TERM_EXECUTOR = None
+# Marks the threads of the term pool, see map_bounded()
+_TERM_WORKER = threading.local()
+
+_ASYNC_IO_EXECUTOR = None
+# Posting bytes read ahead for the current thread, see prefetched_postings()
+_PREFETCHED = threading.local()
+
+
+def get_fetch_executor():
+    """
+    Returns the bounded thread pool shared by all GCS posting fetches.
+
+    Returns:
+        ThreadPoolExecutor: Pool with Config.GCS_FETCH_WORKERS threads.
+    """
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=Config.GCS_FETCH_WORKERS,
+                thread_name_prefix="posting-fetch",
+            )
+        return _EXECUTOR
+
+
+def get_term_executor():
+    """
+    Returns the bounded thread pool shared by all queries for per-term posting
+    reads, decoding and scoring.
+
+    Returns:
+        ThreadPoolExecutor: Pool with Config.TERM_WORKERS threads, or None
+                            when TERM_WORKERS is below 2 (terms are processed
+                            on the query thread).
+    """
+    global _TERM_EXECUTOR
+    if Config.TERM_WORKERS < 2:
+        return None
+    with _EXECUTOR_LOCK:
+        if _TERM_EXECUTOR is None:
+            _TERM_EXECUTOR = ThreadPoolExecutor(
+                max_workers=Config.TERM_WORKERS,
+                thread_name_prefix="term-worker",
+            )
+        return _TERM_EXECUTOR
+
+
+def get_async_io_executor():
+    """
+    Returns the thread pool that runs the blocking posting reads awaited by
+    the asyncio server. Its threads only wait on I/O, so it is sized for the
+    number of reads in flight across all requests, not for the CPUs.
+
+    Returns:
+        ThreadPoolExecutor: Pool with Config.ASYNC_IO_WORKERS threads.
+    """
+    global _ASYNC_IO_EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _ASYNC_IO_EXECUTOR is None:
+            _ASYNC_IO_EXECUTOR = ThreadPoolExecutor(
+                max_workers=Config.ASYNC_IO_WORKERS,
+                thread_name_prefix="posting-io",
+            )
+        return _ASYNC_IO_EXECUTOR
+
+
+def _reset_after_fork():
+    # Pool threads do not survive fork(): a forked server worker creates its
+    # own pools on first use
+    global _EXECUTOR, _EXECUTOR_LOCK, _TERM_EXECUTOR, _ASYNC_IO_EXECUTOR
+    _EXECUTOR = None
+    _TERM_EXECUTOR = None
+    _ASYNC_IO_EXECUTOR = None
+    _EXECUTOR_LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _run_as_term_worker(fn, item):
+    _TERM_WORKER.active = True
+    return fn(item)
+
+
+def map_bounded(fn, items, limit=None):
+    """
+    Applies `fn` to every item on the term pool and yields the results in item
+    order. At most `limit` items of this call are submitted at any time, the
+    next one as soon as the oldest result is taken, so a query with many terms
+    cannot occupy every worker while other queries wait.
+
+    Runs on the calling thread when the pool is disabled, the limit is below
+    2, there is a single item, or the caller is itself a term worker (waiting
+    on the pool from inside it could deadlock). Exceptions raised by `fn`
+    propagate to the caller.
+
+    Args:
+        fn (callable): Function of one item.
+        items (iterable): The items.
+        limit (int): Items in flight per call. Defaults to
+                     Config.QUERY_TERM_CONCURRENCY.
+
+    Yields:
+        The result of `fn` for every item, in order.
+    """
+    items = list(items)
+    limit = Config.QUERY_TERM_CONCURRENCY if limit is None else limit
+    executor = get_term_executor()
+    if (executor is None or limit < 2 or len(items) < 2
+            or getattr(_TERM_WORKER, "active", False)):
+        for item in items:
+            yield fn(item)
+        return
+
+    pending = deque()
+    next_item = iter(items)
+    try:
+        for item in itertools.islice(next_item, limit):
+            pending.append(executor.submit(_run_as_term_worker, fn, item))
+        while pending:
+            result = pending.popleft().result()
+            for item in itertools.islice(next_item, 1):
+                pending.append(executor.submit(_run_as_term_worker, fn, item))
+            yield result
+    finally:
+        # The caller stopped early or a term failed: drop what has not started
+        for future in pending:
+            future.cancel()
+
+
+def plan_posting_reads(index, terms, max_gap=None, max_request_bytes=None):
+    """
+    Collects the byte ranges of every term's posting list and merges ranges of
+    the same file that are adjacent or at most `max_gap` bytes apart.
+
+    Args:
+        index (InvertedIndex): Index holding posting_locs for the terms.
+        terms (iterable): Query terms (including expansion terms).
+        max_gap (int): Largest hole between two ranges that is still downloaded
+                       to save a request. Defaults to Config.GCS_COALESCE_GAP.
+        max_request_bytes (int): Upper bound on one merged request.
+                                 Defaults to Config.GCS_MAX_REQUEST_BYTES.
+
+    Returns:
+        list: RangeRequest objects, sorted by file and offset.
+    """
+    if max_gap is None:
+        max_gap = Config.GCS_COALESCE_GAP
+    if max_request_bytes is None:
+        max_request_bytes = Config.GCS_MAX_REQUEST_BYTES
+
+    ranges = []
+    for term in set(terms):
+        for part, (f_name, offset, length) in enumerate(index.posting_ranges(term)):
+            if length > 0:
+                ranges.append((f_name, offset, length, term, part))
+    ranges.sort(key=lambda r: (r[0], r[1]))
+
+    merged = []  # [f_name, start, end, members]
+    for r in ranges:
+        f_name, offset, length = r[0], r[1], r[2]
+        if merged:
+            last = merged[-1]
+            end = max(last[2], offset + length)
+            if (
+                last[0] == f_name
+                and offset - last[2] <= max_gap
+                and end - last[1] <= max_request_bytes
+            ):
+                last[2] = end
+                last[3].append(r)
+                continue
+        merged.append([f_name, offset, offset + length, [r]])
+
+    return [RangeRequest(*m) for m in merged]
+
+
+def _split_ranges(requests, data):
+    """
+    Cuts the downloaded ranges back into posting lists.
+
+    Args:
+        requests (list): RangeRequest objects.
+        data (list): Bytes of every request, aligned with `requests`.
+
+    Returns:
+        dict: term -> raw posting list bytes.
+    """
+    parts = defaultdict(dict)
+    for req, req_data in zip(requests, data):
+        req_data = memoryview(req_data)
+        for _, offset, length, term, part in req.members:
+            start = offset - req.start
+            parts[term][part] = req_data[start:start + length]
+
+    result = {}
+    for term, term_parts in parts.items():
+        if len(term_parts) == 1:
+            result[term] = term_parts[0]
+        else:
+            result[term] = b"".join(term_parts[i] for i in sorted(term_parts))
+    return result
+
+
+def fetch_posting_bytes(index, terms, base_dir, bucket_name):
+    """
+    Downloads the posting lists of all `terms` with coalesced byte-range
+    requests issued concurrently on the shared fetch pool.
+
+    Args:
+        index (InvertedIndex): Index holding posting_locs for the terms.
+        terms (iterable): Terms to fetch. Terms missing from the index are skipped.
+        base_dir (str): Bucket prefix of the posting files (e.g. 'postings_gcp').
+        bucket_name (str): GCS bucket name.
+
+    Returns:
+        dict: term -> raw posting list bytes, ready for index.decode_posting_bytes.
+    """
+    bucket = get_bucket(bucket_name)
+    requests = plan_posting_reads(index, terms)
+
+    def _download(req):
+        # Force forward slashes for GCS
+        blob_name = f"{base_dir}/{req.f_name}"
+        return read_blob_range(bucket, blob_name, req.start, req.end - req.start)
+
+    executor = get_fetch_executor()
+    futures = [executor.submit(_download, req) for req in requests]
+    return _split_ranges(requests, [future.result() for future in futures])
+
+
+async def fetch_posting_bytes_async(index, terms, base_dir, bucket_name=None):
+    """
+    Awaitable read of the posting lists of all `terms`: the coalesced range
+    requests (GCS or local posting files) run on the async I/O pool, so the
+    event loop serves other requests while they wait.
+
+    Args:
+        index (InvertedIndex): Index holding posting_locs for the terms.
+        terms (iterable): Terms to read. Terms missing from the index are skipped.
+        base_dir (str): Posting directory (GCS prefix or local path).
+        bucket_name (str): GCS bucket name, None for local files.
+
+    Returns:
+        dict: term -> raw posting list bytes, ready for index.decode_posting_bytes.
+    """
+    requests = plan_posting_reads(index, terms)
+    if not requests:
+        return {}
+    reader = index.posting_reader(base_dir, bucket_name)
+    loop = asyncio.get_running_loop()
+    executor = get_async_io_executor()
+    data = await asyncio.gather(*(
+        loop.run_in_executor(executor, reader.read, [(req.f_name, req.start)], req.end - req.start)
+        for req in requests
+    ))
+    return _split_ranges(requests, data)
+
+
+@contextmanager
+def prefetched_postings(index, raw=None, arrays=None):
+    """
+    Makes posting reads of `index` on this thread use postings read earlier
+    instead of reading them again: raw bytes (e.g. from
+    fetch_posting_bytes_async) or lists already decoded (e.g. shared by the
+    queries of a batch).
+
+    Args:
+        index (InvertedIndex): The index the postings belong to.
+        raw (dict): term -> raw posting list bytes.
+        arrays (dict): term -> decoded (doc_ids, tfs) arrays.
+    """
+    previous = getattr(_PREFETCHED, "postings", None)
+    _PREFETCHED.postings = (index, raw or {}, arrays or {})
+    try:
+        yield
+    finally:
+        _PREFETCHED.postings = previous
+
+
+def get_prefetched(index):
+    """
+    Postings of `index` prefetched for this thread (see prefetched_postings).
+
+    Returns:
+        tuple: (raw, arrays) dicts by term, empty when none were prefetched.
+    """
+    prefetched = getattr(_PREFETCHED, "postings", None)
+    if prefetched is None or prefetched[0] is not index:
+        return {}, {}
+    return prefetched[1], prefetched[2]
@@ -1,12 +1,33 @@
 import math
 import os
 from collections import Counter
+from operator import itemgetter
 import sys
 import heapq
+import threading
+import numpy as np
 
 # Add project root to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config
+from Backend.posting_fetch import (
+    fetch_posting_bytes,
+    fetch_posting_bytes_async,
+    get_prefetched,
+    map_bounded,
+)
+from inverted_index_gcp import (
+    build_block_meta,
+    build_impact_segments,
+    empty_posting_arrays,
+    quantize_impacts,
+    MmapMultiFileReader,
+)
+
+
+# Query terms served from inline postings vs posting files, see inline_stats()
+_INLINE_STATS = Counter()
+_INLINE_STATS_LOCK = threading.Lock()
 
 
 def _get_posting_source(posting_list_dir):
@@ -32,6 +53,115 @@ def _get_posting_source(posting_list_dir):
     return base_dir, bucket_name
 
 
+def _iter_posting_arrays(index, tokens, base_dir, bucket_name, transform=None):
+    """
+    Yields (token, (doc_ids, tfs)) for every token with a readable posting list,
+    in token order.
+
+    Postings prefetched for this thread (see posting_fetch.prefetched_postings)
+    are used as they are: decoded lists shared by a batch of queries, or
+    bytes read ahead by the asyncio server. Postings stored inline in the term
+    dictionary are decoded without any posting I/O. On GCS all other posting
+    lists are fetched up front with coalesced, parallel ranged reads; if that
+    fails, terms are read one by one as before. Reading and decoding (and
+    `transform`, if given) run per term on the shared term pool, a few terms
+    of this query at a time (see posting_fetch.map_bounded).
+
+    Args:
+        transform (callable): transform(token, doc_ids, tfs), run on the pool
+                              right after decoding; its result is yielded
+                              instead of (doc_ids, tfs).
+    """
+    tokens = [t for t in tokens if t in index.df]
+    raw, decoded = get_prefetched(index)
+    raw = dict(raw)
+    inline = {}
+    for token in tokens:
+        if token in decoded:
+            continue
+        b = index.inline_posting_bytes(token)
+        if b is not None:
+            inline[token] = b
+    n_read = sum(t not in decoded for t in tokens)
+    _record_inline(len(inline), n_read - len(inline))
+
+    missing = [t for t in tokens if t not in decoded and t not in inline and t not in raw]
+    if bucket_name is not None and missing:
+        try:
+            raw.update(fetch_posting_bytes(index, missing, base_dir, bucket_name))
+        except Exception as e:
+            print(f"Batched posting fetch failed, reading terms one by one: {e}")
+
+    def _read(token):
+        try:
+            if token in decoded:
+                arrays = decoded[token]
+            elif token in inline:
+                arrays = index.decode_posting_bytes(token, inline[token])
+            elif token in raw:
+                arrays = index.decode_posting_bytes(token, raw[token])
+            else:
+                arrays = index.read_a_posting_arrays(base_dir, token, bucket_name)
+        except Exception:
+            return None
+        return arrays if transform is None else transform(token, *arrays)
+
+    for token, result in zip(tokens, map_bounded(_read, tokens)):
+        if result is not None:
+            yield token, result
+
+
+def _record_inline(n_inline, n_file):
+    with _INLINE_STATS_LOCK:
+        _INLINE_STATS["inline"] += n_inline
+        _INLINE_STATS["file"] += n_file
+
+
+def inline_stats():
+    """
+    How the query terms read so far were served.
+
+    Returns:
+        dict: 'inline' (postings decoded from the term dictionary), 'file'
+              (read from the posting files) and 'inline_rate', the inline
+              share of all query terms.
+    """
+    with _INLINE_STATS_LOCK:
+        stats = {key: _INLINE_STATS[key] for key in ("inline", "file")}
+    total = stats["inline"] + stats["file"]
+    stats["inline_rate"] = stats["inline"] / total if total else 0.0
+    return stats
+
+
+def _accumulate(partial_ids, partial_scores):
+    """
+    Sums per-term score arrays into one score per document.
+
+    Args:
+        partial_ids (list): uint32 doc_id arrays, one per term.
+        partial_scores (list): float64 score arrays aligned with partial_ids.
+
+    Returns:
+        tuple: (doc_ids, scores) arrays with unique, ascending doc_ids.
+    """
+    if not partial_ids:
+        return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float64)
+    doc_ids, inverse = np.unique(np.concatenate(partial_ids), return_inverse=True)
+    scores = np.bincount(
+        inverse, weights=np.concatenate(partial_scores), minlength=len(doc_ids)
+    )
+    return doc_ids, scores
+
+
+def _doc_lengths(index, doc_ids, default):
+    """
+    Looks up the length of every doc_id in the array, using `default` when
+    missing: one gather from the DocStore column for dense indexes, DL dict
+    lookups otherwise.
+    """
+    return index.doc_lengths(doc_ids, default)
+
+
 def calculate_tfidf_score_with_dir(query_tokens, index, posting_list_dir):
     """
     Legacy/Debug TF-IDF function.
@@ -41,7 +171,8 @@ def calculate_tfidf_score_with_dir(query_tokens, index, posting_list_dir):
     query_norm = 0
     query_weights = {}
 
-    N = len(index.posting_locs) if not hasattr(index, "DL") else len(index.DL)
+    doc_stats = index.doc_length_stats()
+    N = len(index.posting_locs) if doc_stats is None else doc_stats[0]
 
     for token, count in query_counter.items():
         if token in index.df:
@@ -55,105 +186,1187 @@ def calculate_tfidf_score_with_dir(query_tokens, index, posting_list_dir):
     if query_norm == 0:
         return []
 
-    scores = Counter()
+    partial_ids, partial_scores = [], []
     base_dir, bucket_name = _get_posting_source(posting_list_dir)
 
-    for token, w_iq in query_weights.items():
-        try:
-            posting_list = index.read_a_posting_list(base_dir, token, bucket_name)
-        except Exception:
-            continue
+    postings = _iter_posting_arrays(index, query_weights, base_dir, bucket_name)
+    for token, (doc_ids, tfs) in postings:
+        w_iq = query_weights[token]
+        idf = math.log(N / index.df[token], 10)
+        # w_ij = tf * idf (TF-IDF standard)
+        w_ij = tfs * idf
+        partial_ids.append(doc_ids)
+        partial_scores.append(w_iq * w_ij)
 
-        for doc_id, tf in posting_list:
-            idf = math.log(N / index.df[token], 10)
-            # w_ij = tf * idf (TF-IDF standard)
-            w_ij = tf * idf
-            scores[doc_id] += w_iq * w_ij
+    doc_ids, scores = _accumulate(partial_ids, partial_scores)
+    return list(zip(doc_ids.tolist(), (scores / query_norm).tolist()))
 
-    final_scores = []
-    for doc_id, score in scores.items():
-        norm_score = score / query_norm
-        final_scores.append((doc_id, norm_score))
 
-    return final_scores
+# BM25 Parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
 
+# Intervals scored per round by the block-max engine before the threshold is
+# refreshed.
+BMW_BATCH_INTERVALS = 64
 
-def get_candidate_documents(
-    query_tokens, index, posting_list_dir, k=2000, token_weights=None
-):
+# Blocks of a term needed by BMW/MaxScore that are fewer than this many blocks
+# apart are read with one ranged read, skipped blocks included.
+BLOCK_READ_MAX_GAP = 4
+
+# Postings the score-at-a-time evaluator reads before its first check of the
+# rank-safe stopping condition (then after every doubling).
+SAAT_FIRST_CHECK = 1 << 14
+
+# Posting directory of the champion tier (scripts/build_champion_index.py)
+CHAMPION_POSTING_DIR = "postings_champion"
+
+# Per-thread score arrays of the 'accumulator' strategy, see _accumulator()
+_ACCUMULATORS = threading.local()
+
+# Outcomes of tiered queries, see tier_stats()
+_TIER_STATS = Counter()
+_TIER_STATS_LOCK = threading.Lock()
+
+
+class QueryTerm:
     """
-    Stage 1: Efficiently Retrieve top-K candidates using BM25
-    Uses heapq for top-K.
+    A query term with its decoded posting list and BM25 weights.
+
+    Attributes:
+        token (str): The term.
+        doc_ids (np.ndarray): uint32 doc ids, ascending.
+        tfs (np.ndarray): uint16 term frequencies aligned with doc_ids.
+        idf (float): BM25 idf of the term.
+        weight (float): Query weight (e.g. 0.3 for expansion terms).
     """
-    if not query_tokens:
-        return []
 
-    query_counter = Counter(query_tokens)
+    def __init__(self, token, doc_ids, tfs, idf, weight):
+        self.token = token
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.idf = idf
+        self.weight = weight
 
-    # BM25 Parameters
-    k1 = 1.2
-    b = 0.75
 
-    # Check for DL
-    has_dl = hasattr(index, "DL")
-    N = len(index.DL) if has_dl else len(index.posting_locs)
+def _bm25_stats(index, b=BM25_B):
+    """
+    Collection statistics for BM25.
+
+    Returns:
+        tuple: (N, avgdl, b). b is 0 when doc lengths are unavailable
+               (BM25 -> TF-IDF like behavior for length).
+    """
+    # Check for doc lengths (DL dict or DocStore column)
+    doc_stats = index.doc_length_stats()
+    has_dl = doc_stats is not None
+    N = doc_stats[0] if has_dl else len(index.posting_locs)
 
     avgdl = 0
     if has_dl:
         if hasattr(index, "avgdl"):
             avgdl = index.avgdl
         elif N > 0:
-            avgdl = sum(index.DL.values()) / N
+            avgdl = doc_stats[1] / N
 
     # If stats missing, fallback to b=0 (BM25 -> TF-IDF like behavior for length)
     if not has_dl or avgdl == 0:
         b = 0
+    return N, avgdl, b
+
+
+def _bm25_idf(N, df):
+    # Robust log
+    try:
+        # BM25 IDF
+        return math.log(((N - df + 0.5) / (df + 0.5)) + 1)
+    except:
+        return 0
+
+
+def _bm25_scores(tfs, doc_len, idf, weight, avgdl, b, k1=BM25_K1):
+    """
+    Weighted BM25 contribution of one term for arrays of tfs and doc lengths.
+    `doc_len` is ignored when b == 0.
+    """
+    tf = tfs.astype(np.float64)
+    if b == 0:
+        denom = tf + k1
+    else:
+        denom = tf + k1 * (1 - b + b * doc_len / avgdl)
+
+    num = idf * tf * (k1 + 1)
+    term_score = num / denom
+    # Query saturation could be: ((k3 + 1)*q_count) / (k3 + q_count)
+    # But we simply multiply the final score by the weight/importance of the term
+    return term_score * weight
+
+
+def _term_scores(index, term, doc_ids, tfs, avgdl, b):
+    """
+    BM25 contribution of `term` for the given postings (a subset of its list).
+    """
+    doc_len = _doc_lengths(index, doc_ids, avgdl) if b != 0 else None
+    return _bm25_scores(tfs, doc_len, term.idf, term.weight, avgdl, b)
+
+
+def bm25_impact_params(index, bits, k1=BM25_K1, b=BM25_B):
+    """
+    Parameters of a quantized BM25 impact table for `index`.
+
+    Every term is quantized with its own scale (see impact_scale), so frequent
+    terms get as many levels as rare ones.
+
+    Args:
+        index (InvertedIndex): The index (df and DL are used).
+        bits (int): 8 or 16.
+        k1 (float): BM25 k1.
+        b (float): BM25 b (0 is used when the index has no DL).
+
+    Returns:
+        dict: k1, b, bits, N, avgdl and quantization ('term').
+    """
+    N, avgdl, b = _bm25_stats(index, b)
+    return {"k1": k1, "b": b, "bits": bits, "N": N, "avgdl": avgdl, "quantization": "term"}
+
+
+def impact_scale(params, df):
+    """
+    Quantization step of a term with document frequency `df` under the impact
+    table `params`: the term's largest possible impact (its idf times k1 + 1,
+    the limit of the tf part) maps to 2**bits - 1, so no impact is clipped.
+    """
+    max_impact = _bm25_idf(params["N"], df) * (params["k1"] + 1)
+    return max_impact / ((1 << params["bits"]) - 1) if max_impact > 0 else 1.0
+
+
+def bm25_impacts(index, token, doc_ids, tfs, params):
+    """
+    Unweighted float BM25 contribution of every posting of `token` under the
+    impact table `params` (see bm25_impact_params).
+    """
+    idf = _bm25_idf(params["N"], index.df[token])
+    avgdl, b = params["avgdl"], params["b"]
+    doc_len = _doc_lengths(index, doc_ids, avgdl) if b != 0 else None
+    return _bm25_scores(tfs, doc_len, idf, 1.0, avgdl, b, params["k1"])
+
+
+def _impact_table(index):
+    """
+    The index's impact table, or None when it has none, or it was built for
+    other BM25 parameters or collection stats, or with the old index-wide
+    scale (rebuild with scripts/build_impact_index.py).
+    """
+    table = getattr(index, "impact_table", None)
+    if table is None:
+        return None
+    if not hasattr(table, "matches_bm25"):
+        N, avgdl, b = _bm25_stats(index)
+        params = table.params
+        table.matches_bm25 = (
+            params.get("quantization") == "term"
+            and params["k1"] == BM25_K1
+            and params["b"] == b
+            and params["N"] == N
+            and math.isclose(params["avgdl"], avgdl, rel_tol=1e-9)
+        )
+        if not table.matches_bm25:
+            print(
+                f"Impact table was built with k1={params['k1']}, b={params['b']}, "
+                f"N={params['N']}, avgdl={params['avgdl']:.6g} "
+                f"({params.get('quantization', 'index-wide')} quantization); "
+                f"scoring with floats until it is rebuilt."
+            )
+    return table if table.matches_bm25 else None
+
+
+def _load_query_terms(query_tokens, index, posting_list_dir, token_weights):
+    """
+    Reads the posting lists of all distinct query tokens, in query order.
+
+    Returns:
+        tuple: (terms, avgdl, b) with terms a list of QueryTerm.
+    """
+    query_counter = Counter(query_tokens)
+    N, avgdl, b = _bm25_stats(index)
+    base_dir, bucket_name = _get_posting_source(posting_list_dir)
+
+    terms = []
+    postings = _iter_posting_arrays(index, query_counter, base_dir, bucket_name)
+    for token, (doc_ids, tfs) in postings:
+        terms.append(_query_term(token, doc_ids, tfs, N, index, token_weights))
+    return terms, avgdl, b
+
+
+def _query_term(token, doc_ids, tfs, N, index, token_weights):
+    idf = _bm25_idf(N, index.df[token])
+    # Apply custom weight if provided (e.g. for expansion)
+    weight = 1.0
+    if token_weights and token in token_weights:
+        weight = token_weights[token]
+    return QueryTerm(token, doc_ids, tfs, idf, weight)
+
+
+def _top_k(doc_ids, scores, k):
+    """
+    The k best (doc_id, score) arrays, by descending score then ascending
+    doc_id (the order heapq.nlargest gives over ascending doc ids).
+    """
+    order = np.lexsort((doc_ids, -scores))[:k]
+    return doc_ids[order], scores[order]
+
+
+def _as_candidates(doc_ids, scores):
+    return list(zip(doc_ids.tolist(), scores.tolist()))
+
+
+def get_candidate_documents(
+    query_tokens, index, posting_list_dir, k=2000, token_weights=None
+):
+    """
+    Stage 1: Efficiently Retrieve top-K candidates using BM25
+    Exhaustive term-at-a-time scoring; uses heapq for top-K.
+    Every term is read, decoded and scored on the term pool, and the partial
+    score arrays are merged once all terms are done.
+    """
+    if not query_tokens:
+        return []
+
+    N, avgdl, b = _bm25_stats(index)
+    base_dir, bucket_name = _get_posting_source(posting_list_dir)
+
+    def _score(token, doc_ids, tfs):
+        term = _query_term(token, doc_ids, tfs, N, index, token_weights)
+        return doc_ids, _term_scores(index, term, doc_ids, tfs, avgdl, b)
+
+    # BM25 score of every posting, one term at a time
+    partial_ids, partial_scores = [], []
+    postings = _iter_posting_arrays(
+        index, Counter(query_tokens), base_dir, bucket_name, transform=_score
+    )
+    for _, (doc_ids, scores) in postings:
+        partial_ids.append(doc_ids)
+        partial_scores.append(scores)
+
+    doc_ids, scores = _accumulate(partial_ids, partial_scores)
+
+    # Efficient Top-K
+    return heapq.nlargest(
+        k, zip(doc_ids.tolist(), scores.tolist()), key=itemgetter(1)
+    )
+
+
+def _length_norms(doc_store, avgdl, b, k1=BM25_K1):
+    """
+    k1 * (1 - b + b * dl / avgdl) of every dense doc id as float32, the doc
+    length part of the BM25 denominator. Cached on the DocStore.
+    """
+    key = (k1, b, avgdl)
+    cached = getattr(doc_store, "bm25_norms", None)
+    if cached is None or cached[0] != key:
+        if b == 0:
+            norms = np.full(len(doc_store), k1, dtype=np.float32)
+        else:
+            doc_len = doc_store.doc_len.astype(np.float64)
+            norms = (k1 * (1 - b + b * doc_len / avgdl)).astype(np.float32)
+        cached = (key, norms)
+        doc_store.bm25_norms = cached
+    return cached[1]
+
+
+def _accumulator(n_docs):
+    """
+    This thread's score accumulator and seen flags for `n_docs` dense ids,
+    allocated once and left zeroed by every query.
+    """
+    acc = getattr(_ACCUMULATORS, "scores", None)
+    if acc is None or len(acc) != n_docs:
+        _ACCUMULATORS.scores = np.zeros(n_docs, dtype=np.float32)
+        _ACCUMULATORS.seen = np.zeros(n_docs, dtype=bool)
+    return _ACCUMULATORS.scores, _ACCUMULATORS.seen
+
+
+def get_candidate_documents_accumulator(
+    query_tokens, index, posting_list_dir, k=2000, token_weights=None
+):
+    """
+    Stage 1 with a preallocated float32 accumulator indexed by dense doc id.
+
+    Every term is scored with array operations against the cached length
+    norms and added straight into the accumulator, so no per-query sort or
+    merge of the doc ids is needed. Only the touched entries are reset
+    afterwards, and top-K comes from argpartition. Scores are float32, so
+    near-ties may order differently from the exhaustive scorer. Needs a dense
+    index (scripts/remap_doc_ids.py); other indexes use the exhaustive path.
+    """
+    if not query_tokens:
+        return []
+    doc_store = getattr(index, "doc_store", None)
+    if doc_store is None:
+        return get_candidate_documents(query_tokens, index, posting_list_dir, k, token_weights)
+
+    terms, avgdl, b = _load_query_terms(query_tokens, index, posting_list_dir, token_weights)
+    norms = _length_norms(doc_store, avgdl, b)
+    acc, seen = _accumulator(len(doc_store))
+    touched = []
+    try:
+        for term in terms:
+            if len(term.doc_ids) == 0:
+                continue
+            new = term.doc_ids[~seen[term.doc_ids]]
+            seen[new] = True
+            touched.append(new)
+            tf = term.tfs.astype(np.float32)
+            weight = np.float32(term.idf * term.weight * (BM25_K1 + 1))
+            acc[term.doc_ids] += weight * tf / (tf + norms[term.doc_ids])
+        if not touched:
+            return []
+        doc_ids = np.concatenate(touched)
+        scores = acc[doc_ids]
+    finally:
+        for ids in touched:
+            acc[ids] = 0
+            seen[ids] = False
+
+    if len(doc_ids) > k:
+        # Everything tied with the k-th score stays, so ties break on doc_id
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        keep = scores >= kth
+        doc_ids, scores = doc_ids[keep], scores[keep]
+    order = np.lexsort((doc_ids, -scores))[:k]
+    return _as_candidates(doc_ids[order], scores[order])
+
+
+def _may_reach(upper_bounds, threshold):
+    """
+    True where an upper bound could still reach the top-k threshold. Ties are
+    kept (they can win on doc_id), and a small margin absorbs float rounding
+    between bounds and summed scores.
+    """
+    return upper_bounds * (1 + 1e-9) + 1e-12 >= threshold
+
+
+def _score_docs(index, terms, cand, avgdl, b):
+    """
+    Exact BM25 scores of the sorted doc ids `cand`, probing every term's
+    posting list with a binary search instead of scanning it.
+    """
+    partial_ids, partial_scores = [], []
+    for term in terms:
+        if len(term.doc_ids) == 0:
+            continue
+        pos = np.searchsorted(term.doc_ids, cand)
+        pos[pos == len(term.doc_ids)] = 0
+        hit = term.doc_ids[pos] == cand
+        doc_ids = cand[hit]
+        tfs = term.tfs[pos[hit]]
+        partial_ids.append(doc_ids)
+        partial_scores.append(_term_scores(index, term, doc_ids, tfs, avgdl, b))
+    return _accumulate(partial_ids, partial_scores)
+
+
+def _min_doc_length(index):
+    """
+    Smallest doc length in the collection (cached on the index), used to bound
+    a term's BM25 contribution without looking up every posting.
+    """
+    doc_stats = index.doc_length_stats()
+    return doc_stats[2] if doc_stats is not None else 0
+
+
+def _ranges_index(starts, ends):
+    """Concatenation of np.arange(s, e) for all (s, e) pairs, vectorized."""
+    lengths = ends - starts
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+
+class BlockPostings:
+    """
+    A query term whose posting list is read block by block, when a pruning
+    strategy first needs a block, using the byte offsets of the block side
+    table (InvertedIndex.read_posting_blocks). Every block is read at most
+    once per query, and needed blocks less than BLOCK_READ_MAX_GAP apart are
+    read together. Lists already in memory (inline postings, lists shared by
+    posting_fetch.prefetched_postings, lists without a side table) are sliced
+    instead.
+
+    Attributes:
+        token (str): The term.
+        idf (float): BM25 idf of the term.
+        weight (float): Query weight (e.g. 0.3 for expansion terms).
+        blocks (np.ndarray): Block side table rows (BLOCK_META_DTYPE).
+    """
+
+    def __init__(self, index, token, idf, weight, blocks, base_dir, bucket_name, arrays=None):
+        self.token = token
+        self.idf = idf
+        self.weight = weight
+        self.blocks = blocks
+        self._index = index
+        self._base_dir = base_dir
+        self._bucket_name = bucket_name
+        self._arrays = arrays
+        self._ends = None
+        if arrays is not None:
+            self._ends = np.searchsorted(arrays[0], blocks["last_doc_id"], side="right")
+        self._read = {}
+
+    def upper_bounds(self, avgdl, b):
+        """Block-max BM25 bound of every block (max tf, min doc length)."""
+        return _bm25_scores(
+            self.blocks["max_tf"], self.blocks["min_dl"].astype(np.float64),
+            self.idf, self.weight, avgdl, b,
+        )
+
+    def covering(self, doc_ids):
+        """Sorted, distinct blocks whose doc id ranges hold the sorted `doc_ids`."""
+        block_ids = np.unique(
+            np.searchsorted(self.blocks["last_doc_id"], doc_ids, side="left")
+        )
+        return block_ids[block_ids < len(self.blocks)]
+
+    def missing_runs(self, block_ids):
+        """
+        [first, last) runs of blocks to read so that all the sorted `block_ids`
+        are in memory; needed blocks less than BLOCK_READ_MAX_GAP apart share
+        a run.
+        """
+        runs = []
+        if self._arrays is not None:
+            return runs
+        for j in block_ids.tolist():
+            if j in self._read:
+                continue
+            if runs and j - runs[-1][1] < BLOCK_READ_MAX_GAP:
+                runs[-1][1] = j + 1
+            else:
+                runs.append([j, j + 1])
+        return runs
+
+    def read_run(self, first, last):
+        """Reads and keeps blocks [first, last)."""
+        doc_ids, tfs = self._index.read_posting_blocks(
+            self._base_dir, self.token, first, last, self._bucket_name
+        )
+        ends = np.searchsorted(doc_ids, self.blocks["last_doc_id"][first:last], side="right")
+        start = 0
+        for j, end in zip(range(first, last), ends.tolist()):
+            self._read[j] = (doc_ids[start:end], tfs[start:end])
+            start = end
+
+    def read(self, block_ids):
+        """
+        QueryTerm holding the postings of the sorted, distinct `block_ids`,
+        reading the blocks not read yet.
+        """
+        if self._arrays is not None:
+            starts = np.where(block_ids > 0, self._ends[block_ids - 1], 0)
+            idx = _ranges_index(starts, self._ends[block_ids])
+            return QueryTerm(
+                self.token, self._arrays[0][idx], self._arrays[1][idx], self.idf, self.weight
+            )
+
+        for first, last in self.missing_runs(block_ids):
+            self.read_run(first, last)
+        if len(block_ids) == 0:
+            doc_ids, tfs = empty_posting_arrays()
+        else:
+            parts = [self._read[j] for j in block_ids.tolist()]
+            doc_ids = np.concatenate([p[0] for p in parts])
+            tfs = np.concatenate([p[1] for p in parts])
+        return QueryTerm(self.token, doc_ids, tfs, self.idf, self.weight)
+
+    def read_all(self):
+        """QueryTerm holding the whole posting list."""
+        if self._arrays is not None:
+            return QueryTerm(self.token, *self._arrays, self.idf, self.weight)
+        return self.read(np.arange(len(self.blocks)))
+
+
+def _load_block_terms(query_tokens, index, posting_list_dir, token_weights):
+    """
+    BlockPostings of all distinct query tokens, in query order. Nothing is
+    read for terms with a block side table; the other lists are read in full
+    and get a side table built on the fly.
 
-    scores = Counter()
+    Returns:
+        tuple: (terms, avgdl, b) with terms a list of BlockPostings.
+    """
+    query_counter = Counter(query_tokens)
+    N, avgdl, b = _bm25_stats(index)
     base_dir, bucket_name = _get_posting_source(posting_list_dir)
+    raw, decoded = get_prefetched(index)
 
+    arrays, unblocked, n_inline, n_file = {}, [], 0, 0
     for token in query_counter:
         if token not in index.df:
             continue
+        blocks = index.term_blocks(token)
+        if token in decoded:
+            arrays[token] = decoded[token]
+            continue
+        inline = index.inline_posting_bytes(token)
+        if inline is not None:
+            n_inline += 1
+            arrays[token] = index.decode_posting_bytes(token, inline)
+        elif token in raw:
+            n_file += 1
+            arrays[token] = index.decode_posting_bytes(token, raw[token])
+        elif blocks is None or len(blocks) == 0:
+            unblocked.append(token)
+        else:
+            n_file += 1
+    _record_inline(n_inline, n_file)
+    arrays.update(_iter_posting_arrays(index, unblocked, base_dir, bucket_name))
 
-        try:
-            posting_list = index.read_a_posting_list(base_dir, token, bucket_name)
-        except:
+    terms = []
+    for token in query_counter:
+        if token not in index.df:
+            continue
+        blocks = index.term_blocks(token)
+        if token in arrays:
+            doc_ids, tfs = arrays[token]
+            if len(doc_ids) == 0:
+                continue
+            if blocks is None or len(blocks) == 0:
+                doc_lens = _doc_lengths(index, doc_ids, 0) if b != 0 else None
+                blocks = build_block_meta(doc_ids, tfs, doc_lens)
+        elif token in unblocked:
+            # Its list could not be read
             continue
+        idf = _bm25_idf(N, index.df[token])
+        weight = (token_weights or {}).get(token, 1.0)
+        terms.append(BlockPostings(
+            index, token, idf, weight, blocks, base_dir, bucket_name, arrays.get(token)
+        ))
+    return terms, avgdl, b
 
-        # IDF
-        df = index.df[token]
-        # Robust log
-        try:
-            # BM25 IDF
-            idf = math.log(((N - df + 0.5) / (df + 0.5)) + 1)
-        except:
-            idf = 0
-
-        q_count = query_counter[token]
-        # Apply custom weight if provided (e.g. for expansion)
-        weight = 1.0
-        if token_weights and token in token_weights:
-            weight = token_weights[token]
-
-        # Query saturation could be: ((k3 + 1)*q_count) / (k3 + q_count)
-        # But we simply multiply the final score by the weight/importance of the term
-
-        for doc_id, tf in posting_list:
-            # BM25 score for this term
-            if b == 0:
-                denom = tf + k1
-            else:
-                doc_len = index.DL.get(doc_id, avgdl)
-                denom = tf + k1 * (1 - b + b * doc_len / avgdl)
 
-            num = idf * tf * (k1 + 1)
-            term_score = num / denom
+def _fetch_blocks(terms, block_ids):
+    """
+    Reads the blocks `block_ids[i]` of every terms[i] that are not in memory
+    yet, the runs of all terms in parallel on the term pool.
+    """
+    runs = [
+        (term, first, last)
+        for term, ids in zip(terms, block_ids)
+        for first, last in term.missing_runs(ids)
+    ]
+    for _ in map_bounded(lambda run: run[0].read_run(run[1], run[2]), runs):
+        pass
 
-            scores[doc_id] += term_score * weight
 
-    # Efficient Top-K
-    return heapq.nlargest(k, scores.items(), key=lambda x: x[1])
+def _covering_postings(terms, doc_ids):
+    """
+    QueryTerms holding, for every term, the blocks that may contain the sorted
+    `doc_ids`.
+    """
+    block_ids = [t.covering(doc_ids) for t in terms]
+    _fetch_blocks(terms, block_ids)
+    return [t.read(ids) for t, ids in zip(terms, block_ids)]
+
+
+def get_candidate_documents_maxscore(
+    query_tokens, index, posting_list_dir, k=2000, token_weights=None
+):
+    """
+    Stage 1 with MaxScore dynamic pruning; returns the same top-K as
+    get_candidate_documents.
+
+    Each term gets an upper bound on its BM25 contribution (the largest of its
+    block-max bounds). Once a top-K threshold is known, the terms whose bounds
+    add up to less than it are non-essential: documents appearing only in them
+    cannot make the top-K, so only the lists of the essential terms are read
+    in full. Of the other lists only the blocks that may hold a candidate are
+    read, and probed by binary search.
+    """
+    if not query_tokens:
+        return []
+
+    terms, avgdl, b = _load_block_terms(
+        query_tokens, index, posting_list_dir, token_weights
+    )
+    if not terms:
+        return []
+
+    upper = np.array([t.upper_bounds(avgdl, b).max() for t in terms])
+    by_bound = np.argsort(upper, kind="stable")
+
+    # Seed the threshold with the documents of the strongest term
+    seed = terms[by_bound[-1]].read_all().doc_ids
+    top_ids, top_scores = _top_k(
+        *_score_docs(index, _covering_postings(terms, seed), seed, avgdl, b), k
+    )
+
+    n_non_essential = 0
+    if len(top_ids) == k:
+        prefix = np.cumsum(upper[by_bound])
+        n_non_essential = int(np.sum(~_may_reach(prefix, top_scores[-1])))
+
+    essential = [terms[i] for i in by_bound[n_non_essential:]]
+    _fetch_blocks(essential, [np.arange(len(t.blocks)) for t in essential])
+    essential = [t.read_all().doc_ids for t in essential]
+    cand = np.setdiff1d(np.unique(np.concatenate(essential)), seed, assume_unique=True)
+    doc_ids, scores = _score_docs(index, _covering_postings(terms, cand), cand, avgdl, b)
+
+    top_ids, top_scores = _top_k(
+        np.concatenate([top_ids, doc_ids]), np.concatenate([top_scores, scores]), k
+    )
+    return _as_candidates(top_ids, top_scores)
+
+
+def get_candidate_documents_bmw(
+    query_tokens, index, posting_list_dir, k=2000, token_weights=None
+):
+    """
+    Stage 1 with Block-Max WAND; returns the same top-K as
+    get_candidate_documents.
+
+    The doc id space is cut into intervals at every block boundary of every
+    query term. An interval's upper bound is the sum of the block-max BM25
+    bounds (max tf, min doc length from the block side table) of the blocks
+    covering it. Intervals are scored exactly, in descending bound order and a
+    batch at a time, until no remaining interval can reach the current top-K
+    threshold. Only the blocks covering the scored intervals are read, so
+    postings of intervals that cannot reach the threshold are neither read
+    nor decoded.
+    """
+    if not query_tokens:
+        return []
+
+    terms, avgdl, b = _load_block_terms(
+        query_tokens, index, posting_list_dir, token_weights
+    )
+    if not terms:
+        return []
+
+    # Interval j covers doc ids (bounds[j - 1], bounds[j]]; covering[t][j] is
+    # the block of term t holding its postings there (len(blocks) past its end).
+    bounds = np.unique(np.concatenate([t.blocks["last_doc_id"] for t in terms]))
+    upper = np.zeros(len(bounds))
+    covering = []
+    for term in terms:
+        block_upper = term.upper_bounds(avgdl, b)
+        cover = np.searchsorted(term.blocks["last_doc_id"], bounds, side="left")
+        live = cover < len(term.blocks)
+        upper[live] += block_upper[cover[live]]
+        covering.append(cover)
+
+    order = np.argsort(-upper, kind="stable")
+    top_ids = np.empty(0, dtype=np.uint32)
+    top_scores = np.empty(0, dtype=np.float64)
+    in_batch = np.zeros(len(bounds), dtype=bool)
+    live = None
+
+    for start in range(0, len(order), BMW_BATCH_INTERVALS):
+        batch = order[start:start + BMW_BATCH_INTERVALS]
+        if len(top_ids) == k:
+            batch = batch[_may_reach(upper[batch], top_scores[-1])]
+            if len(batch) == 0:
+                # Bounds are sorted, no later interval can reach the threshold
+                break
+            if live is None:
+                # The threshold only rises from here, so the blocks covering
+                # the intervals that can reach it now are all that is left to
+                # read: read them in one pass instead of batch by batch.
+                live = np.zeros(len(bounds), dtype=bool)
+                live[order[start:]] = True
+                live &= _may_reach(upper, top_scores[-1])
+                _fetch_blocks(terms, [
+                    np.unique(cover[live & (cover < len(t.blocks))])
+                    for t, cover in zip(terms, covering)
+                ])
+
+        block_ids = [
+            np.unique(cover[batch][cover[batch] < len(t.blocks)])
+            for t, cover in zip(terms, covering)
+        ]
+        _fetch_blocks(terms, block_ids)
+
+        in_batch[batch] = True
+        partial_ids, partial_scores = [], []
+        for term, ids in zip(terms, block_ids):
+            part = term.read(ids)
+            keep = in_batch[np.searchsorted(bounds, part.doc_ids, side="left")]
+            doc_ids = part.doc_ids[keep]
+            partial_ids.append(doc_ids)
+            partial_scores.append(
+                _term_scores(index, term, doc_ids, part.tfs[keep], avgdl, b)
+            )
+        in_batch[batch] = False
+        doc_ids, scores = _accumulate(partial_ids, partial_scores)
+
+        top_ids, top_scores = _top_k(
+            np.concatenate([top_ids, doc_ids]), np.concatenate([top_scores, scores]), k
+        )
+
+    return _as_candidates(top_ids, top_scores)
+
+
+def get_candidate_documents_impact(
+    query_tokens, index, posting_list_dir, k=2000, token_weights=None
+):
+    """
+    Stage 1 from the precomputed quantized BM25 impacts: no doc length lookups
+    or BM25 arithmetic per posting, only the stored impacts of every term
+    times its scale (and query weight) summed per document. Scores approximate
+    the float scorer within one quantization step per term. Falls back to
+    get_candidate_documents when the index has no usable impact table.
+    """
+    if not query_tokens:
+        return []
+
+    table = _impact_table(index)
+    if table is None:
+        return get_candidate_documents(
+            query_tokens, index, posting_list_dir, k, token_weights
+        )
+
+    terms, avgdl, b = _load_query_terms(
+        query_tokens, index, posting_list_dir, token_weights
+    )
+
+    partial_ids, partial_scores = [], []
+    for term in terms:
+        impacts = index.term_impacts(term.token)
+        if impacts is None or len(impacts) != len(term.doc_ids):
+            # Term added after the table was built, score it exactly
+            scores = _term_scores(index, term, term.doc_ids, term.tfs, avgdl, b)
+        else:
+            scale = impact_scale(table.params, index.df[term.token])
+            scores = impacts * (scale * term.weight)
+        partial_ids.append(term.doc_ids)
+        partial_scores.append(scores)
+
+    doc_ids, scores = _accumulate(partial_ids, partial_scores)
+    top_ids, top_scores = _top_k(doc_ids, scores, k)
+    return _as_candidates(top_ids, top_scores)
+
+
+class ImpactSegments:
+    """
+    A query term's postings in impact order (see build_impact_segments).
+
+    Attributes:
+        doc_ids (np.ndarray): uint32 doc ids, doc-ordered inside each segment.
+        impacts (np.ndarray): Quantized impacts aligned with doc_ids.
+        ends (np.ndarray): End offset of every segment, highest segment first.
+        bounds (np.ndarray): Max score of every segment (max impact times weight).
+        weight (float): Query weight times the term's impact scale, turning
+                        its impacts into scores.
+    """
+
+    def __init__(self, doc_ids, impacts, segments, weight):
+        self.doc_ids = doc_ids
+        self.impacts = impacts
+        self.ends = segments["end"].astype(np.int64)
+        self.bounds = segments["max_impact"] * weight
+        self.weight = weight
+
+    def segment(self, j):
+        """(doc_ids, weighted impacts) of segment j."""
+        start = self.ends[j - 1] if j > 0 else 0
+        impacts = self.impacts[start:self.ends[j]]
+        return self.doc_ids[start:self.ends[j]], impacts * self.weight
+
+
+def _load_impact_segments(query_tokens, index, posting_list_dir, token_weights):
+    """
+    Impact-ordered postings of all distinct query tokens. Terms with an
+    impact-ordered copy are read from it without touching their posting list;
+    the other (short) lists are read and reordered on the fly.
+    """
+    params = index.impact_order_table.params
+    weights = {}
+    for token in Counter(query_tokens):
+        if token in index.df:
+            weight = (token_weights or {}).get(token, 1.0)
+            weights[token] = weight * impact_scale(params, index.df[token])
+
+    terms, rest = [], []
+    for token, weight in weights.items():
+        if token in index.impact_order_table:
+            doc_ids, impacts, segments = index.impact_order_table.term_segments(token)
+            terms.append(ImpactSegments(doc_ids, impacts, segments, weight))
+        else:
+            rest.append(token)
+
+    base_dir, bucket_name = _get_posting_source(posting_list_dir)
+    for token, (doc_ids, tfs) in _iter_posting_arrays(index, rest, base_dir, bucket_name):
+        impacts = index.term_impacts(token)
+        if impacts is None or len(impacts) != len(doc_ids):
+            scores = bm25_impacts(index, token, doc_ids, tfs, params)
+            scale = impact_scale(params, index.df[token])
+            impacts = quantize_impacts(scores, scale, params["bits"])
+        doc_ids, impacts, segments = build_impact_segments(doc_ids, impacts)
+        terms.append(ImpactSegments(doc_ids, impacts, segments, weights[token]))
+    return [t for t in terms if len(t.ends) > 0]
+
+
+def _surviving_candidates(doc_ids, scores, k, remaining):
+    """
+    Rank-safe stopping test of the score-at-a-time evaluator. Once the sum of
+    the next segment bounds of all terms (`remaining`) cannot reach the k-th
+    partial score, no unseen document can enter the top-K, and only the seen
+    documents whose partial score plus `remaining` reaches it still compete.
+
+    Returns:
+        np.ndarray: Mask of the documents still competing, or None if unseen
+                    documents still could enter the top-K.
+    """
+    if len(scores) < k:
+        return None if remaining > 0 else np.ones(len(scores), dtype=bool)
+    threshold = -np.partition(-scores, k - 1)[k - 1]
+    if _may_reach(remaining, threshold):
+        return None
+    return _may_reach(scores + remaining, threshold)
+
+
+def _complete_scores(terms, next_segment, cand, cand_scores):
+    """
+    Adds the contributions of the segments not read yet to the scores of the
+    sorted doc ids `cand`, by probing each unread segment (few candidates) or
+    scanning the unread tail of the term (many candidates).
+    """
+    for term, first in zip(terms, next_segment):
+        if first >= len(term.ends):
+            continue
+        start = term.ends[first - 1] if first > 0 else 0
+        if len(cand) * (len(term.ends) - first) < term.ends[-1] - start:
+            for j in range(first, len(term.ends)):
+                seg_ids, seg_impacts = term.segment(j)
+                pos = np.searchsorted(seg_ids, cand)
+                pos[pos == len(seg_ids)] = 0
+                hit = seg_ids[pos] == cand
+                cand_scores[hit] += seg_impacts[pos[hit]]
+        else:
+            tail_ids = term.doc_ids[start:]
+            pos = np.searchsorted(cand, tail_ids)
+            pos[pos == len(cand)] = 0
+            hit = cand[pos] == tail_ids
+            cand_scores += np.bincount(
+                pos[hit],
+                weights=term.impacts[start:][hit] * term.weight,
+                minlength=len(cand),
+            )
+    return cand_scores
+
+
+def get_candidate_documents_saat(
+    query_tokens, index, posting_list_dir, k=2000, token_weights=None, budget=None
+):
+    """
+    Stage 1 score-at-a-time over impact-ordered postings.
+
+    Segments of all query terms are processed from the highest weighted
+    impact down. The evaluator stops as soon as no unread posting can change
+    the top-K set (rank-safe: the result then equals
+    get_candidate_documents_impact) or once `budget` postings were processed
+    (anytime: the best K by partial score). The scores of the remaining
+    candidates are then completed from the segments not read yet, so they are
+    exact impact sums either way. Falls back to get_candidate_documents_impact
+    without an impact-ordered copy.
+
+    Args:
+        query_tokens (list): Query tokens (including expansion terms).
+        index (InvertedIndex): The body index.
+        posting_list_dir (str): Posting directory (e.g. 'postings_gcp').
+        k (int): Number of candidates.
+        token_weights (dict): Optional per-token weights.
+        budget (int): Max postings to process, defaults to
+                      Config.SAAT_POSTINGS_BUDGET (0 = until rank-safe).
+
+    Returns:
+        list: Up to k (doc_id, score) tuples, best first.
+    """
+    if not query_tokens:
+        return []
+
+    table = _impact_table(index)
+    order_table = getattr(index, "impact_order_table", None)
+    if table is None or order_table is None or order_table.params != table.params:
+        return get_candidate_documents_impact(
+            query_tokens, index, posting_list_dir, k, token_weights
+        )
+    if budget is None:
+        budget = Config.SAAT_POSTINGS_BUDGET
+
+    terms = _load_impact_segments(query_tokens, index, posting_list_dir, token_weights)
+    if not terms:
+        return []
+
+    # Every segment of every term, highest weighted bound first; within a
+    # term bounds decrease, so its segments are read in order.
+    seg_term = np.concatenate([np.full(len(t.ends), i) for i, t in enumerate(terms)])
+    seg_index = np.concatenate([np.arange(len(t.ends)) for t in terms])
+    seg_bound = np.concatenate([t.bounds for t in terms])
+    order = np.lexsort((seg_index, -seg_bound))
+
+    next_segment = np.zeros(len(terms), dtype=np.int64)
+    next_bound = np.array([t.bounds[0] for t in terms], dtype=np.float64)
+    partial_ids, partial_scores = [], []
+    processed, next_check = 0, max(k, SAAT_FIRST_CHECK)
+    survivors = None
+
+    for pos in order:
+        i, j = seg_term[pos], seg_index[pos]
+        doc_ids, impacts = terms[i].segment(j)
+        partial_ids.append(doc_ids)
+        partial_scores.append(impacts)
+        processed += len(doc_ids)
+        next_segment[i] = j + 1
+        next_bound[i] = terms[i].bounds[j + 1] if j + 1 < len(terms[i].ends) else 0
+
+        if budget and processed >= budget:
+            break
+        if processed >= next_check:
+            # Checks get rarer as the accumulators grow
+            next_check *= 2
+            acc_ids, acc_scores = _accumulate(partial_ids, partial_scores)
+            partial_ids, partial_scores = [acc_ids], [acc_scores]
+            survivors = _surviving_candidates(acc_ids, acc_scores, k, next_bound.sum())
+            if survivors is not None:
+                break
+
+    doc_ids, scores = _accumulate(partial_ids, partial_scores)
+    if survivors is not None:
+        cand, cand_scores = doc_ids[survivors], scores[survivors]
+    else:
+        # Budget spent (or all read): keep the best K by partial score
+        cand, cand_scores = _top_k(doc_ids, scores, k)
+        order = np.argsort(cand)
+        cand, cand_scores = cand[order], cand_scores[order]
+
+    cand_scores = _complete_scores(terms, next_segment, cand, cand_scores)
+    top_ids, top_scores = _top_k(cand, cand_scores, k)
+    return _as_candidates(top_ids, top_scores)
+
+
+def _champion_tier(index):
+    """
+    The champion tier attached to the index, or None when there is none or it
+    was built for other BM25 parameters or another version of the index.
+    """
+    champion = getattr(index, "champion_index", None)
+    if champion is None:
+        return None
+    if not hasattr(champion, "matches_bm25"):
+        N, _, b = _bm25_stats(index)
+        params = champion.params
+        champion.matches_bm25 = (
+            params["k1"] == BM25_K1 and params["b"] == b and params["N"] == N
+            and params.get("dense_doc_ids", False) == getattr(index, "dense_doc_ids", False)
+        )
+        if not champion.matches_bm25:
+            print("Champion tier does not match the index, rebuild it. Reading full lists.")
+    return champion if champion.matches_bm25 else None
+
+
+def _record_tier(outcome):
+    with _TIER_STATS_LOCK:
+        _TIER_STATS[outcome] += 1
+
+
+def tier_stats():
+    """
+    Outcomes of the tiered queries served so far.
+
+    Returns:
+        dict: 'champion' (answered from the champion tier), 'fallback' (had to
+              read the full tier), 'no_head_terms' (nothing to tier) and
+              'hit_rate', the champion share of queries with head terms.
+    """
+    with _TIER_STATS_LOCK:
+        stats = {key: _TIER_STATS[key] for key in ("champion", "fallback", "no_head_terms")}
+    tiered = stats["champion"] + stats["fallback"]
+    stats["hit_rate"] = stats["champion"] / tiered if tiered else 0.0
+    return stats
+
+
+def _champion_candidates(query_tokens, index, champion, heads, posting_list_dir, k, token_weights):
+    """
+    Top-K from the champion lists of the head terms and the full lists of the
+    other terms. Scores of documents missing from a champion list are lower
+    bounds; the tail bound of that list caps what they miss.
+
+    Returns:
+        list: The top-K candidates, or None if they cannot be told apart from
+              documents whose champion-less score might still beat them.
+    """
+    N, avgdl, b = _bm25_stats(index)
+    weights = {
+        token: (token_weights or {}).get(token, 1.0)
+        for token in Counter(query_tokens)
+        if token in index.df
+    }
+
+    champ_dir, champ_bucket = _get_posting_source(CHAMPION_POSTING_DIR)
+    base_dir, bucket_name = _get_posting_source(posting_list_dir)
+    head_lists = dict(_iter_posting_arrays(champion, heads, champ_dir, champ_bucket))
+    if len(head_lists) < len(heads):
+        return None
+    rest = [t for t in weights if t not in head_lists]
+
+    partial_ids, partial_scores, heads_read = [], [], []
+    lists = list(head_lists.items())
+    lists += list(_iter_posting_arrays(index, rest, base_dir, bucket_name))
+    for token, (doc_ids, tfs) in lists:
+        term = QueryTerm(token, doc_ids, tfs, _bm25_idf(N, index.df[token]), weights[token])
+        partial_ids.append(doc_ids)
+        partial_scores.append(_term_scores(index, term, doc_ids, tfs, avgdl, b))
+        if token in head_lists:
+            heads_read.append((doc_ids, champion.tail_bounds[token] * term.weight))
+
+    doc_ids, scores = _accumulate(partial_ids, partial_scores)
+    if len(doc_ids) < k:
+        return None
+
+    # What every document may still miss: the tail bounds of the champion
+    # lists it is not in. An unseen document may miss all of them.
+    total_bound = sum(bound for _, bound in heads_read)
+    present = np.zeros(len(doc_ids))
+    for head_ids, bound in heads_read:
+        present[np.searchsorted(doc_ids, head_ids)] += bound
+    upper = scores + (total_bound - present)
+
+    top_ids, top_scores = _top_k(doc_ids, scores, k)
+    outside = np.ones(len(doc_ids), dtype=bool)
+    outside[np.searchsorted(doc_ids, top_ids)] = False
+    best_outside = max(upper[outside].max() if outside.any() else 0.0, total_bound)
+    if _may_reach(best_outside, top_scores[-1]):
+        return None
+    return _as_candidates(top_ids, top_scores)
+
+
+def get_candidate_documents_tiered(
+    query_tokens, index, posting_list_dir, k=2000, token_weights=None
+):
+    """
+    Stage 1 from the champion tier first: head terms (df >= the tier's
+    threshold) are scored from their short champion lists only. The full
+    lists are read (with Config.TIER_FULL_STRATEGY) only when some document
+    outside the champion top-K could still reach it. The top-K set is then
+    the exact one; the scores of its documents may be slightly low when they
+    are missing from a champion list. Outcomes are counted in tier_stats().
+    """
+    if not query_tokens:
+        return []
+
+    champion = _champion_tier(index)
+    heads = []
+    if champion is not None:
+        heads = [t for t in Counter(query_tokens) if t in champion.posting_locs]
+
+    if heads:
+        result = _champion_candidates(
+            query_tokens, index, champion, heads, posting_list_dir, k, token_weights
+        )
+        if result is not None:
+            _record_tier("champion")
+            return result
+        _record_tier("fallback")
+    else:
+        _record_tier("no_head_terms")
+
+    full_strategy = Config.TIER_FULL_STRATEGY
+    if full_strategy == "tiered":
+        raise ValueError("TIER_FULL_STRATEGY cannot be 'tiered'")
+    return RETRIEVAL_STRATEGIES[full_strategy](
+        query_tokens, index, posting_list_dir, k=k, token_weights=token_weights
+    )
+
+
+# Stage 1 strategies selectable through Config.RETRIEVAL_STRATEGY
+RETRIEVAL_STRATEGIES = {
+    "exhaustive": get_candidate_documents,
+    "accumulator": get_candidate_documents_accumulator,
+    "bmw": get_candidate_documents_bmw,
+    "maxscore": get_candidate_documents_maxscore,
+    "impact": get_candidate_documents_impact,
+    "saat": get_candidate_documents_saat,
+    "tiered": get_candidate_documents_tiered,
+}
+
+
+def retrieve_candidates(
+    query_tokens, index, posting_list_dir, k=2000, token_weights=None, strategy=None
+):
+    """
+    Stage 1 entry point: runs the configured top-K retrieval strategy.
+
+    Args:
+        query_tokens (list): Query tokens (including expansion terms).
+        index (InvertedIndex): The body index.
+        posting_list_dir (str): Posting directory (e.g. 'postings_gcp').
+        k (int): Number of candidates.
+        token_weights (dict): Optional per-token weights.
+        strategy (str): One of RETRIEVAL_STRATEGIES, defaults to Config.RETRIEVAL_STRATEGY.
+
+    Returns:
+        list: Up to k (doc_id, score) tuples, best first.
+    """
+    strategy = strategy or Config.RETRIEVAL_STRATEGY
+    if strategy not in RETRIEVAL_STRATEGIES:
+        raise ValueError(f"Unknown retrieval strategy: {strategy}")
+    return RETRIEVAL_STRATEGIES[strategy](
+        query_tokens, index, posting_list_dir, k=k, token_weights=token_weights
+    )
+
+
+# Strategies that read the full posting list of every query term; the others
+# (maxscore, bmw, tiered, saat) read parts of them depending on what they find
+FULL_LIST_STRATEGIES = ("exhaustive", "accumulator", "impact")
+
+
+async def fetch_postings_async(query_tokens, index, posting_list_dir, strategy=None):
+    """
+    Reads ahead, without blocking the event loop, the posting bytes a
+    retrieval will need, to be handed to it with posting_fetch.prefetched_postings.
+
+    Nothing is read for strategies that read partial lists, for inline
+    terms, or for memory-mapped local postings (their pages are read while
+    decoding).
+
+    Args:
+        query_tokens (list): Query tokens (including expansion terms).
+        index (InvertedIndex): The body index.
+        posting_list_dir (str): Posting directory (e.g. 'postings_gcp').
+        strategy (str): The retrieval strategy, 'tfidf' for
+                        calculate_tfidf_score_with_dir. Defaults to
+                        Config.RETRIEVAL_STRATEGY.
+
+    Returns:
+        dict: term -> raw posting list bytes.
+    """
+    strategy = strategy or Config.RETRIEVAL_STRATEGY
+    if strategy != "tfidf" and strategy not in FULL_LIST_STRATEGIES:
+        return {}
+    base_dir, bucket_name = _get_posting_source(posting_list_dir)
+    if isinstance(index.posting_reader(base_dir, bucket_name), MmapMultiFileReader):
+        return {}
+    terms = [
+        t for t in set(query_tokens)
+        if t in index.df and index.inline_posting_bytes(t) is None
+    ]
+    return await fetch_posting_bytes_async(index, terms, base_dir, bucket_name)
+
+
+def read_posting_arrays(query_tokens, index, posting_list_dir):
+    """
+    Reads and decodes the posting lists of many terms at once (coalesced
+    on GCS, on the term pool), e.g. the distinct terms of a batch of queries.
+
+    Args:
+        query_tokens (iterable): Terms to read; unknown terms are skipped.
+        index (InvertedIndex): The body index.
+        posting_list_dir (str): Posting directory (e.g. 'postings_gcp').
+
+    Returns:
+        dict: term -> (doc_ids, tfs) arrays, for posting_fetch.prefetched_postings.
+    """
+    base_dir, bucket_name = _get_posting_source(posting_list_dir)
+    return dict(_iter_posting_arrays(index, list(dict.fromkeys(query_tokens)), base_dir, bucket_name))
 
 
 def calculate_unique_term_count(query_tokens, index, posting_list_dir):
@@ -161,22 +1374,18 @@ def calculate_unique_term_count(query_tokens, index, posting_list_dir):
     Calculates score based on Number of UNIQUE query words in the document.
     """
     unique_tokens = set(query_tokens)
-    scores = Counter()
+    partial_ids, partial_scores = [], []
 
     base_dir, bucket_name = _get_posting_source(posting_list_dir)
 
-    for token in unique_tokens:
-        try:
-            posting_list = index.read_a_posting_list(base_dir, token, bucket_name)
-        except Exception:
-            continue
+    postings = _iter_posting_arrays(index, unique_tokens, base_dir, bucket_name)
+    for token, (doc_ids, _) in postings:
+        partial_ids.append(doc_ids)
+        partial_scores.append(np.ones(len(doc_ids)))
 
-        for doc_id, _ in posting_list:
-            scores[doc_id] += 1
+    doc_ids, counts = _accumulate(partial_ids, partial_scores)
 
     # Rank by count (descending)
-    results = []
-    for doc_id, count in scores.items():
-        results.append((doc_id, count))
+    results = list(zip(doc_ids.tolist(), counts.astype(np.int64).tolist()))
 
     return sorted(results, key=lambda x: x[1], reverse=True)
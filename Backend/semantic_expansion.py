@@ -1,4 +1,5 @@
 import os
+import numpy as np
 
 try:
     from gensim.models import KeyedVectors
@@ -6,15 +7,124 @@ except ImportError:
     KeyedVectors = None
 
 
+class ArrayKeyedVectors:
+    """
+    Read-only word vectors as NumPy arrays, standing in for gensim
+    KeyedVectors in SemanticExpander (`word in model` and `most_similar`)
+    without gensim or its model files, e.g. when opened from an engine
+    snapshot.
+
+    Attributes:
+        vectors (np.ndarray): Unit-normalized float32 vector per word row.
+        word_offsets (np.ndarray): Start of every word in `word_blob`, plus the end.
+        word_blob (np.ndarray): UTF-8 bytes of all words, in row order (uint8).
+        sorted_rows (np.ndarray): Rows ordered by the UTF-8 bytes of their word.
+    """
+
+    def __init__(self, vectors, word_offsets, word_blob, sorted_rows):
+        self.vectors = vectors
+        self.word_offsets = word_offsets
+        self.word_blob = word_blob
+        self.sorted_rows = sorted_rows
+
+    @classmethod
+    def from_words(cls, words, vectors):
+        """
+        Builds the arrays from a word list and its vectors.
+
+        Args:
+            words (list): Words, in row order.
+            vectors (np.ndarray): Vector of every word (normalized here).
+
+        Returns:
+            ArrayKeyedVectors: The vectors.
+        """
+        encoded = [w.encode("utf-8") for w in words]
+        offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        sorted_rows = np.array(
+            sorted(range(len(encoded)), key=encoded.__getitem__), dtype="<i8"
+        )
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1)
+        return cls(vectors.astype("<f4"), offsets, blob, sorted_rows)
+
+    @classmethod
+    def from_keyed_vectors(cls, model):
+        """
+        Converts a loaded gensim KeyedVectors model.
+        """
+        return cls.from_words(list(model.index_to_key), model.get_normed_vectors())
+
+    def _word_bytes(self, row):
+        start, end = int(self.word_offsets[row]), int(self.word_offsets[row + 1])
+        return self.word_blob[start:end].tobytes()
+
+    def _row(self, word):
+        """
+        Row of a word by binary search over the sorted rows, -1 if unknown.
+        """
+        if not isinstance(word, str):
+            return -1
+        key = word.encode("utf-8")
+        lo, hi = 0, len(self.sorted_rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word_bytes(self.sorted_rows[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.sorted_rows) and self._word_bytes(self.sorted_rows[lo]) == key:
+            return int(self.sorted_rows[lo])
+        return -1
+
+    def __contains__(self, word):
+        return self._row(word) >= 0
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def most_similar(self, positive, topn=10):
+        """
+        Words closest by cosine similarity to the normalized mean of the
+        normalized vectors of `positive`, as gensim ranks them.
+
+        Args:
+            positive (list): Known words.
+            topn (int): Number of words returned.
+
+        Returns:
+            list: (word, similarity) pairs, best first, without the input words.
+        """
+        rows = [self._row(w) for w in positive]
+        if not rows or min(rows) < 0:
+            raise KeyError(f"Unknown words in {positive}")
+        mean = self.vectors[rows].astype(np.float64).mean(axis=0)
+        norm = np.linalg.norm(mean)
+        if norm > 0:
+            mean /= norm
+        sims = self.vectors @ mean.astype(np.float32)
+        n = min(topn + len(rows), len(sims))
+        best = np.argpartition(-sims, n - 1)[:n]
+        best = best[np.argsort(-sims[best], kind="stable")]
+        exclude = set(rows)
+        return [
+            (self._word_bytes(row).decode("utf-8"), float(sims[row]))
+            for row in best.tolist() if row not in exclude
+        ][:topn]
+
+
 class SemanticExpander:
-    def __init__(self, model_path="data/word2vec.model", topn=3, threshold=0.3):
-        self.model = None
+    def __init__(self, model_path="data/word2vec.model", topn=3, threshold=0.3, model=None):
+        self.model = model
         self.topn = topn
         self.threshold = threshold
-        self.model_loaded = False
+        self.model_loaded = model is not None
 
         # Lazy load or load at init
-        if KeyedVectors and os.path.exists(model_path):
+        if model is None and KeyedVectors and model_path and os.path.exists(model_path):
             try:
                 print(f"Loading Word2Vec model from {model_path}...")
                 # Assuming KeyedVectors format (GLOVE or Word2Vec KeyedVectors)
@@ -0,0 +1,366 @@
+import os
+import sys
+import json
+import mmap
+import pickle
+import tempfile
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inverted_index_gcp import (
+    InvertedIndex,
+    TermDictionary,
+    DocStore,
+    DOC_STORE_COLUMNS,
+    BlockMaxTable,
+    ImpactTable,
+    ImpactOrderedTable,
+    _ImpactSegmentRows,
+    _TermSlicesView,
+)
+from Backend.artifact_cache import SortedIdTable
+
+# One file holding every static structure of a loaded engine: an 8-byte magic,
+# the header length, a JSON header (format version, manifest, and the offset,
+# dtype and shape of every section) and the sections, 8-byte aligned. It is
+# memory-mapped when opened, so sections are paged in only when used.
+SNAPSHOT_MAGIC = b"IRSNAP01"
+SNAPSHOT_VERSION = 1
+
+# Index files whose size is recorded, to detect a snapshot built from an
+# older copy of the index
+INDEX_SOURCE_FILES = ("index.pkl", "index.termdict")
+
+_TABLES = (
+    ("block_table", BlockMaxTable),
+    ("impact_table", ImpactTable),
+    ("impact_order_table", ImpactOrderedTable),
+)
+
+
+def _align8(n):
+    return (n + 7) & ~7
+
+
+class SnapshotWriter:
+    """
+    Collects named arrays and a JSON manifest, then writes them as one
+    snapshot file (see SNAPSHOT_MAGIC).
+
+    Attributes:
+        manifest (dict): JSON-serializable metadata stored in the header.
+    """
+
+    def __init__(self):
+        self.manifest = {}
+        self._sections = {}
+
+    def add_array(self, name, array):
+        """
+        Adds a section.
+
+        Args:
+            name (str): Section name, unique in the snapshot.
+            array (np.ndarray): Its contents (any dtype, including structured).
+        """
+        if name in self._sections:
+            raise ValueError(f"Duplicate snapshot section {name}")
+        self._sections[name] = np.ascontiguousarray(array)
+
+    def add_bytes(self, name, data):
+        """
+        Adds a section of raw bytes.
+        """
+        self.add_array(name, np.frombuffer(bytes(data), dtype=np.uint8))
+
+    def write(self, path):
+        """
+        Writes the snapshot. The file is replaced atomically, so a server that
+        has the old one mapped keeps reading it safely.
+
+        Args:
+            path (str): Target file.
+
+        Returns:
+            int: Size of the file in bytes.
+        """
+        layout, offset = {}, 0
+        for name, array in self._sections.items():
+            layout[name] = [offset, np.lib.format.dtype_to_descr(array.dtype), list(array.shape)]
+            offset = _align8(offset + array.nbytes)
+        header = json.dumps({
+            "version": SNAPSHOT_VERSION,
+            "manifest": self.manifest,
+            "sections": layout,
+        }).encode("utf-8")
+        data_start = _align8(16 + len(header))
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(SNAPSHOT_MAGIC + len(header).to_bytes(8, "little") + header)
+                f.write(b"\0" * (data_start - 16 - len(header)))
+                for name, array in self._sections.items():
+                    f.seek(data_start + layout[name][0])
+                    f.write(array.reshape(-1).view(np.uint8).data)
+                f.truncate(data_start + offset)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return data_start + offset
+
+
+class Snapshot:
+    """
+    A snapshot file opened memory-mapped. Sections are returned as NumPy
+    views of the mapping; nothing is read until it is used.
+
+    Attributes:
+        path (str): The snapshot file.
+        manifest (dict): Metadata written with it.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The snapshot file.
+
+        Raises:
+            ValueError: If it is not a snapshot of the current version.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._buf[:8] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not an engine snapshot")
+        header_len = int.from_bytes(self._buf[8:16], "little")
+        header = json.loads(self._buf[16:16 + header_len])
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(
+                f"{path} is a version {header.get('version')} snapshot, expected "
+                f"{SNAPSHOT_VERSION}: rebuild it with `python scripts/snapshot.py build`"
+            )
+        self.manifest = header["manifest"]
+        self._sections = header["sections"]
+        self._data_start = _align8(16 + header_len)
+
+    def __contains__(self, name):
+        return name in self._sections
+
+    def array(self, name):
+        """
+        A section as a read-only array backed by the mapping.
+        """
+        offset, descr, shape = self._sections[name]
+        dtype = np.lib.format.descr_to_dtype(descr)
+        count = int(np.prod(shape, dtype=np.int64))
+        return np.frombuffer(
+            self._buf, dtype=dtype, count=count, offset=self._data_start + offset
+        ).reshape(shape)
+
+    def buffer(self, name):
+        """
+        A byte section as a memoryview of the mapping.
+        """
+        offset, _, shape = self._sections[name]
+        start = self._data_start + offset
+        return memoryview(self._buf)[start:start + shape[0]]
+
+
+def index_source_stats(base_dir):
+    """
+    Size and modification time of the index files in a local index
+    directory. The size alone misses a rebuild that writes files of the same
+    length (e.g. a v1 index rebuilt from the same documents), so the mtime is
+    recorded too.
+
+    Args:
+        base_dir (str): Index directory, e.g. 'data/postings_gcp'.
+
+    Returns:
+        dict: [size, mtime in ns] per file name, for the files that exist.
+    """
+    stats = {}
+    for file_name in INDEX_SOURCE_FILES:
+        path = os.path.join(base_dir, file_name)
+        if os.path.exists(path):
+            st = os.stat(path)
+            stats[file_name] = [st.st_size, st.st_mtime_ns]
+    return stats
+
+
+def add_index(writer, prefix, index, base_dir=None):
+    """
+    Adds an InvertedIndex: its term dictionary (built from the in-memory
+    mappings if it was loaded without one), its other attributes, doc
+    lengths, DocStore and side tables. Side table slices are stored as
+    arrays aligned with the term ids, so opening them reads nothing.
+
+    Args:
+        writer (SnapshotWriter): The snapshot being built.
+        prefix (str): Section name prefix, e.g. 'index'.
+        index (InvertedIndex): The loaded index.
+        base_dir (str): Local directory the index was loaded from, recorded
+                        to detect a stale snapshot later.
+    """
+    term_dict = getattr(index, "_term_dict", None)
+    if term_dict is None:
+        term_dict = TermDictionary.build(
+            index.df, index.term_total, index.posting_locs, getattr(index, "posting_sizes", None)
+        )
+    writer.add_bytes(f"{prefix}.termdict", term_dict._buf)
+
+    state = index.__getstate__()
+    for key in ("df", "term_total", "posting_locs", "posting_sizes", "DL", "avgdl"):
+        state.pop(key, None)
+    writer.add_bytes(f"{prefix}.state", pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+
+    entry = {"terms": len(term_dict), "tables": {}}
+    doc_store = getattr(index, "doc_store", None)
+    if doc_store is not None:
+        for column in DOC_STORE_COLUMNS:
+            values = getattr(doc_store, column)
+            if values is not None:
+                writer.add_array(f"{prefix}.docs.{column}", values)
+    elif hasattr(index, "DL"):
+        dl = SortedIdTable.from_dict(index.DL, "<u4")
+        writer.add_array(f"{prefix}.dl.ids", dl.ids)
+        writer.add_array(f"{prefix}.dl.values", dl.values)
+    entry["doc_stats"] = index.doc_length_stats()
+
+    for table_name, _ in _TABLES:
+        table = getattr(index, table_name, None)
+        if table is None or len(table) == 0:
+            continue
+        table._flush()
+        tables = [(table_name, table)]
+        if isinstance(table, ImpactOrderedTable):
+            writer.add_array(f"{prefix}.{table_name}.impacts", table.impacts)
+            tables.append((f"{table_name}.segments", table.segments))
+        for name, rows_table in tables:
+            starts, counts = _TermSlicesView.build_arrays(term_dict, rows_table.slices)
+            writer.add_array(f"{prefix}.{name}.rows", rows_table.rows)
+            writer.add_array(f"{prefix}.{name}.starts", starts)
+            writer.add_array(f"{prefix}.{name}.counts", counts)
+        entry["tables"][table_name] = {
+            "terms": len(table),
+            "params": _json_params(getattr(table, "params", None)),
+            "segment_terms": len(table.segments) if isinstance(table, ImpactOrderedTable) else None,
+        }
+    if base_dir is not None:
+        entry["source"] = {"dir": base_dir, "files": index_source_stats(base_dir)}
+    writer.manifest[prefix] = entry
+
+
+def _json_params(params):
+    # Impact parameters may hold NumPy scalars
+    if params is None:
+        return None
+    return {k: v.item() if isinstance(v, np.generic) else v for k, v in params.items()}
+
+
+def _term_slices(snapshot, prefix, term_dict, n_terms):
+    return _TermSlicesView(
+        term_dict, snapshot.array(f"{prefix}.starts"), snapshot.array(f"{prefix}.counts"), n_terms
+    )
+
+
+def open_index(snapshot, prefix):
+    """
+    Rebuilds an InvertedIndex added with add_index, backed by the mapping.
+
+    Args:
+        snapshot (Snapshot): The open snapshot.
+        prefix (str): Section name prefix it was added with.
+
+    Returns:
+        InvertedIndex: The index.
+
+    Raises:
+        ValueError: If the local index it was built from has changed since.
+    """
+    entry = snapshot.manifest[prefix]
+    source = entry.get("source")
+    if source is not None:
+        current = index_source_stats(source["dir"])
+        if current and current != source["files"]:
+            raise ValueError(
+                f"{snapshot.path} was built from another version of {source['dir']}: "
+                "rebuild it with `python scripts/snapshot.py build`"
+            )
+
+    index = InvertedIndex.__new__(InvertedIndex)
+    index.__dict__.update(pickle.loads(snapshot.buffer(f"{prefix}.state")))
+    term_dict = TermDictionary(snapshot.buffer(f"{prefix}.termdict"))
+    index.use_term_dict(term_dict)
+
+    if f"{prefix}.docs.wiki_ids" in snapshot:
+        index.doc_store = DocStore(**{
+            column: snapshot.array(f"{prefix}.docs.{column}")
+            for column in DOC_STORE_COLUMNS if f"{prefix}.docs.{column}" in snapshot
+        })
+    elif f"{prefix}.dl.ids" in snapshot:
+        index.DL = SortedIdTable(snapshot.array(f"{prefix}.dl.ids"), snapshot.array(f"{prefix}.dl.values"))
+    # Precomputed, so avgdl is not summed over every document on startup
+    doc_stats = entry.get("doc_stats")
+    index._doc_stats = None if doc_stats is None else tuple(doc_stats)
+
+    for table_name, table_cls in _TABLES:
+        info = entry["tables"].get(table_name)
+        if info is None:
+            continue
+        name = f"{prefix}.{table_name}"
+        rows = snapshot.array(f"{name}.rows")
+        slices = _term_slices(snapshot, name, term_dict, info["terms"])
+        if table_cls is BlockMaxTable:
+            table = BlockMaxTable(rows, slices)
+        elif table_cls is ImpactTable:
+            table = ImpactTable(info["params"], rows, slices)
+        else:
+            segments = _ImpactSegmentRows(
+                snapshot.array(f"{name}.segments.rows"),
+                _term_slices(snapshot, f"{name}.segments", term_dict, info["segment_terms"]),
+            )
+            table = ImpactOrderedTable(
+                info["params"], rows, slices, snapshot.array(f"{name}.impacts"), segments
+            )
+        setattr(index, table_name, table)
+    return index
+
+
+def add_table(writer, prefix, table):
+    """
+    Adds a SortedIdTable as `prefix`.ids / `prefix`.values.
+    """
+    writer.add_array(f"{prefix}.ids", table.ids)
+    writer.add_array(f"{prefix}.values", table.values)
+
+
+def open_table(snapshot, prefix):
+    """
+    The SortedIdTable added with add_table, backed by the mapping.
+    """
+    return SortedIdTable(snapshot.array(f"{prefix}.ids"), snapshot.array(f"{prefix}.values"))
+
+
+def describe(snapshot):
+    """
+    One line per section: name, dtype, shape and size, for inspection.
+
+    Args:
+        snapshot (Snapshot): The open snapshot.
+
+    Returns:
+        list: The lines.
+    """
+    lines = []
+    for name, (_, descr, shape) in snapshot._sections.items():
+        dtype = np.lib.format.descr_to_dtype(descr)
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        lines.append(f"{name:<40} {str(dtype):<24} {str(tuple(shape)):<16} {nbytes / 1024 ** 2:>10.1f} MB")
+    return lines
@@ -0,0 +1,166 @@
+import os
+import numpy as np
+
+# One UTF-8 blob with all titles, the offset of every title in it (n + 1
+# entries) and the ascending wiki ids they belong to, as .npy files in one
+# directory. Opened memory-mapped, so titles are decoded only when looked up.
+TITLE_STORE_FILES = {
+    "ids": "titles_ids.npy",
+    "offsets": "titles_offsets.npy",
+    "blob": "titles_blob.npy",
+}
+
+
+class TitleStore:
+    """
+    Read-only wiki id -> title table backed by NumPy arrays.
+
+    Supports `get(wiki_id, default)` like the id_to_title dict it replaces.
+
+    Attributes:
+        ids (np.ndarray): Ascending wiki ids (uint32).
+        offsets (np.ndarray): Start of every title in `blob`, plus the end (int64).
+        blob (np.ndarray): UTF-8 bytes of all titles (uint8).
+    """
+
+    def __init__(self, ids, offsets, blob):
+        """
+        Args:
+            ids (np.ndarray): Ascending wiki ids.
+            offsets (np.ndarray): len(ids) + 1 offsets into `blob`.
+            blob (np.ndarray): Concatenated UTF-8 titles.
+        """
+        self.ids = ids
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, wiki_ids, titles):
+        """
+        Builds the store from aligned ids and titles. When an id appears more
+        than once its last title is kept, as when building a dict.
+
+        Args:
+            wiki_ids (iterable): Wiki ids.
+            titles (iterable): Title of every id (None is stored as '').
+
+        Returns:
+            TitleStore: The in-memory store.
+        """
+        wiki_ids = np.fromiter(wiki_ids, dtype=np.int64)
+        titles = list(titles)
+        if len(wiki_ids) != len(titles):
+            raise ValueError("wiki_ids and titles must have the same length")
+        if len(wiki_ids) and (wiki_ids.min() < 0 or wiki_ids.max() > np.iinfo(np.uint32).max):
+            raise ValueError("wiki ids must fit in uint32")
+
+        order = np.argsort(wiki_ids, kind="stable")
+        sorted_ids = wiki_ids[order]
+        # Last occurrence of every id
+        keep = np.ones(len(order), dtype=bool)
+        keep[:-1] = sorted_ids[:-1] != sorted_ids[1:]
+        order = order[keep]
+
+        encoded = [("" if titles[i] is None else str(titles[i])).encode("utf-8") for i in order]
+        offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(sorted_ids[keep].astype("<u4"), offsets, blob)
+
+    def save(self, directory):
+        """
+        Writes the three arrays into `directory`.
+
+        Args:
+            directory (str): Target directory, created if missing.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for attr, file_name in TITLE_STORE_FILES.items():
+            np.save(os.path.join(directory, file_name), getattr(self, attr))
+
+    @staticmethod
+    def exists(directory):
+        """
+        Args:
+            directory (str): Store directory.
+
+        Returns:
+            bool: True if all files of a store are in `directory`.
+        """
+        return all(
+            os.path.exists(os.path.join(directory, f)) for f in TITLE_STORE_FILES.values()
+        )
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Opens a store written by `save`, memory-mapped.
+
+        Args:
+            directory (str): Store directory.
+
+        Returns:
+            TitleStore: The store.
+        """
+        arrays = {
+            attr: np.load(os.path.join(directory, file_name), mmap_mode="r")
+            for attr, file_name in TITLE_STORE_FILES.items()
+        }
+        return cls(**arrays)
+
+    def _positions(self, wiki_ids):
+        """
+        Row of every wiki id in the store, -1 for unknown ids.
+        """
+        wiki_ids = np.asarray(wiki_ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(len(wiki_ids), -1, dtype=np.int64)
+        # Same dtype as `ids`, so the search does not convert the whole array
+        in_range = (wiki_ids >= 0) & (wiki_ids <= np.iinfo(np.uint32).max)
+        probe = np.where(in_range, wiki_ids, 0).astype(self.ids.dtype)
+        pos = np.minimum(np.searchsorted(self.ids, probe), len(self.ids) - 1)
+        return np.where(in_range & (self.ids[pos] == probe), pos, -1)
+
+    def _decode(self, pos):
+        start, end = int(self.offsets[pos]), int(self.offsets[pos + 1])
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def get(self, wiki_id, default=None):
+        """
+        Title of one wiki id.
+
+        Args:
+            wiki_id (int or str): Wiki id.
+            default: Returned when the id is unknown.
+
+        Returns:
+            str: The title, or `default`.
+        """
+        try:
+            wiki_id = int(wiki_id)
+        except (TypeError, ValueError):
+            return default
+        if not 0 <= wiki_id <= np.iinfo(np.uint32).max:
+            return default
+        pos = int(self._positions([wiki_id])[0])
+        return default if pos < 0 else self._decode(pos)
+
+    def titles(self, wiki_ids, default=None):
+        """
+        Titles of several wiki ids with one batched search; only these titles
+        are decoded.
+
+        Args:
+            wiki_ids (list): Integer wiki ids.
+            default: Title of unknown ids.
+
+        Returns:
+            list: Titles aligned with wiki_ids.
+        """
+        return [
+            default if pos < 0 else self._decode(pos)
+            for pos in self._positions(wiki_ids).tolist()
+        ]
@@ -14,10 +14,116 @@ class Config:
     # Parquet directories in GCS
     ID_TO_TITLE_PARQUET_DIR_GCS = "mappings/id_to_title_parquet"
     TITLE_TO_ID_PARQUET_DIR_GCS = "mappings/title_to_id_parquet"
+
+    # Memory-mapped title store (scripts/build_title_store.py): local
+    # directory, and the GCS prefix it is downloaded from when missing
+    TITLE_STORE_DIR = os.environ.get("TITLE_STORE_DIR", os.path.join("data", "titles"))
+    TITLE_STORE_DIR_GCS = os.environ.get("TITLE_STORE_DIR_GCS", "mappings/titles")
+    
+    # Single-file engine snapshot (`python scripts/snapshot.py build`); the
+    # server opens it instead of loading every source when it exists
+    SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", os.path.join("data", "engine.snap"))
+    
+    # Without a snapshot, the server loads the engine components on background
+    # threads and binds at once: /readyz turns 200 when the index is usable,
+    # other components join as they finish. 0 loads everything before serving
+    BACKGROUND_LOADING = os.environ.get("BACKGROUND_LOADING", "1") != "0"
     
     # PageRank GCS Path
     PAGERANK_CSV_GZ_GCS = "pr/part-00000-a04c95dd-e3ce-4c9d-9d78-fa2201683fb3-c000.csv.gz"
 
+    # Local cache of PageRank / pageviews as sorted id/value .npy arrays,
+    # rebuilt when the content hash of their source changes. Empty disables it.
+    ARTIFACT_CACHE_DIR = os.environ.get("ARTIFACT_CACHE_DIR", os.path.join("data", "cache"))
+
+    # Local posting reads: 'mmap' (zero-copy memory-mapped blocks) or 'file'
+    LOCAL_READ_MODE = os.environ.get("LOCAL_READ_MODE", "mmap")
+
+    # Keep-alive connections of the shared GCS client, and how many posting
+    # file descriptors a local reader keeps open (LRU)
+    GCS_POOL_SIZE = int(os.environ.get("GCS_POOL_SIZE", 32))
+    MAX_OPEN_POSTING_FILES = int(os.environ.get("MAX_OPEN_POSTING_FILES", 256))
+
+    # GCS posting fetches: concurrent ranged downloads, and how ranges of the
+    # same file are merged (max gap between ranges / max bytes per request)
+    GCS_FETCH_WORKERS = int(os.environ.get("GCS_FETCH_WORKERS", 16))
+    GCS_COALESCE_GAP = int(os.environ.get("GCS_COALESCE_GAP", 256 * 1024))
+    GCS_MAX_REQUEST_BYTES = int(os.environ.get("GCS_MAX_REQUEST_BYTES", 32 * 1024 * 1024))
+
+    # Per-term posting reads, decoding and scoring run on a pool of
+    # TERM_WORKERS threads shared by all queries (below 2 = on the query
+    # thread); one query keeps at most QUERY_TERM_CONCURRENCY terms in flight
+    TERM_WORKERS = int(os.environ.get("TERM_WORKERS", 8))
+    QUERY_TERM_CONCURRENCY = int(os.environ.get("QUERY_TERM_CONCURRENCY", 4))
+
+    # Prefork server (serve_prefork.py): worker processes forked after the
+    # engine is loaded (0 = one per CPU), concurrent requests per worker,
+    # listen backlog of the shared socket (connections waiting for a free
+    # worker), and requests after which a worker is replaced (0 = never)
+    PREFORK_WORKERS = int(os.environ.get("PREFORK_WORKERS", 0))
+    PREFORK_THREADS = int(os.environ.get("PREFORK_THREADS", 4))
+    PREFORK_BACKLOG = int(os.environ.get("PREFORK_BACKLOG", 1024))
+    PREFORK_MAX_REQUESTS = int(os.environ.get("PREFORK_MAX_REQUESTS", 0))
+    
+    # Asyncio server (serve_async.py): threads running the awaited posting
+    # reads (they only wait on I/O, so many reads of all requests overlap) and
+    # threads running the scoring (0 = one per CPU)
+    ASYNC_IO_WORKERS = int(os.environ.get("ASYNC_IO_WORKERS", 64))
+    ASYNC_CPU_WORKERS = int(os.environ.get("ASYNC_CPU_WORKERS", 0))
+    # Largest request body it accepts, in bytes (larger ones get a 413
+    # before they are read)
+    ASYNC_MAX_BODY_BYTES = int(os.environ.get("ASYNC_MAX_BODY_BYTES", 1024 ** 2))
+    
+    # POST /search_batch: most queries per request (the decoded postings of
+    # all their distinct terms are held in memory while the batch is scored)
+    SEARCH_BATCH_MAX_QUERIES = int(os.environ.get("SEARCH_BATCH_MAX_QUERIES", 100))
+
+    # Local disk cache of GCS posting blocks, survives restarts. Empty dir disables it.
+    POSTING_CACHE_DIR = os.environ.get("POSTING_CACHE_DIR", "")
+    POSTING_CACHE_MAX_BYTES = int(os.environ.get("POSTING_CACHE_MAX_BYTES", 10 * 1024 ** 3))
+    POSTING_CACHE_BLOCK_BYTES = int(os.environ.get("POSTING_CACHE_BLOCK_BYTES", 1024 ** 2))
+
+    # Posting lists of at most this many bytes are stored inside the term
+    # dictionary (index.termdict) instead of the .bin files. 0 disables it.
+    INLINE_POSTINGS_MAX_BYTES = int(os.environ.get("INLINE_POSTINGS_MAX_BYTES", 64))
+
+    # Stage 1 top-K retrieval: 'exhaustive', 'accumulator' (float32 score array
+    # over dense doc ids, see scripts/remap_doc_ids.py), 'bmw' (Block-Max WAND), 'maxscore',
+    # 'impact' (precomputed quantized BM25, see scripts/build_impact_index.py)
+    # 'saat' (score-at-a-time over impact-ordered postings) or 'tiered'
+    # (champion tier of head terms first, see scripts/build_champion_index.py)
+    RETRIEVAL_STRATEGY = os.environ.get("RETRIEVAL_STRATEGY", "exhaustive")
+
+    # Stage 2: final score = FUSION_TEXT_WEIGHT * BM25 / max BM25 +
+    # FUSION_PAGERANK_WEIGHT * prior, the prior being log(PR + 1) scaled to
+    # [0, 1] by its range in the loaded PageRank data
+    FUSION_TEXT_WEIGHT = float(os.environ.get("FUSION_TEXT_WEIGHT", 0.85))
+    FUSION_PAGERANK_WEIGHT = float(os.environ.get("FUSION_PAGERANK_WEIGHT", 0.15))
+
+    # Bits per quantized BM25 impact (8 or 16) when building impact tables
+    IMPACT_BITS = int(os.environ.get("IMPACT_BITS", 16))
+
+    # Smallest top-2000 overlap with the float scorer that
+    # scripts/build_impact_index.py accepts for the single-term query of a
+    # frequent term
+    IMPACT_MIN_OVERLAP = float(os.environ.get("IMPACT_MIN_OVERLAP", 0.99))
+
+    # Terms with at least this df also get an impact-ordered posting copy for
+    # score-at-a-time retrieval ('saat'), and how many postings a 'saat' query
+    # may process before returning its best-so-far top-K (0 = until rank-safe)
+    IMPACT_ORDER_MIN_DF = int(os.environ.get("IMPACT_ORDER_MIN_DF", 10000))
+    SAAT_POSTINGS_BUDGET = int(os.environ.get("SAAT_POSTINGS_BUDGET", 0))
+
+    # Champion tier: terms with df >= CHAMPION_MIN_DF keep their CHAMPION_SIZE
+    # best postings by normalized BM25 + CHAMPION_PRIOR_WEIGHT * PageRank prior
+    # (FUSION_PAGERANK_WEIGHT / FUSION_TEXT_WEIGHT, the PageRank share of the
+    # final blend). Tiered queries the champions cannot answer are retried on
+    # the full lists with TIER_FULL_STRATEGY.
+    CHAMPION_MIN_DF = int(os.environ.get("CHAMPION_MIN_DF", 50000))
+    CHAMPION_SIZE = int(os.environ.get("CHAMPION_SIZE", 10000))
+    CHAMPION_PRIOR_WEIGHT = float(os.environ.get("CHAMPION_PRIOR_WEIGHT", 0.18))
+    TIER_FULL_STRATEGY = os.environ.get("TIER_FULL_STRATEGY", "exhaustive")
+
     # Legacy fields (kept for compatibility)
     POSTING_GCP = f'gs://{BUCKET_NAME}/{TEXT_INDEX_GCS}'
     ID_TO_TITLE_PARQUET_DIR = f"gs://{BUCKET_NAME}/{ID_TO_TITLE_PARQUET_DIR_GCS}/"
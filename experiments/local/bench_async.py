@@ -0,0 +1,154 @@
+import sys
+import os
+import time
+import signal
+import argparse
+import threading
+import subprocess
+import numpy as np
+
+# Add project root to path
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.append(PROJECT_ROOT)
+
+from config import Config
+from bench_prefork import load_queries, _load, _wait_ready
+
+SERVERS = ("threads", "async")
+
+
+def _threads(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("Threads:"):
+                return int(line.split()[1])
+    return 0
+
+
+def run_server(server, port, latency, cpu_workers):
+    """
+    Loads the engine with `latency` seconds added to every posting read and
+    serves it: 'threads' is the Flask app on the thread-per-request server of
+    search_frontend.py, 'async' the asyncio server of serve_async.py.
+    """
+    from bench_term_parallel import SlowReader
+    from Backend.ranking_v2 import _get_posting_source
+    from search_frontend import app, search_engine
+
+    search_engine.wait_until_loaded()
+    index = search_engine.text_index
+    base_dir, bucket_name = _get_posting_source("postings_gcp")
+    reader = index.posting_reader(base_dir, bucket_name)
+    index._readers[(str(base_dir), bucket_name)] = SlowReader(reader, latency)
+
+    if server == "threads":
+        from werkzeug.serving import run_simple
+        run_simple("127.0.0.1", port, app, threaded=True)
+    else:
+        from serve_async import AsyncSearchApp, serve
+        serve(AsyncSearchApp(search_engine, app, cpu_workers), "127.0.0.1", port)
+
+
+def run_benchmark(servers, latency, clients, duration, port, cpu_workers, max_queries, queries_path, start_timeout):
+    """
+    Starts each server with the same emulated posting read latency, replays
+    the queries from concurrent clients for a fixed time and reports
+    throughput, latency and the peak thread count of the server. Under
+    I/O-bound load the thread-per-request server holds a thread per query
+    waiting on its reads, which go through the bounded term pool; the asyncio
+    server awaits them, so the reads of all in-flight queries overlap.
+    Results are checked against the first server.
+
+    Args:
+        servers (list): Servers to compare ('threads', 'async').
+        latency (float): Seconds added to every posting read.
+        clients (int): Concurrent clients.
+        duration (float): Seconds of load per server.
+        port (int): Port of the server.
+        cpu_workers (int): Scoring threads of the asyncio server (0 = one per CPU).
+        max_queries (int): Optional limit on the number of queries.
+        queries_path (str): JSON file whose keys are the queries.
+        start_timeout (float): Seconds to wait for the server to load.
+    """
+    queries = load_queries(queries_path)
+    if max_queries:
+        queries = queries[:max_queries]
+    print(f"\nQueries: {len(queries)}, {latency * 1000:.1f} ms per posting read, "
+          f"{clients} clients, {duration:.0f} s per run, {os.cpu_count()} CPUs")
+
+    env = dict(os.environ, BACKGROUND_LOADING="0", LOCAL_READ_MODE="file")
+    reference = None
+    for server in servers:
+        proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", server, "--port", str(port),
+             "--latency", str(latency), "--cpu_workers", str(cpu_workers)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not _wait_ready(proc, port, start_timeout):
+                print(f"{server}: server did not start")
+                continue
+            _load(port, queries, clients, min(duration, 2))
+
+            peak_threads = [0]
+            done = threading.Event()
+
+            def _sample():
+                while not done.wait(0.05):
+                    peak_threads[0] = max(peak_threads[0], _threads(proc.pid))
+
+            sampler = threading.Thread(target=_sample)
+            sampler.start()
+            latencies, results, errors, wall = _load(port, queries, clients, duration)
+            done.set()
+            sampler.join()
+
+            if reference is None:
+                reference = results
+            mismatches = sum(results[q] != reference[q] for q in results if q in reference)
+            print(
+                f"{server:>8}: {len(latencies) / wall:.1f} queries/s, "
+                f"p50 {np.percentile(latencies, 50):.1f} ms, p95 {np.percentile(latencies, 95):.1f} ms, "
+                f"peak threads {peak_threads[0]}, errors {errors}, mismatches {mismatches}"
+            )
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            try:
+                proc.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the asyncio server with the thread-per-request server under I/O-bound load"
+    )
+    parser.add_argument("--servers", type=str, default="threads,async", help="Comma-separated servers to compare")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per posting read")
+    parser.add_argument("--clients", type=int, default=64, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per server")
+    parser.add_argument("--port", type=int, default=8766, help="Server port")
+    parser.add_argument(
+        "--cpu_workers", type=int, default=Config.ASYNC_CPU_WORKERS,
+        help="Scoring threads of the asyncio server (0 = one per CPU)",
+    )
+    parser.add_argument("--max_queries", type=int, default=None, help="Limit number of queries")
+    parser.add_argument(
+        "--queries", type=str, default=os.path.join(PROJECT_ROOT, "data", "queries_train.json"),
+        help="Queries JSON (keys are the queries)",
+    )
+    parser.add_argument("--start_timeout", type=float, default=600, help="Seconds to wait for the server")
+    parser.add_argument("--serve", choices=SERVERS, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        run_server(args.serve, args.port, args.latency, args.cpu_workers)
+    else:
+        run_benchmark(
+            [s for s in args.servers.split(",") if s in SERVERS], args.latency, args.clients,
+            args.duration, args.port, args.cpu_workers, args.max_queries, args.queries,
+            args.start_timeout,
+        )
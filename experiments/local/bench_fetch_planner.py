@@ -0,0 +1,181 @@
+import sys
+import os
+import json
+import time
+import argparse
+import threading
+import numpy as np
+
+# Add project root to path
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.append(PROJECT_ROOT)
+
+from inverted_index_gcp import InvertedIndex, register_bucket
+from Backend.posting_fetch import fetch_posting_bytes, plan_posting_reads
+from Backend.tokenizer import tokenize
+
+FAKE_BUCKET_NAME = "bench-fake-bucket"
+
+
+class FakeBlob:
+    """
+    Blob stand-in backed by a local file. Every request sleeps for the
+    bucket's latency (plus transfer time when a bandwidth is set).
+    """
+
+    def __init__(self, bucket, name):
+        self._bucket = bucket
+        self.name = name
+        self._path = os.path.join(bucket.root_dir, name)
+
+    def download_as_bytes(self, start=None, end=None):
+        start = 0 if start is None else start
+        with open(self._path, "rb") as f:
+            f.seek(start)
+            if end is None:
+                data = f.read()
+            else:
+                data = f.read(end - start + 1)
+        self._bucket._record(len(data))
+        return data
+
+    def open(self, mode="rb"):
+        self._bucket._record(0)
+        return open(self._path, mode)
+
+
+class FakeBucket:
+    """
+    Local stand-in for a GCS bucket, for benchmarking fetch strategies with
+    injected latency. Blob names are resolved relative to `root_dir`.
+
+    Attributes:
+        requests (int): Number of requests served so far.
+        bytes_read (int): Total bytes returned so far.
+    """
+
+    def __init__(self, root_dir, latency=0.03, bandwidth=None):
+        """
+        Args:
+            root_dir (str): Local directory standing in for the bucket root.
+            latency (float): Seconds added to every request.
+            bandwidth (float): Bytes per second, None for unlimited.
+        """
+        self.root_dir = root_dir
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.requests = 0
+        self.bytes_read = 0
+        self._lock = threading.Lock()
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def _record(self, n_bytes):
+        with self._lock:
+            self.requests += 1
+            self.bytes_read += n_bytes
+        delay = self.latency
+        if self.bandwidth:
+            delay += n_bytes / self.bandwidth
+        time.sleep(delay)
+
+
+def fetch_serial(index, terms, base_dir, bucket):
+    """
+    Baseline: one ranged request per posting file fragment, term after term.
+
+    Args:
+        index (InvertedIndex): The loaded index.
+        terms (list): Query terms.
+        base_dir (str): Blob prefix of the posting files.
+        bucket (FakeBucket): The bucket stand-in.
+
+    Returns:
+        dict: term -> posting list bytes.
+    """
+    result = {}
+    for term in terms:
+        parts = []
+        for f_name, offset, length in index.posting_ranges(term):
+            blob = bucket.blob(f"{base_dir}/{f_name}")
+            parts.append(blob.download_as_bytes(start=offset, end=offset + length - 1))
+        if parts:
+            result[term] = b"".join(parts)
+    return result
+
+
+def run_benchmark(data_dir, posting_dir, latency, bandwidth, num_queries):
+    """
+    Replays training queries against a latency-injected local bucket and
+    compares serial per-term fetches with the coalesced parallel planner.
+
+    Args:
+        data_dir (str): Local directory standing in for the bucket root.
+        posting_dir (str): Posting directory inside data_dir (e.g. 'postings_gcp').
+        latency (float): Seconds added to every request.
+        bandwidth (float): Bytes per second, None for unlimited.
+        num_queries (int): Number of training queries to replay.
+    """
+    index = InvertedIndex.read_index(os.path.join(data_dir, posting_dir), "index")
+    with open(os.path.join(PROJECT_ROOT, "data", "queries_train.json"), encoding="utf-8") as f:
+        queries = list(json.load(f).keys())[:num_queries]
+
+    bucket = FakeBucket(data_dir, latency=latency, bandwidth=bandwidth)
+    register_bucket(FAKE_BUCKET_NAME, bucket)
+
+    results = {}
+    for name in ["serial", "planner"]:
+        bucket.requests, bucket.bytes_read = 0, 0
+        latencies = []
+        for query in queries:
+            terms = [t for t in set(tokenize(query)) if t in index.df]
+            start = time.perf_counter()
+            if name == "serial":
+                fetch_serial(index, terms, posting_dir, bucket)
+            else:
+                fetch_posting_bytes(index, terms, posting_dir, FAKE_BUCKET_NAME)
+            latencies.append((time.perf_counter() - start) * 1000)
+        results[name] = {
+            "mean_ms": float(np.mean(latencies)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "requests": bucket.requests,
+            "bytes": bucket.bytes_read,
+        }
+
+    ranges = sum(
+        len(index.posting_ranges(t))
+        for q in queries
+        for t in set(tokenize(q))
+        if t in index.df
+    )
+    merged = sum(
+        len(plan_posting_reads(index, [t for t in set(tokenize(q)) if t in index.df]))
+        for q in queries
+    )
+
+    print(f"\nQueries: {len(queries)}, latency {latency * 1000:.0f} ms/request")
+    print(f"Ranges: {ranges} -> {merged} requests after coalescing")
+    for name, r in results.items():
+        print(
+            f"{name:>8}: mean {r['mean_ms']:.1f} ms, p95 {r['p95_ms']:.1f} ms, "
+            f"{r['requests']} requests, {r['bytes']:,} bytes"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark coalesced parallel posting fetches against a fake bucket"
+    )
+    parser.add_argument("--data_dir", type=str, default="data", help="Local bucket root")
+    parser.add_argument("--posting_dir", type=str, default="postings_gcp", help="Posting directory")
+    parser.add_argument("--latency", type=float, default=0.03, help="Seconds per request")
+    parser.add_argument("--bandwidth", type=float, default=None, help="Bytes per second")
+    parser.add_argument("--num_queries", type=int, default=30, help="Queries to replay")
+    args = parser.parse_args()
+
+    run_benchmark(
+        args.data_dir, args.posting_dir, args.latency, args.bandwidth, args.num_queries
+    )
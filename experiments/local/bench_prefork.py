@@ -0,0 +1,215 @@
+import sys
+import os
+import json
+import time
+import signal
+import argparse
+import threading
+import subprocess
+import urllib.parse
+import urllib.request
+import numpy as np
+
+# Add project root to path
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.append(PROJECT_ROOT)
+
+from config import Config
+
+
+def load_queries(path):
+    """
+    Loads queries from a JSON file.
+
+    Args:
+        path (str): Path to the queries JSON file.
+
+    Returns:
+        list: The query strings.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return list(json.load(f).keys())
+
+
+def _search(port, query, timeout=60):
+    url = f"http://127.0.0.1:{port}/search?" + urllib.parse.urlencode({"query": query})
+    with urllib.request.urlopen(url, timeout=timeout) as resp:
+        return json.loads(resp.read())
+
+
+def _wait_ready(proc, port, timeout):
+    """
+    Waits until the server answers a query.
+
+    Returns:
+        bool: True once it answers, False if it exited or timed out.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            return False
+        try:
+            _search(port, "ready", timeout=5)
+            return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+def _memory(pid):
+    """
+    Memory of one process from /proc/<pid>/smaps_rollup, in MB: rss, pss
+    (shared pages split between the processes mapping them) and private
+    (pages only this process maps, e.g. copied on write).
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def _children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def _load(port, queries, clients, duration):
+    """
+    Sends queries from `clients` threads for `duration` seconds.
+
+    Returns:
+        tuple: (latencies in ms, results per query, errors, wall time).
+    """
+    latencies, results = [], {}
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def _client(i):
+        own_latencies = []
+        j = i
+        while time.monotonic() < deadline:
+            query = queries[j % len(queries)]
+            j += 1
+            start = time.perf_counter()
+            try:
+                res = _search(port, query)
+            except OSError:
+                with lock:
+                    errors[0] += 1
+                continue
+            own_latencies.append((time.perf_counter() - start) * 1000)
+            with lock:
+                results[query] = res
+        with lock:
+            latencies.extend(own_latencies)
+
+    threads = [threading.Thread(target=_client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, results, errors[0], time.perf_counter() - start
+
+
+def run_benchmark(server, worker_counts, threads, clients, duration, port, max_queries, queries_path, start_timeout):
+    """
+    Starts the prefork server with each worker count, replays the queries
+    from concurrent clients for a fixed time and reports throughput,
+    latency and the memory of every worker: with the engine shared
+    copy-on-write, a worker's private memory should stay small and flat as
+    workers are added. Results are checked against the first run.
+
+    Args:
+        server (str): Server script, normally serve_prefork.py.
+        worker_counts (list): Worker counts to compare.
+        threads (int): Concurrent requests per worker.
+        clients (int): Concurrent clients.
+        duration (float): Seconds of load per worker count.
+        port (int): Port of the server.
+        max_queries (int): Optional limit on the number of queries.
+        queries_path (str): JSON file whose keys are the queries.
+        start_timeout (float): Seconds to wait for the server to load.
+    """
+    queries = load_queries(queries_path)
+    if max_queries:
+        queries = queries[:max_queries]
+    print(f"\nQueries: {len(queries)}, {clients} clients, {duration:.0f} s per run, {os.cpu_count()} CPUs")
+
+    reference = None
+    for workers in worker_counts:
+        proc = subprocess.Popen(
+            [sys.executable, server, "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--threads", str(threads)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not _wait_ready(proc, port, start_timeout):
+                print(f"{workers} workers: server did not start")
+                continue
+            # Warm up every worker's caches before measuring
+            _load(port, queries, clients, min(duration, 2))
+            latencies, results, errors, wall = _load(port, queries, clients, duration)
+            if reference is None:
+                reference = results
+            mismatches = sum(results[q] != reference[q] for q in results if q in reference)
+
+            worker_mem = [_memory(pid) for pid in _children(proc.pid)]
+            master_mem = _memory(proc.pid)
+            print(
+                f"{workers:>2} workers: {len(latencies) / wall:.1f} queries/s, "
+                f"p50 {np.percentile(latencies, 50):.1f} ms, p95 {np.percentile(latencies, 95):.1f} ms, "
+                f"errors {errors}, mismatches {mismatches}"
+            )
+            print(
+                f"    master RSS {master_mem['rss']:.0f} MB; per worker "
+                f"RSS {np.mean([m['rss'] for m in worker_mem]):.0f} MB, "
+                f"PSS {np.mean([m['pss'] for m in worker_mem]):.0f} MB, "
+                f"private {np.mean([m['private'] for m in worker_mem]):.0f} MB; "
+                f"total PSS {master_mem['pss'] + sum(m['pss'] for m in worker_mem):.0f} MB"
+            )
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            try:
+                proc.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark throughput and per-worker memory of the prefork server"
+    )
+    parser.add_argument(
+        "--server", type=str, default=os.path.join(PROJECT_ROOT, "serve_prefork.py"), help="Server script"
+    )
+    parser.add_argument("--workers", type=str, default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument(
+        "--threads", type=int, default=Config.PREFORK_THREADS, help="Concurrent requests per worker"
+    )
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per worker count")
+    parser.add_argument("--port", type=int, default=8765, help="Server port")
+    parser.add_argument("--max_queries", type=int, default=None, help="Limit number of queries")
+    parser.add_argument(
+        "--queries", type=str, default=os.path.join(PROJECT_ROOT, "data", "queries_train.json"),
+        help="Queries JSON (keys are the queries)",
+    )
+    parser.add_argument("--start_timeout", type=float, default=600, help="Seconds to wait for the server")
+    args = parser.parse_args()
+
+    run_benchmark(
+        args.server, [int(w) for w in args.workers.split(",")], args.threads, args.clients,
+        args.duration, args.port, args.max_queries, args.queries, args.start_timeout,
+    )
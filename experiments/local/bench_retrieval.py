@@ -0,0 +1,165 @@
+import sys
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+# Add project root to path
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.append(PROJECT_ROOT)
+
+from query_engine import SearchEngine
+from Backend.ranking_v2 import RETRIEVAL_STRATEGIES, retrieve_candidates, _get_posting_source
+
+
+class CountingReader:
+    """
+    Posting reader wrapper counting the reads and bytes that go through it.
+    """
+
+    def __init__(self, reader):
+        self._reader = reader
+        self.reads = 0
+        self.bytes_read = 0
+
+    def read(self, locs, n_bytes):
+        self.reads += 1
+        self.bytes_read += n_bytes
+        return self._reader.read(locs, n_bytes)
+
+    def close(self):
+        self._reader.close()
+
+
+def load_queries(path):
+    """
+    Loads queries from a JSON file.
+
+    Args:
+        path (str): Path to the queries JSON file.
+
+    Returns:
+        list: The query strings.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return list(json.load(f).keys())
+
+
+def run_benchmark(strategies, k, max_queries, repeat, queries_path):
+    """
+    Runs Stage 1 retrieval for every training query with each strategy,
+    checks that the top-k candidates match the exhaustive path, and reports
+    latency per strategy. Approximate strategies (e.g. 'impact') are also
+    reported as the mean overlap of their top-k with the exhaustive one.
+    Posting reads and bytes read per query (first run) are reported against
+    the exhaustive path; they are counted on the posting reader, so postings
+    fetched in batches from GCS are not included.
+
+    Args:
+        strategies (list): Strategy names from RETRIEVAL_STRATEGIES.
+        k (int): Number of candidates (2000 in SearchEngine.search).
+        max_queries (int): Optional limit on the number of queries.
+        repeat (int): Timed runs per query and strategy (the best one is kept).
+        queries_path (str): JSON file whose keys are the queries.
+    """
+    engine = SearchEngine()
+    queries = load_queries(queries_path)
+    if max_queries:
+        queries = queries[:max_queries]
+
+    index = engine.text_index
+    base_dir, bucket_name = _get_posting_source("postings_gcp")
+    reader = CountingReader(index.posting_reader(base_dir, bucket_name))
+    index._readers[(str(base_dir), bucket_name)] = reader
+
+    latencies = {s: [] for s in strategies}
+    io = {s: [] for s in strategies}
+    reference_io = []
+    mismatches = {s: 0 for s in strategies}
+    overlaps = {s: [] for s in strategies}
+
+    for query in queries:
+        tokens, token_weights = engine._query_terms(query)
+        if not tokens:
+            continue
+        reader.reads, reader.bytes_read = 0, 0
+        reference = retrieve_candidates(
+            tokens, engine.text_index, "postings_gcp", k, token_weights, "exhaustive"
+        )
+        reference_io.append((reader.reads, reader.bytes_read))
+        for strategy in strategies:
+            best = None
+            for run in range(repeat):
+                reader.reads, reader.bytes_read = 0, 0
+                start = time.perf_counter()
+                res = retrieve_candidates(
+                    tokens, engine.text_index, "postings_gcp", k, token_weights, strategy
+                )
+                elapsed = (time.perf_counter() - start) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+                if run == 0:
+                    io[strategy].append((reader.reads, reader.bytes_read))
+            latencies[strategy].append(best)
+            if [d for d, _ in res] != [d for d, _ in reference]:
+                mismatches[strategy] += 1
+            expected = {d for d, _ in reference}
+            overlaps[strategy].append(
+                len(expected & {d for d, _ in res}) / max(len(expected), 1)
+            )
+
+    print(f"\nQueries: {len(latencies[strategies[0]])}, k={k}")
+    for strategy in strategies:
+        lat = latencies[strategy]
+        print(
+            f"{strategy:>10}: mean {np.mean(lat):.1f} ms, p95 {np.percentile(lat, 95):.1f} ms, "
+            f"max {np.max(lat):.1f} ms, top-k mismatches vs exhaustive: {mismatches[strategy]}, "
+            f"overlap@k {np.mean(overlaps[strategy]):.4f}"
+        )
+
+    total_bytes = sum(n for _, n in reference_io)
+    for strategy in strategies:
+        reads = np.mean([r for r, _ in io[strategy]])
+        n_bytes = sum(n for _, n in io[strategy])
+        print(
+            f"{strategy:>10}: {reads:.1f} posting reads and "
+            f"{n_bytes / len(io[strategy]) / 1024:.1f} KiB per query, "
+            f"{n_bytes / max(total_bytes, 1):.1%} of the exhaustive bytes"
+        )
+
+    if "tiered" in strategies:
+        stats = engine.tier_stats()
+        print(
+            f"Champion tier (all timed runs): {stats['champion']} answered, "
+            f"{stats['fallback']} fell back to the full lists, "
+            f"{stats['no_head_terms']} without head terms, hit rate {stats['hit_rate']:.1%}"
+        )
+
+    stats = engine.inline_stats()
+    print(
+        f"Query terms (all runs): {stats['inline']} served from inline postings, "
+        f"{stats['file']} from posting files ({stats['inline_rate']:.1%} inline)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Stage 1 retrieval strategies")
+    parser.add_argument(
+        "--strategies",
+        nargs="+",
+        default=["exhaustive", "bmw", "maxscore"],
+        choices=sorted(RETRIEVAL_STRATEGIES),
+        help="Strategies to compare",
+    )
+    parser.add_argument("--k", type=int, default=2000, help="Number of candidates")
+    parser.add_argument("--max_queries", type=int, default=None, help="Limit number of queries")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query")
+    parser.add_argument(
+        "--queries", type=str, default=os.path.join(PROJECT_ROOT, "data", "queries_train.json"),
+        help="Queries JSON (keys are the queries)",
+    )
+    args = parser.parse_args()
+
+    run_benchmark(args.strategies, args.k, args.max_queries, args.repeat, args.queries)
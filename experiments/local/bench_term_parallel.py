@@ -0,0 +1,143 @@
+import sys
+import os
+import json
+import time
+import argparse
+import threading
+import numpy as np
+
+# Add project root to path
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.append(PROJECT_ROOT)
+
+from config import Config
+from query_engine import SearchEngine
+from Backend.ranking_v2 import retrieve_candidates, _get_posting_source
+
+
+class SlowReader:
+    """
+    Posting reader wrapper that sleeps `latency` seconds per read, standing in
+    for a cold disk or per-term remote reads.
+    """
+
+    def __init__(self, reader, latency):
+        self._reader = reader
+        self._latency = latency
+
+    def read(self, locs, n_bytes):
+        time.sleep(self._latency)
+        return self._reader.read(locs, n_bytes)
+
+    def close(self):
+        self._reader.close()
+
+
+def load_queries(path):
+    """
+    Loads queries from a JSON file.
+
+    Args:
+        path (str): Path to the queries JSON file.
+
+    Returns:
+        list: The query strings.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return list(json.load(f).keys())
+
+
+def _replay(engine, queries, k, strategy, latencies, results):
+    for query in queries:
+        tokens, token_weights = engine._query_terms(query)
+        if not tokens:
+            continue
+        start = time.perf_counter()
+        res = retrieve_candidates(
+            tokens, engine.text_index, "postings_gcp", k, token_weights, strategy
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        results[query] = [d for d, _ in res]
+
+
+def run_benchmark(latency, workers, concurrency, clients, k, strategy, max_queries, queries_path):
+    """
+    Replays the training queries (with their expansion terms) with per-term
+    reads on the query thread, then on the term pool, once with a single
+    client and once with `clients` concurrent clients, and checks that both
+    modes return the same candidates.
+
+    Args:
+        latency (float): Seconds added to every posting read.
+        workers (int): Config.TERM_WORKERS for the parallel run.
+        concurrency (int): Config.QUERY_TERM_CONCURRENCY for the parallel run.
+        clients (int): Concurrent clients in the second phase.
+        k (int): Number of candidates.
+        strategy (str): Stage 1 strategy.
+        max_queries (int): Optional limit on the number of queries.
+        queries_path (str): JSON file whose keys are the queries.
+    """
+    engine = SearchEngine()
+    queries = load_queries(queries_path)
+    if max_queries:
+        queries = queries[:max_queries]
+
+    index = engine.text_index
+    base_dir, bucket_name = _get_posting_source("postings_gcp")
+    reader = index.posting_reader(base_dir, bucket_name)
+    index._readers[(str(base_dir), bucket_name)] = SlowReader(reader, latency)
+
+    modes = [("serial", 1, 1), ("parallel", workers, concurrency)]
+    reference = None
+    print(f"\nQueries: {len(queries)}, {latency * 1000:.1f} ms per posting read, strategy {strategy}")
+    for name, n_workers, limit in modes:
+        Config.TERM_WORKERS, Config.QUERY_TERM_CONCURRENCY = n_workers, limit
+        for n_clients in (1, clients):
+            latencies, results = [], {}
+            threads = [
+                threading.Thread(
+                    target=_replay, args=(engine, queries, k, strategy, latencies, results)
+                )
+                for _ in range(n_clients)
+            ]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            wall = time.perf_counter() - start
+            if reference is None:
+                reference = results
+            mismatches = sum(results[q] != reference[q] for q in reference)
+            print(
+                f"{name:>8} (workers {n_workers}, {limit}/query), {n_clients} client(s): "
+                f"mean {np.mean(latencies):.1f} ms, p95 {np.percentile(latencies, 95):.1f} ms, "
+                f"{len(latencies) / wall:.1f} queries/s, mismatches {mismatches}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark per-term parallel posting reads and scoring"
+    )
+    parser.add_argument("--latency", type=float, default=0.005, help="Seconds per posting read")
+    parser.add_argument("--workers", type=int, default=Config.TERM_WORKERS, help="Term pool size")
+    parser.add_argument(
+        "--concurrency", type=int, default=Config.QUERY_TERM_CONCURRENCY, help="Terms in flight per query"
+    )
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent clients")
+    parser.add_argument("--k", type=int, default=2000, help="Number of candidates")
+    parser.add_argument("--strategy", type=str, default="exhaustive", help="Stage 1 strategy")
+    parser.add_argument("--max_queries", type=int, default=None, help="Limit number of queries")
+    parser.add_argument(
+        "--queries", type=str, default=os.path.join(PROJECT_ROOT, "data", "queries_train.json"),
+        help="Queries JSON (keys are the queries)",
+    )
+    args = parser.parse_args()
+
+    run_benchmark(
+        args.latency, args.workers, args.concurrency, args.clients,
+        args.k, args.strategy, args.max_queries, args.queries,
+    )
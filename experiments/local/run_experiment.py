@@ -12,6 +12,7 @@ sys.path.append(
     os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 )
 
+from config import Config
 from query_engine import SearchEngine
 
 
@@ -76,7 +77,41 @@ def calculate_metrics(relevant_ids, retrieved_ids, k=10):
     return p_at_k, ap_at_k
 
 
-def run_experiment(experiment_name, seed, split_ratio, max_queries, output_dir):
+def run_queries(engine, queries, batch=False):
+    """
+    Runs the queries one by one, or in batches of Config.SEARCH_BATCH_MAX_QUERIES
+    through SearchEngine.search_many (each distinct term of a batch is read once).
+
+    Args:
+        engine (SearchEngine): The engine.
+        queries (list): Query strings.
+        batch (bool): Use search_many.
+
+    Returns:
+        list: (search results, latency in ms) per query; in batch mode the
+              latency is the batch time divided by its number of queries.
+    """
+    if not batch:
+        runs = []
+        for query_text in queries:
+            start_time = time.time()
+            # Search returns list of (doc_id, title)
+            search_res = engine.search(query_text)
+            runs.append((search_res, (time.time() - start_time) * 1000))
+        return runs
+
+    runs = []
+    size = max(Config.SEARCH_BATCH_MAX_QUERIES, 1)
+    for i in range(0, len(queries), size):
+        chunk = queries[i:i + size]
+        start_time = time.time()
+        batch_res = engine.search_many(chunk)
+        latency = (time.time() - start_time) * 1000 / len(chunk)
+        runs.extend((search_res, latency) for search_res in batch_res)
+    return runs
+
+
+def run_experiment(experiment_name, seed, split_ratio, max_queries, output_dir, batch=False):
     """
     Runs a complete local experiment:
     1. Initializes the SearchEngine.
@@ -91,6 +126,7 @@ def run_experiment(experiment_name, seed, split_ratio, max_queries, output_dir):
         split_ratio (float): Ratio to split train/test (e.g. 0.8).
         max_queries (int): Optional limit on number of queries to run (for smoke tests).
         output_dir (str): Base directory for saving results.
+        batch (bool): Run the queries in batches through SearchEngine.search_many.
     """
     print(f"Starting Experiment: {experiment_name}")
     print(f"Seed: {seed}, Split: {split_ratio}")
@@ -133,14 +169,9 @@ def run_experiment(experiment_name, seed, split_ratio, max_queries, output_dir):
     p10_list = []
     ap10_list = []
 
-    print("Running queries...")
-    for query_text, relevant_ids in target_queries:
-        start_time = time.time()
-        # Search returns list of (doc_id, title)
-        search_res = engine.search(query_text)
-        end_time = time.time()
-
-        latency = (end_time - start_time) * 1000  # ms
+    print("Running queries" + (" in batches..." if batch else "..."))
+    runs = run_queries(engine, [query_text for query_text, _ in target_queries], batch)
+    for (query_text, relevant_ids), (search_res, latency) in zip(target_queries, runs):
         retrieved_ids = [str(doc_id) for doc_id, _ in search_res]
 
         p10, ap10 = calculate_metrics(relevant_ids, retrieved_ids, k=10)
@@ -174,6 +205,7 @@ def run_experiment(experiment_name, seed, split_ratio, max_queries, output_dir):
         "mean_latency": mean_latency,
         "seed": seed,
         "split_ratio": split_ratio,
+        "batch": batch,
     }
 
     # 5. Save
@@ -195,7 +227,7 @@ def run_experiment(experiment_name, seed, split_ratio, max_queries, output_dir):
         f.write(f"# Experiment Log: {experiment_name}\n\n")
         f.write(f"- Date: {metrics['timestamp']}\n")
         f.write(f"- Seed: {seed}\n")
-        f.write(f"- Queries Run: {len(results)}\n")
+        f.write(f"- Queries Run: {len(results)}{' (batched)' if batch else ''}\n")
         f.write(f"- Mean P@10: **{mean_p10:.4f}**\n")
         f.write(f"- Mean AP@10: {mean_ap10:.4f}\n")
         f.write(f"- Mean Latency: {mean_latency:.2f} ms\n")
@@ -224,6 +256,11 @@ if __name__ == "__main__":
         default=None,
         help="Limit number of queries for testing",
     )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Run the queries in batches through SearchEngine.search_many",
+    )
     parser.add_argument(
         "--output_dir",
         type=str,
@@ -244,4 +281,5 @@ if __name__ == "__main__":
         args.split_ratio,
         args.max_queries,
         args.output_dir,
+        args.batch,
     )
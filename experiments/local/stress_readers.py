@@ -0,0 +1,193 @@
+import sys
+import os
+import time
+import random
+import argparse
+import threading
+import numpy as np
+
+# Add project root to path
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+sys.path.append(PROJECT_ROOT)
+
+from inverted_index_gcp import (
+    InvertedIndex,
+    MultiFileReader,
+    MmapMultiFileReader,
+    register_bucket,
+)
+from Backend.ranking_v2 import retrieve_candidates
+from bench_fetch_planner import FakeBucket
+
+FAKE_BUCKET_NAME = "stress-fake-bucket"
+
+
+def _run_threads(n_threads, target):
+    """
+    Runs target(thread_no) on `n_threads` threads started together.
+
+    Returns:
+        float: Wall time in seconds.
+    """
+    barrier = threading.Barrier(n_threads)
+
+    def _run(i):
+        barrier.wait()
+        target(i)
+
+    threads = [threading.Thread(target=_run, args=(i,)) for i in range(n_threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def stress_reader(index, reader, terms, expected, n_threads, reads_per_thread):
+    """
+    Reads random posting lists through one shared reader from many threads
+    and compares every result with the single-threaded reference.
+
+    Returns:
+        tuple: (wrong results, exceptions, reads per second).
+    """
+    errors = {"wrong": 0, "exceptions": 0}
+    lock = threading.Lock()
+
+    def _work(i):
+        rnd = random.Random(i)
+        wrong = exceptions = 0
+        for _ in range(reads_per_thread):
+            term = rnd.choice(terms)
+            try:
+                b = reader.read(index.posting_locs[term], index.posting_nbytes(term))
+                doc_ids, tfs = index.decode_posting_bytes(term, b)
+            except Exception:
+                exceptions += 1
+                continue
+            ref_ids, ref_tfs = expected[term]
+            if not (np.array_equal(doc_ids, ref_ids) and np.array_equal(tfs, ref_tfs)):
+                wrong += 1
+        with lock:
+            errors["wrong"] += wrong
+            errors["exceptions"] += exceptions
+
+    wall = _run_threads(n_threads, _work)
+    return errors["wrong"], errors["exceptions"], n_threads * reads_per_thread / wall
+
+
+def stress_queries(index, index_dir, terms, n_threads, queries_per_thread, k):
+    """
+    Runs Stage 1 retrieval for random queries from many threads against the
+    same index (and its shared readers) and compares every result with a
+    single-threaded reference.
+
+    Returns:
+        tuple: (wrong results, exceptions, queries per second).
+    """
+    rnd = random.Random(0)
+    queries = [rnd.sample(terms, rnd.randint(1, 4)) for _ in range(50)]
+    posting_dir = os.path.basename(os.path.normpath(index_dir))
+    expected = [retrieve_candidates(q, index, posting_dir, k) for q in queries]
+    errors = {"wrong": 0, "exceptions": 0}
+    lock = threading.Lock()
+
+    def _work(i):
+        rnd = random.Random(i)
+        wrong = exceptions = 0
+        for _ in range(queries_per_thread):
+            j = rnd.randrange(len(queries))
+            try:
+                res = retrieve_candidates(queries[j], index, posting_dir, k)
+            except Exception:
+                exceptions += 1
+                continue
+            if res != expected[j]:
+                wrong += 1
+        with lock:
+            errors["wrong"] += wrong
+            errors["exceptions"] += exceptions
+
+    wall = _run_threads(n_threads, _work)
+    return errors["wrong"], errors["exceptions"], n_threads * queries_per_thread / wall
+
+
+def run_stress(index_dir, name, n_threads, reads_per_thread, max_open_files, k):
+    """
+    Stress-tests the posting readers of a local index from many threads: the
+    pread file reader (with few descriptors, so they are evicted while in
+    use), the memory-mapped reader, the GCS reader against a local fake
+    bucket, and finally concurrent queries through the index's own readers.
+
+    Args:
+        index_dir (str): Local index directory, e.g. 'data/postings_gcp'.
+        name (str): Index name.
+        n_threads (int): Concurrent threads.
+        reads_per_thread (int): Posting list reads (or queries / 10) per thread.
+        max_open_files (int): Descriptor limit of the file reader.
+        k (int): Candidates per query.
+    """
+    index = InvertedIndex.read_index(index_dir, name)
+    terms = [
+        t for t in index.posting_locs
+        if index.inline_posting_bytes(t) is None and index.posting_locs[t]
+    ]
+    if not terms:
+        print("No posting lists outside the term dictionary to read.")
+        return False
+    reference = MultiFileReader(index_dir)
+    expected = {
+        t: index.decode_posting_bytes(t, reference.read(index.posting_locs[t], index.posting_nbytes(t)))
+        for t in terms
+    }
+    reference.close()
+
+    bucket_root, posting_dir = os.path.split(os.path.normpath(index_dir))
+    register_bucket(FAKE_BUCKET_NAME, FakeBucket(bucket_root or ".", latency=0))
+    readers = {
+        f"file (pread, {max_open_files} fds)": MultiFileReader(index_dir, max_open_files=max_open_files),
+        "mmap": MmapMultiFileReader(index_dir),
+        "gcs (fake bucket)": MultiFileReader(posting_dir, FAKE_BUCKET_NAME),
+    }
+
+    print(f"\n{len(terms)} posting lists, {n_threads} threads x {reads_per_thread} reads")
+    failed = False
+    for label, reader in readers.items():
+        wrong, exceptions, rate = stress_reader(
+            index, reader, terms, expected, n_threads, reads_per_thread
+        )
+        reader.close()
+        failed |= bool(wrong or exceptions)
+        print(f"{label:>24}: {rate:,.0f} reads/s, {wrong} wrong, {exceptions} exceptions")
+
+    # retrieve_candidates reads local postings from data/<posting_dir> only
+    if os.path.normpath(index_dir) == os.path.join("data", posting_dir):
+        wrong, exceptions, rate = stress_queries(
+            index, index_dir, terms, n_threads, max(reads_per_thread // 10, 1), k
+        )
+        failed |= bool(wrong or exceptions)
+        print(f"{'queries (shared index)':>24}: {rate:,.0f} queries/s, {wrong} wrong, {exceptions} exceptions")
+    else:
+        print("Query stress skipped: run from the directory holding data/<posting_dir>.")
+    index.close_readers()
+    print("FAILED" if failed else "OK")
+    return not failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Stress-test concurrent posting reads against one index"
+    )
+    parser.add_argument("--index_dir", type=str, default="data/postings_gcp", help="Local index directory")
+    parser.add_argument("--name", type=str, default="index", help="Index name")
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent threads")
+    parser.add_argument("--reads", type=int, default=2000, help="Reads per thread")
+    parser.add_argument("--max_open_files", type=int, default=4, help="Descriptor limit of the file reader")
+    parser.add_argument("--k", type=int, default=100, help="Candidates per query")
+    args = parser.parse_args()
+
+    ok = run_stress(args.index_dir, args.name, args.threads, args.reads, args.max_open_files, args.k)
+    sys.exit(0 if ok else 1)
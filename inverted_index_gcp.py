@@ -3,12 +3,21 @@ from collections import Counter, OrderedDict
 import itertools
 from itertools import islice, count, groupby
 import pandas as pd
+import numpy as np
 import os
 import re
 from operator import itemgetter
 from time import time
 from pathlib import Path
 import pickle
+import mmap
+import threading
+import io
+import json
+import tempfile
+import requests
+from collections.abc import Mapping
+from functools import lru_cache
 from google.cloud import storage
 from collections import defaultdict
 from contextlib import closing
@@ -23,17 +32,104 @@ except ImportError:
         class Config:
             PROJECT_ID = 'extreme-wind-480314-f5'
             KEY_FILE_PATH = 'extreme-wind-480314-f5-e88363037125.json'
+            LOCAL_READ_MODE = 'mmap'
+            GCS_POOL_SIZE = 32
+            MAX_OPEN_POSTING_FILES = 256
+            POSTING_CACHE_DIR = ''
+            POSTING_CACHE_MAX_BYTES = 10 * 1024 ** 3
+            POSTING_CACHE_BLOCK_BYTES = 1024 ** 2
+            INLINE_POSTINGS_MAX_BYTES = 64
 
 PROJECT_ID = Config.PROJECT_ID
+# 'mmap' serves local posting lists from memory-mapped blocks, 'file' uses
+# the plain open/seek/read path of MultiFileReader.
+LOCAL_READ_MODE = getattr(Config, 'LOCAL_READ_MODE', 'mmap')
+# Keep-alive HTTP connections kept by the shared storage client.
+GCS_POOL_SIZE = getattr(Config, 'GCS_POOL_SIZE', 32)
+# File handles / blob readers a MultiFileReader keeps open (LRU).
+MAX_OPEN_POSTING_FILES = getattr(Config, 'MAX_OPEN_POSTING_FILES', 256)
 
-def get_bucket(bucket_name):
+# Local read-through cache of GCS posting blocks (disabled when the dir is empty).
+POSTING_CACHE_DIR = getattr(Config, 'POSTING_CACHE_DIR', '')
+POSTING_CACHE_MAX_BYTES = getattr(Config, 'POSTING_CACHE_MAX_BYTES', 10 * 1024 ** 3)
+POSTING_CACHE_BLOCK_BYTES = getattr(Config, 'POSTING_CACHE_BLOCK_BYTES', 1024 ** 2)
+# Posting lists up to this size are embedded in the term dictionary.
+INLINE_POSTINGS_MAX_BYTES = getattr(Config, 'INLINE_POSTINGS_MAX_BYTES', 64)
+
+_STORAGE_CLIENT = None
+_BUCKETS = {}
+# Names of the buckets set with register_bucket (kept across fork)
+_REGISTERED_BUCKETS = set()
+_CLIENT_LOCK = threading.Lock()
+
+def _make_storage_client():
     if os.path.exists(Config.KEY_FILE_PATH):
-        return storage.Client.from_service_account_json(Config.KEY_FILE_PATH).bucket(bucket_name)
+        return storage.Client.from_service_account_json(Config.KEY_FILE_PATH)
     # Fallback to anonymous client if key is missing and default creds might fail
     try:
-        return storage.Client.create_anonymous_client().bucket(bucket_name)
+        return storage.Client.create_anonymous_client()
     except:
-        return storage.Client(project=PROJECT_ID).bucket(bucket_name)
+        return storage.Client(project=PROJECT_ID)
+
+def _mount_connection_pool(client, pool_size):
+    """ Widens the keep-alive connection pool of the client's HTTP session so
+        concurrent posting reads reuse connections instead of reconnecting.
+    """
+    http = getattr(client, '_http', None)
+    if http is not None and hasattr(http, 'mount'):
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size,
+                                                pool_maxsize=pool_size)
+        http.mount('https://', adapter)
+
+def get_storage_client():
+    """ Returns the process-wide storage client, creating it on first use. """
+    global _STORAGE_CLIENT
+    with _CLIENT_LOCK:
+        if _STORAGE_CLIENT is None:
+            _STORAGE_CLIENT = _make_storage_client()
+            _mount_connection_pool(_STORAGE_CLIENT, GCS_POOL_SIZE)
+        return _STORAGE_CLIENT
+
+def get_bucket(bucket_name):
+    client = get_storage_client()
+    with _CLIENT_LOCK:
+        if bucket_name not in _BUCKETS:
+            _BUCKETS[bucket_name] = client.bucket(bucket_name)
+        return _BUCKETS[bucket_name]
+
+def register_bucket(bucket_name, bucket):
+    """ Makes get_bucket(bucket_name) return `bucket`, e.g. a local stand-in
+        with the same blob interface for benchmarks.
+    """
+    with _CLIENT_LOCK:
+        _BUCKETS[bucket_name] = bucket
+        _REGISTERED_BUCKETS.add(bucket_name)
+
+def close_storage_client():
+    """ Closes the HTTP session of the shared storage client (shutdown hook). """
+    global _STORAGE_CLIENT
+    with _CLIENT_LOCK:
+        if _STORAGE_CLIENT is not None:
+            http = getattr(_STORAGE_CLIENT, '_http_internal', None)
+            if http is not None and hasattr(http, 'close'):
+                http.close()
+        _STORAGE_CLIENT = None
+        _BUCKETS.clear()
+        _REGISTERED_BUCKETS.clear()
+
+def _reset_after_fork():
+    """ Drops the storage client in a forked child: its pooled connections
+        belong to the parent. The child opens its own on first use.
+    """
+    global _STORAGE_CLIENT, _CLIENT_LOCK
+    _CLIENT_LOCK = threading.Lock()
+    _STORAGE_CLIENT = None
+    for bucket_name in list(_BUCKETS):
+        if bucket_name not in _REGISTERED_BUCKETS:
+            del _BUCKETS[bucket_name]
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
 def _open(path, mode, bucket=None):
     if bucket is None:
@@ -73,42 +169,1176 @@ class MultiFileWriter:
     def close(self):
         self._f.close()
 
+class BlockCache:
+    """ Persistent, size-bounded read-through cache of remote file blocks.
+        Files are split into aligned blocks of `block_bytes`; each cached block
+        is one file under `cache_dir` keyed by (file name, file version, block
+        offset), the version being the blob generation, so the blocks of a
+        file rewritten under the same name are never served for the new one.
+        Blocks are written atomically (temp file + rename) and evicted least
+        recently used first once the cache exceeds `max_bytes`. Recency is
+        kept in the file mtimes, so a restarted process picks up the warm
+        cache as is. The directory can be shared by several processes (e.g.
+        the serve_prefork workers): a lookup reads whatever block file
+        exists, whoever wrote it, and the size is taken from a rescan of the
+        directory before evicting and after every `max_bytes` / 16 written.
+    """
+    def __init__(self, cache_dir, max_bytes=None, block_bytes=None):
+        self._dir = Path(cache_dir)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes or POSTING_CACHE_MAX_BYTES
+        self._block_bytes = block_bytes or POSTING_CACHE_BLOCK_BYTES
+        self._scan_bytes = max(self._max_bytes // 16, self._block_bytes)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # block file name -> size, oldest first
+        self._size = 0
+        self._written = 0  # bytes written since the last scan
+        self.hits = 0
+        self.misses = 0
+        with self._lock:
+            self._scan()
+            self._evict()
+
+    def _scan(self):
+        # caller holds self._lock; other processes may have written or
+        # evicted blocks since the last scan
+        blocks = []
+        for p in self._dir.glob('*.blk'):
+            try:
+                blocks.append((p.stat(), p.name))
+            except OSError:
+                pass
+        self._entries = OrderedDict(
+            (name, stat.st_size)
+            for stat, name in sorted(blocks, key=lambda x: x[0].st_mtime_ns))
+        self._size = sum(self._entries.values())
+        self._written = 0
+
+    def _evict(self):
+        # caller holds self._lock
+        while self._size > self._max_bytes and len(self._entries) > 1:
+            old_name, old_size = self._entries.popitem(last=False)
+            self._size -= old_size
+            try:
+                os.remove(self._dir / old_name)
+            except OSError:
+                pass
+
+    def _block_name(self, f_name, version, block_offset):
+        safe_name = f_name.replace('/', '__')
+        return f'{safe_name}.{version}.{block_offset:010d}.{self._block_bytes}.blk'
+
+    def _get(self, name):
+        path = self._dir / name
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            # not cached, or evicted by another process sharing the directory
+            with self._lock:
+                self._size -= self._entries.pop(name, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            # blocks written by another process are adopted on first use
+            self._size += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            self.hits += 1
+        return data
+
+    def _put(self, name, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._dir / name)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self._size += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            self._written += len(data)
+            if self._size > self._max_bytes or self._written >= self._scan_bytes:
+                self._scan()
+                self._evict()
+
+    def read(self, f_name, offset, length, fetch, version=None):
+        """ Returns `length` bytes of version `version` of `f_name` starting at
+            `offset`. Missing blocks are downloaded with fetch(start, end) ->
+            bytes of [start, end), one call per run of consecutive missing
+            blocks, and then cached.
+        """
+        bs = self._block_bytes
+        first = offset // bs * bs
+        block_offsets = range(first, offset + length, bs)
+        blocks = {o: self._get(self._block_name(f_name, version, o)) for o in block_offsets}
+        missing = [o for o in block_offsets if blocks[o] is None]
+        while missing:
+            run_start = run_end = missing.pop(0)
+            while missing and missing[0] == run_end + bs:
+                run_end = missing.pop(0)
+            data = fetch(run_start, run_end + bs)
+            for o in range(run_start, run_end + bs, bs):
+                block = data[o - run_start:o - run_start + bs]
+                blocks[o] = block
+                self._put(self._block_name(f_name, version, o), block)
+        data = b''.join(blocks[o] for o in block_offsets)
+        return data[offset - first:offset - first + length]
+
+    def stats(self):
+        """ Hit/miss counters and current size of the cache. """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'blocks': len(self._entries), 'bytes': self._size}
+
+_BLOCK_CACHE = None
+
+def get_block_cache():
+    """ Returns the process-wide BlockCache, or None when POSTING_CACHE_DIR is
+        not set.
+    """
+    global _BLOCK_CACHE
+    if not POSTING_CACHE_DIR:
+        return None
+    with _CLIENT_LOCK:
+        if _BLOCK_CACHE is None:
+            _BLOCK_CACHE = BlockCache(POSTING_CACHE_DIR)
+        return _BLOCK_CACHE
+
+_BLOB_GENERATIONS = {}
+
+def _blob_generation(bucket, blob_name):
+    """ Generation of a blob, looked up once per process. None for buckets
+        without generations (e.g. local stand-ins, see register_bucket).
+    """
+    key = (getattr(bucket, 'name', None), blob_name)
+    with _CLIENT_LOCK:
+        if key in _BLOB_GENERATIONS:
+            return _BLOB_GENERATIONS[key]
+    get_blob = getattr(bucket, 'get_blob', None)
+    blob = None if get_blob is None else get_blob(blob_name)
+    generation = getattr(blob, 'generation', None)
+    with _CLIENT_LOCK:
+        _BLOB_GENERATIONS[key] = generation
+    return generation
+
+def read_blob_range(bucket, blob_name, offset, length):
+    """ Reads `length` bytes of a blob starting at `offset`, through the local
+        block cache when one is configured. Cached reads are pinned to the
+        blob generation the cached blocks are keyed by.
+    """
+    cache = get_block_cache()
+    generation = None if cache is None else _blob_generation(bucket, blob_name)
+
+    def fetch(start, end):
+        if generation is None:
+            blob = bucket.blob(blob_name)
+        else:
+            blob = bucket.blob(blob_name, generation=generation)
+        # `end` is inclusive in the GCS API
+        return blob.download_as_bytes(start=start, end=end - 1)
+    if cache is None:
+        return fetch(offset, offset + length)
+    return cache.read(blob_name, offset, length, fetch, generation)
+
 class MultiFileReader:
-    """ Sequential binary reader of multiple files of up to BLOCK_SIZE each. """
-    def __init__(self, base_dir, bucket_name=None):
+    """ Positional binary reader of multiple files of up to BLOCK_SIZE each,
+        safe to share between any number of threads. Local files are read
+        with os.pread on cached descriptors, so reads carry no file position
+        and never wait for each other; GCS blobs are read with stateless
+        ranged downloads (read_blob_range). At most `max_open_files`
+        descriptors are kept; the least recently used one is closed once no
+        read is using it.
+    """
+    def __init__(self, base_dir, bucket_name=None, max_open_files=None):
         self._base_dir = base_dir # Keep as string or Path depending on usage
         self._bucket = None if bucket_name is None else get_bucket(bucket_name)
-        self._open_files = {}
+        self._max_open_files = max_open_files or MAX_OPEN_POSTING_FILES
+        self._fds = OrderedDict()  # f_name -> _CachedFd, least recently used first
+        # Guards the descriptor cache only; no I/O happens under it
+        self._lock = threading.Lock()
+
+    def _acquire_fd(self, f_name):
+        with self._lock:
+            entry = self._fds.get(f_name)
+            if entry is not None:
+                self._fds.move_to_end(f_name)
+                entry.users += 1
+                return entry
+        # Open outside the lock; a concurrent open of the same file loses below
+        fd = os.open(f_name, os.O_RDONLY)
+        with self._lock:
+            entry = self._fds.get(f_name)
+            if entry is None:
+                entry = _CachedFd(fd)
+                self._fds[f_name] = entry
+                fd = None
+                while len(self._fds) > self._max_open_files:
+                    _, lru = self._fds.popitem(last=False)
+                    lru.evicted = True
+                    lru.close_if_unused()
+            entry.users += 1
+        if fd is not None:
+            os.close(fd)
+        return entry
+
+    def _release_fd(self, entry):
+        with self._lock:
+            entry.users -= 1
+            entry.close_if_unused()
+
+    def _pread(self, f_name, offset, n_read):
+        entry = self._acquire_fd(f_name)
+        try:
+            chunks = []
+            while n_read > 0:
+                chunk = os.pread(entry.fd, n_read, offset)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                offset += len(chunk)
+                n_read -= len(chunk)
+            return chunks[0] if len(chunks) == 1 else b''.join(chunks)
+        finally:
+            self._release_fd(entry)
 
     def read(self, locs, n_bytes):
         b = []
         for f_name, offset in locs:
+            n_read = min(n_bytes, BLOCK_SIZE - offset)
+            n_bytes -= n_read
             if self._bucket:
                 # Force forward slashes for GCS
                 f_name = f"{self._base_dir}/{f_name}"
+                b.append(read_blob_range(self._bucket, f_name, offset, n_read))
             else:
                 f_name = str(Path(self._base_dir) / f_name)
-                
-            if f_name not in self._open_files:
-                self._open_files[f_name] = _open(f_name, 'rb', self._bucket)
-            f = self._open_files[f_name]
-            f.seek(offset)
+                b.append(self._pread(f_name, offset, n_read))
+        return b[0] if len(b) == 1 else b''.join(b)
+
+    def close(self):
+        with self._lock:
+            for entry in self._fds.values():
+                entry.evicted = True
+                entry.close_if_unused()
+            self._fds.clear()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False 
+
+class _CachedFd:
+    """ A descriptor of MultiFileReader with the number of reads using it;
+        closed when it is evicted and no longer used (callers hold the lock).
+    """
+    __slots__ = ('fd', 'users', 'evicted')
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.users = 0
+        self.evicted = False
+
+    def close_if_unused(self):
+        if self.evicted and self.users == 0 and self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+class MmapMultiFileReader:
+    """ Zero-copy reader of local files of up to BLOCK_SIZE each.
+        Every `*.bin` block under `base_dir` is memory-mapped once, and reads
+        return `memoryview` slices into the mappings. Bytes are only copied when
+        a posting list crosses a BLOCK_SIZE boundary and has to be stitched.
+    """
+    def __init__(self, base_dir):
+        self._base_dir = base_dir
+        self._maps = {}
+        self._views = {}
+        # Serializes mapping files written after the reader was opened
+        self._lock = threading.Lock()
+        for p in sorted(Path(base_dir).glob('*.bin')):
+            self._map(str(p))
+
+    def _map(self, f_name):
+        with self._lock:
+            view = self._views.get(f_name)
+            if view is None:
+                view = self._map_file(f_name)
+            return view
+
+    def _map_file(self, f_name):
+        # caller holds self._lock
+        with open(f_name, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # mmap refuses empty files; an empty view reads the same.
+                m = b''
+            else:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[f_name] = m
+        self._views[f_name] = memoryview(m)
+        return self._views[f_name]
+
+    def read(self, locs, n_bytes):
+        b = []
+        for f_name, offset in locs:
+            f_name = str(Path(self._base_dir) / f_name)
+            view = self._views.get(f_name)
+            if view is None:
+                view = self._map(f_name)
             n_read = min(n_bytes, BLOCK_SIZE - offset)
-            b.append(f.read(n_read))
+            b.append(view[offset:offset + n_read])
             n_bytes -= n_read
+        if len(b) == 1:
+            return b[0]
         return b''.join(b)
-  
+
     def close(self):
-        for f in self._open_files.values():
-            f.close()
+        for view in self._views.values():
+            view.release()
+        for m in self._maps.values():
+            if isinstance(m, mmap.mmap):
+                m.close()
+        self._views.clear()
+        self._maps.clear()
 
     def __exit__(self, exc_type, exc_value, traceback):
         self.close()
-        return False 
+        return False
+
+def open_posting_reader(base_dir, bucket_name=None):
+    """ Creates a reader for posting lists under `base_dir`: the memory-mapped
+        reader for local indexes in 'mmap' mode, a MultiFileReader otherwise.
+    """
+    if bucket_name is None and LOCAL_READ_MODE == 'mmap':
+        return MmapMultiFileReader(base_dir)
+    return MultiFileReader(base_dir, bucket_name)
+
+# Guards creation of the long-lived readers of every InvertedIndex.
+_READERS_LOCK = threading.Lock()
 
 TUPLE_SIZE = 6       # We're going to pack the doc_id and tf values in this 
                      # many bytes.
 TF_MASK = 2 ** 16 - 1 # Masking the 16 low bits of an integer
+# Big-endian layout of one packed posting: 4 bytes doc_id followed by 2 bytes tf.
+POSTING_DTYPE = np.dtype([('doc_id', '>u4'), ('tf', '>u2')])
+
+
+def decode_posting_list(b, n):
+    """ Decodes `n` packed postings from the buffer `b` in one vectorized step.
+        Returns parallel (doc_ids:uint32[n], tfs:uint16[n]) NumPy arrays.
+    """
+    postings = np.frombuffer(b, dtype=POSTING_DTYPE, count=n)
+    return postings['doc_id'].astype(np.uint32), postings['tf'].astype(np.uint16)
+
+
+def encode_posting_list(doc_ids, tfs):
+    """ Packs parallel doc_id / tf arrays into the TUPLE_SIZE layout. """
+    postings = np.empty(len(doc_ids), dtype=POSTING_DTYPE)
+    postings['doc_id'] = doc_ids
+    postings['tf'] = tfs
+    return postings.tobytes()
+
+
+def empty_posting_arrays():
+    return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint16)
+
+# Posting format versions. v1 is the fixed TUPLE_SIZE layout above. v2 stores
+# each posting list as blocks of up to V2_BLOCK_POSTINGS postings, everything
+# encoded as LEB128 varints:
+#   n_blocks, then per block: count, last_doc_id, payload_len,
+#   payload = count doc_id gaps followed by count tfs.
+# Gaps chain across blocks (the first gap of a block is relative to the last
+# doc_id of the previous block), so the header fields are only needed to skip.
+POSTINGS_V1 = 1
+POSTINGS_V2 = 2
+V2_BLOCK_POSTINGS = 128
+
+
+def varint_encode(values):
+    """ LEB128-encodes an array of non-negative integers into bytes. """
+    values = np.asarray(values, dtype=np.uint64)
+    n_bytes = np.ones(len(values), dtype=np.int64)
+    for shift in (7, 14, 21, 28, 35, 42, 49, 56, 63):
+        n_bytes += values >= np.uint64(1 << shift)
+    starts = np.cumsum(n_bytes) - n_bytes
+    out = np.empty(int(n_bytes.sum()), dtype=np.uint8)
+    for j in range(int(n_bytes.max(initial=0))):
+        mask = n_bytes > j
+        group = (values[mask] >> np.uint64(7 * j)) & np.uint64(0x7f)
+        more = np.where(n_bytes[mask] > j + 1, 0x80, 0).astype(np.uint64)
+        out[starts[mask] + j] = group | more
+    return out.tobytes()
+
+
+def varint_decode(b):
+    """ Decodes a buffer of concatenated LEB128 varints into a uint64 array. """
+    raw = np.frombuffer(b, dtype=np.uint8)
+    ends = np.flatnonzero(raw < 0x80)
+    if len(ends) == 0:
+        return np.empty(0, dtype=np.uint64)
+    raw = raw[:ends[-1] + 1]
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts + 1
+    shift = np.arange(len(raw)) - np.repeat(starts, lengths)
+    groups = (raw & 0x7f).astype(np.uint64) << (7 * shift).astype(np.uint64)
+    return np.add.reduceat(groups, starts)
+
+
+def encode_posting_list_v2(doc_ids, tfs, with_offsets=False):
+    """ Encodes a doc_id-sorted posting list into the v2 block format. With
+        `with_offsets`, also returns the byte offset of every block header.
+    """
+    doc_ids = np.asarray(doc_ids, dtype=np.uint64)
+    tfs = np.asarray(tfs, dtype=np.uint64) & np.uint64(TF_MASK)
+    gaps = np.diff(doc_ids, prepend=np.uint64(0))
+    n_blocks = -(-len(doc_ids) // V2_BLOCK_POSTINGS)
+    out = [varint_encode([n_blocks])]
+    offsets = []
+    pos = len(out[0])
+    for start in range(0, len(doc_ids), V2_BLOCK_POSTINGS):
+        end = start + V2_BLOCK_POSTINGS
+        payload = varint_encode(gaps[start:end]) + varint_encode(tfs[start:end])
+        block_ids = doc_ids[start:end]
+        header = varint_encode([len(block_ids), block_ids[-1], len(payload)])
+        out.append(header)
+        out.append(payload)
+        offsets.append(pos)
+        pos += len(header) + len(payload)
+    if with_offsets:
+        return b''.join(out), offsets
+    return b''.join(out)
+
+
+def decode_posting_list_v2(b, base_doc_id=0):
+    """ Decodes a v2 posting list into parallel (doc_ids:uint32, tfs:uint16)
+        arrays. All blocks but the last hold exactly V2_BLOCK_POSTINGS
+        postings, so the varint stream is reshaped instead of walked.
+        `base_doc_id` is the doc_id the first gap is relative to (non-zero
+        when decoding a run of blocks from the middle of a list).
+    """
+    values = varint_decode(b)
+    if len(values) == 0 or values[0] == 0:
+        return empty_posting_arrays()
+    n_blocks = int(values[0])
+    width = 3 + 2 * V2_BLOCK_POSTINGS
+    full = values[1:1 + (n_blocks - 1) * width].reshape(n_blocks - 1, width)
+    last = values[1 + (n_blocks - 1) * width:]
+    count = int(last[0])
+    gaps = np.concatenate([full[:, 3:3 + V2_BLOCK_POSTINGS].ravel(), last[3:3 + count]])
+    tfs = np.concatenate([full[:, 3 + V2_BLOCK_POSTINGS:].ravel(), last[3 + count:3 + 2 * count]])
+    doc_ids = np.cumsum(gaps) + np.uint64(base_doc_id)
+    return doc_ids.astype(np.uint32), tfs.astype(np.uint16)
+
+# Skip blocks: every posting list is split into blocks of BLOCK_POSTINGS
+# postings (the physical v2 blocks; fixed-width slices of v1 lists). For each
+# block the side table keeps the last doc_id, the max tf, the min doc length
+# and the byte offset of the block within the list, which is enough to bound
+# a block's BM25 contribution and to read it without the blocks before it.
+BLOCK_POSTINGS = V2_BLOCK_POSTINGS
+BLOCK_META_DTYPE = np.dtype([('last_doc_id', '<u4'), ('max_tf', '<u2'),
+                             ('min_dl', '<u4'), ('offset', '<u8')])
+
+
+def build_block_meta(doc_ids, tfs, doc_lens=None, offsets=None):
+    """ Builds the block side table of one doc_id-sorted posting list.
+        `doc_lens` (aligned with doc_ids) defaults to 0, the loosest bound.
+        `offsets` are the block byte offsets, defaulting to the v1 layout.
+    """
+    n = len(doc_ids)
+    starts = np.arange(0, n, BLOCK_POSTINGS)
+    meta = np.zeros(len(starts), dtype=BLOCK_META_DTYPE)
+    if n == 0:
+        return meta
+    meta['last_doc_id'] = np.asarray(doc_ids)[np.minimum(starts + BLOCK_POSTINGS, n) - 1]
+    meta['max_tf'] = np.maximum.reduceat(np.asarray(tfs, dtype=np.uint64) & np.uint64(TF_MASK), starts)
+    if doc_lens is not None:
+        meta['min_dl'] = np.minimum.reduceat(np.asarray(doc_lens, dtype=np.uint64), starts)
+    meta['offset'] = starts * TUPLE_SIZE if offsets is None else offsets
+    return meta
+
+
+def _save_array(base_dir, file_name, array, bucket_name=None):
+    bucket = None if bucket_name is None else get_bucket(bucket_name)
+    with _open(str(Path(base_dir) / file_name), 'wb', bucket) as f:
+        np.save(f, array)
+
+
+def _array_exists(base_dir, file_name, bucket_name=None):
+    if bucket_name is None:
+        return os.path.exists(Path(base_dir) / file_name)
+    return get_bucket(bucket_name).blob(f'{base_dir}/{file_name}').exists()
+
+
+def _load_array(base_dir, file_name, bucket_name=None):
+    """ Loads a .npy file, memory-mapped when it is on local disk. """
+    if bucket_name is None:
+        return np.load(Path(base_dir) / file_name, mmap_mode='r')
+    data = get_bucket(bucket_name).blob(f'{base_dir}/{file_name}').download_as_bytes()
+    return np.load(io.BytesIO(data))
+
+
+class _TermRowsTable:
+    """ Per-term rows of all posting lists of an index: one array (memory-mapped
+        when loaded from local disk) and, per term, the (start, count) slice of
+        its rows. Subclasses name the two files and the row dtype.
+    """
+    ROWS_FILE = None
+    SLICES_FILE = None
+    DTYPE = None
+
+    def __init__(self, rows=None, slices=None):
+        self._parts = []
+        self._n_rows = 0 if rows is None else len(rows)
+        self.rows = np.zeros(0, dtype=self.DTYPE) if rows is None else rows
+        self.slices = {} if slices is None else slices
+
+    def add(self, term, rows):
+        """ Appends the rows of `term` (while writing an index). """
+        self.slices[term] = (self._n_rows, len(rows))
+        self._parts.append(rows)
+        self._n_rows += len(rows)
+
+    def _flush(self):
+        if self._parts:
+            self.rows = np.concatenate([self.rows] + self._parts)
+            self._parts = []
+
+    def __contains__(self, term):
+        return term in self.slices
+
+    def __len__(self):
+        return len(self.slices)
+
+    def term_rows(self, term):
+        """ Rows of `term`, empty if the term has none. """
+        self._flush()
+        if term not in self.slices:
+            return self.rows[:0]
+        start, count = self.slices[term]
+        return self.rows[start:start + count]
+
+    def _state(self):
+        """ What goes to the slices pickle besides the rows. """
+        return self.slices
+
+    @classmethod
+    def _from_state(cls, rows, state):
+        return cls(rows, state)
+
+    def save(self, base_dir, name, bucket_name=None):
+        """ Writes the rows (.npy) and slices (.pickle) files of `name`. """
+        self._flush()
+        _save_array(base_dir, f'{name}_{self.ROWS_FILE}.npy', self.rows, bucket_name)
+        bucket = None if bucket_name is None else get_bucket(bucket_name)
+        with _open(str(Path(base_dir) / f'{name}_{self.SLICES_FILE}.pickle'), 'wb', bucket) as f:
+            pickle.dump(self._state(), f)
+
+    @classmethod
+    def exists(cls, base_dir, name, bucket_name=None):
+        return _array_exists(base_dir, f'{name}_{cls.ROWS_FILE}.npy', bucket_name)
+
+    @classmethod
+    def load(cls, base_dir, name, bucket_name=None):
+        """ Loads a saved table. Local tables are memory-mapped, so only the
+            term slices are read up front.
+        """
+        rows = _load_array(base_dir, f'{name}_{cls.ROWS_FILE}.npy', bucket_name)
+        if bucket_name is None:
+            with open(Path(base_dir) / f'{name}_{cls.SLICES_FILE}.pickle', 'rb') as f:
+                state = pickle.load(f)
+        else:
+            data = get_bucket(bucket_name).blob(
+                f'{base_dir}/{name}_{cls.SLICES_FILE}.pickle').download_as_bytes()
+            state = pickle.loads(data)
+        return cls._from_state(rows, state)
+
+
+class BlockMaxTable(_TermRowsTable):
+    """ Block side tables (BLOCK_META_DTYPE rows) of all posting lists of an
+        index, saved as `name`_blocks.npy and `name`_block_slices.pickle.
+    """
+    ROWS_FILE = 'blocks'
+    SLICES_FILE = 'block_slices'
+    DTYPE = BLOCK_META_DTYPE
+
+    @property
+    def blocks(self):
+        self._flush()
+        return self.rows
+
+    def term_blocks(self, term):
+        """ Side table rows of `term`, empty if the term has none. """
+        return self.term_rows(term)
+
+    @staticmethod
+    def merge(base_dir, bucket_ids, bucket_name=None):
+        """ Combines the per-bucket tables written by write_a_posting_list. """
+        table = BlockMaxTable()
+        for bucket_id in bucket_ids:
+            part = BlockMaxTable.load(base_dir, f'{bucket_id}', bucket_name)
+            for term, (start, count) in part.slices.items():
+                table.add(term, np.asarray(part.rows[start:start + count]))
+        table._flush()
+        return table
+
+
+# Impacts: every posting's BM25 contribution, precomputed for fixed k1/b and
+# collection stats and quantized linearly to 8 or 16 bits with one scale per
+# term (derived from its idf, see ranking_v2.impact_scale), so query-time
+# scoring is a multiply-add per posting.
+IMPACT_DTYPES = {8: np.uint8, 16: np.uint16}
+
+
+def quantize_impacts(scores, scale, bits):
+    """ Maps float impacts to integers in [1, 2**bits - 1], impact ~ q * scale.
+        Every posting keeps at least 1, so matching a term always counts.
+    """
+    q = np.rint(np.asarray(scores, dtype=np.float64) / scale)
+    return np.clip(q, 1, (1 << bits) - 1).astype(IMPACT_DTYPES[bits])
+
+
+class ImpactTable(_TermRowsTable):
+    """ Quantized impacts of all posting lists of an index, aligned with the
+        decoded postings, saved as `name`_impacts.npy and
+        `name`_impact_slices.pickle. `params` records what they were computed
+        with: k1, b, bits, N, avgdl and quantization.
+    """
+    ROWS_FILE = 'impacts'
+    SLICES_FILE = 'impact_slices'
+
+    def __init__(self, params, rows=None, slices=None):
+        self.params = dict(params)
+        self.DTYPE = IMPACT_DTYPES[self.params['bits']]
+        super().__init__(rows, slices)
+
+    def term_impacts(self, term):
+        """ Quantized impacts of `term`, empty if the term has none. """
+        return self.term_rows(term)
+
+    def _state(self):
+        return {'params': self.params, 'slices': self.slices}
+
+    @classmethod
+    def _from_state(cls, rows, state):
+        return cls(state['params'], rows, state['slices'])
+
+
+# Impact-ordered copies of long posting lists, for score-at-a-time
+# evaluation: postings are grouped into segments of similar impact (equal-width
+# bands below the list's max impact), highest segment first and doc_id ordered
+# inside a segment, so a query can read the best postings of every term first.
+IMPACT_SEGMENTS = 128
+IMPACT_SEGMENT_DTYPE = np.dtype([('end', '<u4'), ('max_impact', '<u2')])
+
+
+def build_impact_segments(doc_ids, impacts, n_segments=IMPACT_SEGMENTS):
+    """ Reorders one posting list by impact. Returns (doc_ids, impacts,
+        segments): the reordered postings, highest segment first, and one
+        IMPACT_SEGMENT_DTYPE row per segment (end offset, max impact).
+    """
+    doc_ids = np.asarray(doc_ids, dtype=np.uint32)
+    impacts = np.asarray(impacts)
+    if len(impacts) == 0:
+        return doc_ids, impacts, np.zeros(0, dtype=IMPACT_SEGMENT_DTYPE)
+    band = impacts.astype(np.int64) * n_segments // (int(impacts.max()) + 1)
+    order = np.lexsort((doc_ids, -band))
+    doc_ids, impacts, band = doc_ids[order], impacts[order], band[order]
+    starts = np.flatnonzero(np.r_[True, band[1:] != band[:-1]])
+    segments = np.zeros(len(starts), dtype=IMPACT_SEGMENT_DTYPE)
+    segments['end'] = np.r_[starts[1:], len(band)]
+    segments['max_impact'] = np.maximum.reduceat(impacts, starts)
+    return doc_ids, impacts, segments
+
+
+class _ImpactSegmentRows(_TermRowsTable):
+    ROWS_FILE = 'impact_segments'
+    SLICES_FILE = 'impact_segment_slices'
+    DTYPE = IMPACT_SEGMENT_DTYPE
+
+
+class ImpactOrderedTable(_TermRowsTable):
+    """ Impact-ordered copies of the posting lists of high-df terms (see
+        build_impact_segments). Doc ids are saved as `name`_impact_docs.npy /
+        `name`_impact_doc_slices.pickle, the aligned impacts as
+        `name`_impact_values.npy and the segments as `name`_impact_segments.npy
+        / `name`_impact_segment_slices.pickle. `params` are those of the
+        ImpactTable the impacts come from.
+    """
+    ROWS_FILE = 'impact_docs'
+    SLICES_FILE = 'impact_doc_slices'
+    DTYPE = np.uint32
+
+    def __init__(self, params, rows=None, slices=None, impacts=None, segments=None):
+        self.params = dict(params)
+        super().__init__(rows, slices)
+        dtype = IMPACT_DTYPES[self.params['bits']]
+        self.impacts = np.zeros(0, dtype=dtype) if impacts is None else impacts
+        self._impact_parts = []
+        self.segments = _ImpactSegmentRows() if segments is None else segments
+
+    def add(self, term, doc_ids, impacts, segments):
+        """ Appends the impact-ordered postings of `term` and their segments. """
+        super().add(term, doc_ids)
+        self._impact_parts.append(impacts)
+        self.segments.add(term, segments)
+
+    def _flush(self):
+        super()._flush()
+        if self._impact_parts:
+            self.impacts = np.concatenate([self.impacts] + self._impact_parts)
+            self._impact_parts = []
+
+    def term_segments(self, term):
+        """ (doc_ids, impacts, segments) of `term`, empty if the term has none. """
+        doc_ids = self.term_rows(term)
+        if term not in self.slices:
+            return doc_ids, self.impacts[:0], self.segments.term_rows(term)
+        start, count = self.slices[term]
+        return doc_ids, self.impacts[start:start + count], self.segments.term_rows(term)
+
+    def _state(self):
+        return {'params': self.params, 'slices': self.slices}
+
+    @classmethod
+    def _from_state(cls, rows, state):
+        return cls(state['params'], rows, state['slices'])
+
+    def save(self, base_dir, name, bucket_name=None):
+        super().save(base_dir, name, bucket_name)
+        _save_array(base_dir, f'{name}_impact_values.npy', self.impacts, bucket_name)
+        self.segments.save(base_dir, name, bucket_name)
+
+    @classmethod
+    def load(cls, base_dir, name, bucket_name=None):
+        table = super().load(base_dir, name, bucket_name)
+        table.impacts = _load_array(base_dir, f'{name}_impact_values.npy', bucket_name)
+        table.segments = _ImpactSegmentRows.load(base_dir, name, bucket_name)
+        return table
+
+
+# Term dictionary: the sorted terms of an index, front-coded in blocks of
+# TERM_DICT_BLOCK (the first term of a block in full, the others as the length
+# of the prefix shared with the previous term plus the rest), and per term
+# its df, term_total, posting list size and posting locations. Short posting
+# lists (rare terms) are stored inline in the dictionary instead, with no
+# posting locations. Everything is kept in one `name`.termdict file of 8-byte
+# aligned sections behind a JSON header, memory-mapped when loaded and
+# searched by binary search over the block heads.
+TERM_DICT_MAGIC = b'IRTDICT1'
+TERM_DICT_BLOCK = 16
+TERM_DICT_CACHE = 1 << 16
+
+
+def _align8(n):
+    return (n + 7) & ~7
+
+
+class TermDictionary:
+    """ Read-only, memory-mappable term dictionary (see TERM_DICT_MAGIC).
+        Columns are NumPy arrays indexed by term id, the rank of the term in
+        sorted (UTF-8 byte) order.
+    """
+    def __init__(self, buf):
+        if bytes(buf[:8]) != TERM_DICT_MAGIC:
+            raise ValueError('Not a term dictionary')
+        header_len = int.from_bytes(buf[8:16], 'little')
+        header = json.loads(bytes(buf[16:16 + header_len]))
+        data_start = _align8(16 + header_len)
+        self._buf = buf
+        self._n = header['n_terms']
+        self._block = header['block']
+        self.files = header['files']
+        arrays = {}
+        for key, (offset, dtype, count) in header['sections'].items():
+            arrays[key] = np.frombuffer(buf, dtype=dtype, count=count,
+                                        offset=data_start + offset)
+        blob_offset, _, blob_len = header['sections']['blob']
+        self._blob = memoryview(buf)[data_start + blob_offset:data_start + blob_offset + blob_len]
+        self._block_offsets = arrays['block_offsets']
+        self.df = arrays['df']
+        self.term_total = arrays['term_total']
+        self.posting_sizes = arrays['posting_sizes']
+        self._loc_ptr = arrays['loc_ptr']
+        self._loc_file = arrays['loc_file']
+        self._loc_offset = arrays['loc_offset']
+        # Dictionaries written before inline postings existed have neither
+        self._inline_ptr = arrays.get('inline_ptr')
+        self._inline = arrays.get('inline')
+        self.inline_max_bytes = header.get('inline_max_bytes', 0)
+        self.term_id = lru_cache(maxsize=TERM_DICT_CACHE)(self._find)
+
+    def __len__(self):
+        return self._n
+
+    @staticmethod
+    def build(df, term_total, posting_locs, posting_sizes=None, inline_postings=None,
+              inline_max_bytes=0):
+        """ Builds a dictionary from the Counter / defaultdict(list) mappings
+            of an InvertedIndex. Terms in `inline_postings` (term -> stored
+            posting list bytes) keep their postings in the dictionary and get
+            no posting locations.
+        """
+        terms = sorted(set(df) | set(posting_locs), key=lambda t: t.encode('utf-8'))
+        posting_sizes = posting_sizes or {}
+        inline_postings = inline_postings or {}
+        blob = bytearray()
+        block_offsets, files, file_ids = [], [], {}
+        loc_ptr, loc_file, loc_offset = [0], [], []
+        inline, inline_ptr = bytearray(), [0]
+        prev = b''
+        for i, term in enumerate(terms):
+            key = term.encode('utf-8')
+            if i % TERM_DICT_BLOCK == 0:
+                block_offsets.append(len(blob))
+                blob += len(key).to_bytes(2, 'little') + key
+            else:
+                lcp = 0
+                limit = min(len(prev), len(key), 255)
+                while lcp < limit and prev[lcp] == key[lcp]:
+                    lcp += 1
+                blob += bytes([lcp]) + (len(key) - lcp).to_bytes(2, 'little') + key[lcp:]
+            prev = key
+            if term in inline_postings:
+                inline += inline_postings[term]
+            else:
+                for f_name, offset in posting_locs.get(term, []):
+                    if f_name not in file_ids:
+                        file_ids[f_name] = len(files)
+                        files.append(f_name)
+                    loc_file.append(file_ids[f_name])
+                    loc_offset.append(offset)
+            loc_ptr.append(len(loc_file))
+            inline_ptr.append(len(inline))
+
+        sections = {
+            'blob': np.frombuffer(bytes(blob), dtype=np.uint8),
+            'block_offsets': np.array(block_offsets, dtype='<u8'),
+            'df': np.array([df.get(t, 0) for t in terms], dtype='<u4'),
+            'term_total': np.array([term_total.get(t, 0) for t in terms], dtype='<u8'),
+            'posting_sizes': np.array([posting_sizes.get(t, 0) for t in terms], dtype='<u4'),
+            'loc_ptr': np.array(loc_ptr, dtype='<u4'),
+            'loc_file': np.array(loc_file, dtype='<u4'),
+            'loc_offset': np.array(loc_offset, dtype='<u4'),
+            'inline_ptr': np.array(inline_ptr, dtype='<u8'),
+            'inline': np.frombuffer(bytes(inline), dtype=np.uint8),
+        }
+        layout, offset = {}, 0
+        for key, arr in sections.items():
+            layout[key] = [offset, arr.dtype.str, len(arr)]
+            offset = _align8(offset + arr.nbytes)
+        header = json.dumps({'n_terms': len(terms), 'block': TERM_DICT_BLOCK,
+                             'files': files, 'inline_max_bytes': inline_max_bytes,
+                             'sections': layout}).encode('utf-8')
+        data_start = _align8(16 + len(header))
+        buf = bytearray(data_start + offset)
+        buf[:8] = TERM_DICT_MAGIC
+        buf[8:16] = len(header).to_bytes(8, 'little')
+        buf[16:16 + len(header)] = header
+        for key, arr in sections.items():
+            start = data_start + layout[key][0]
+            buf[start:start + arr.nbytes] = arr.tobytes()
+        return TermDictionary(bytes(buf))
+
+    def _head(self, block):
+        offset = int(self._block_offsets[block])
+        length = int.from_bytes(self._blob[offset:offset + 2], 'little')
+        return bytes(self._blob[offset + 2:offset + 2 + length])
+
+    def _iter_block(self, block):
+        """ Yields (term_id, term bytes) of one front-coded block. """
+        offset = int(self._block_offsets[block])
+        first = block * self._block
+        key = b''
+        for term_id in range(first, min(first + self._block, self._n)):
+            if term_id == first:
+                length = int.from_bytes(self._blob[offset:offset + 2], 'little')
+                key = bytes(self._blob[offset + 2:offset + 2 + length])
+                offset += 2 + length
+            else:
+                lcp = self._blob[offset]
+                length = int.from_bytes(self._blob[offset + 1:offset + 3], 'little')
+                key = key[:lcp] + bytes(self._blob[offset + 3:offset + 3 + length])
+                offset += 3 + length
+            yield term_id, key
+
+    def _find(self, term):
+        """ Term id of `term`, -1 if it is not in the dictionary. """
+        if self._n == 0 or not isinstance(term, str):
+            return -1
+        key = term.encode('utf-8')
+        lo, hi = 0, len(self._block_offsets) - 1
+        if key < self._head(0):
+            return -1
+        # Last block whose first term is <= key
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self._head(mid) <= key:
+                lo = mid
+            else:
+                hi = mid - 1
+        for term_id, other in self._iter_block(lo):
+            if other == key:
+                return term_id
+            if other > key:
+                break
+        return -1
+
+    def iter_terms(self):
+        """ All terms in sorted order. """
+        for block in range(len(self._block_offsets)):
+            for _, key in self._iter_block(block):
+                yield key.decode('utf-8')
+
+    def locations(self, term_id):
+        """ posting_locs entry, [(file_name, offset), ...], of a term id. """
+        start, end = int(self._loc_ptr[term_id]), int(self._loc_ptr[term_id + 1])
+        return [(self.files[f], offset) for f, offset in
+                zip(self._loc_file[start:end].tolist(), self._loc_offset[start:end].tolist())]
+
+    def inline_postings(self, term_id):
+        """ Stored posting list bytes of a term id kept in the dictionary, or
+            None when its postings are in the posting files.
+        """
+        if self._inline_ptr is None:
+            return None
+        start, end = int(self._inline_ptr[term_id]), int(self._inline_ptr[term_id + 1])
+        if start == end:
+            return None
+        return self._inline[start:end].data
+
+    def inline_stats(self):
+        """ Number of terms with inline postings and their total bytes. """
+        if self._inline_ptr is None:
+            return {'terms': 0, 'bytes': 0, 'max_bytes': 0}
+        return {'terms': int(np.count_nonzero(np.diff(self._inline_ptr))),
+                'bytes': len(self._inline), 'max_bytes': self.inline_max_bytes}
+
+    def save(self, base_dir, name, bucket_name=None):
+        """ Writes `name`.termdict. Local files are replaced atomically, so a
+            process that has the old file mapped keeps reading it safely.
+        """
+        path = Path(base_dir) / f'{name}.termdict'
+        if bucket_name is not None:
+            with _open(str(path), 'wb', get_bucket(bucket_name)) as f:
+                f.write(self._buf)
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=base_dir, prefix=f'.{name}.termdict.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self._buf)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def exists(base_dir, name, bucket_name=None):
+        if bucket_name is None:
+            return os.path.exists(Path(base_dir) / f'{name}.termdict')
+        return get_bucket(bucket_name).blob(f'{base_dir}/{name}.termdict').exists()
+
+    @staticmethod
+    def load(base_dir, name, bucket_name=None):
+        """ Loads `name`.termdict, memory-mapped when it is on local disk. """
+        if bucket_name is None:
+            with open(Path(base_dir) / f'{name}.termdict', 'rb') as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buf = get_bucket(bucket_name).blob(f'{base_dir}/{name}.termdict').download_as_bytes()
+        return TermDictionary(buf)
+
+
+class _TermColumn(Mapping):
+    """ Read-only Counter-like view (missing terms read as 0) of one
+        TermDictionary column, standing in for InvertedIndex.df,
+        term_total and posting_sizes.
+    """
+    def __init__(self, term_dict, column):
+        self._dict = term_dict
+        self._column = column
+
+    def __getitem__(self, term):
+        term_id = self._dict.term_id(term)
+        return 0 if term_id < 0 else int(self._column[term_id])
+
+    def get(self, term, default=None):
+        term_id = self._dict.term_id(term)
+        return default if term_id < 0 else int(self._column[term_id])
+
+    def __contains__(self, term):
+        return self._dict.term_id(term) >= 0
+
+    def __iter__(self):
+        return self._dict.iter_terms()
+
+    def __len__(self):
+        return len(self._dict)
+
+    def values(self):
+        return self._column
+
+    def items(self):
+        return zip(self._dict.iter_terms(), self._column.tolist())
+
+
+class _PostingLocsView(Mapping):
+    """ Read-only defaultdict(list)-like view of the posting locations of a
+        TermDictionary, standing in for InvertedIndex.posting_locs.
+    """
+    def __init__(self, term_dict):
+        self._dict = term_dict
+
+    def __getitem__(self, term):
+        term_id = self._dict.term_id(term)
+        return [] if term_id < 0 else self._dict.locations(term_id)
+
+    def get(self, term, default=None):
+        term_id = self._dict.term_id(term)
+        return default if term_id < 0 else self._dict.locations(term_id)
+
+    def __contains__(self, term):
+        return self._dict.term_id(term) >= 0
+
+    def __iter__(self):
+        return self._dict.iter_terms()
+
+    def __len__(self):
+        return len(self._dict)
+
+
+class _TermSlicesView(Mapping):
+    """ Read-only dict-like view of the term slices of a _TermRowsTable kept
+        as arrays aligned with the term ids of a TermDictionary: `starts` and
+        `counts`, -1 for terms without rows. Stands in for the slices dict of
+        tables opened from an engine snapshot.
+    """
+    def __init__(self, term_dict, starts, counts, n_terms):
+        self._dict = term_dict
+        self._starts = starts
+        self._counts = counts
+        self._n_terms = n_terms
+
+    @staticmethod
+    def build_arrays(term_dict, slices):
+        """ (starts, counts) arrays of a slices dict, aligned with the term
+            ids of `term_dict`. Terms missing from the dictionary are dropped.
+        """
+        starts = np.zeros(len(term_dict), dtype='<u8')
+        counts = np.full(len(term_dict), -1, dtype='<i8')
+        for term, (start, count) in slices.items():
+            term_id = term_dict.term_id(term)
+            if term_id >= 0:
+                starts[term_id] = start
+                counts[term_id] = count
+        return starts, counts
+
+    def _term_slice(self, term):
+        term_id = self._dict.term_id(term)
+        if term_id < 0 or self._counts[term_id] < 0:
+            return None
+        return int(self._starts[term_id]), int(self._counts[term_id])
+
+    def __getitem__(self, term):
+        value = self._term_slice(term)
+        if value is None:
+            raise KeyError(term)
+        return value
+
+    def get(self, term, default=None):
+        value = self._term_slice(term)
+        return default if value is None else value
+
+    def __contains__(self, term):
+        return self._term_slice(term) is not None
+
+    def __iter__(self):
+        for term_id, term in enumerate(self._dict.iter_terms()):
+            if self._counts[term_id] >= 0:
+                yield term
+
+    def __len__(self):
+        return self._n_terms
+
+
+# Per-document data of an index whose postings use dense doc ids
+# (scripts/remap_doc_ids.py). Dense id i is the i-th smallest wiki id, so
+# posting lists and doc_id tie-breaks keep their order; wiki ids are only
+# needed at the API boundary. Saved next to the index as
+# `name`_docs_<column>.npy and memory-mapped when loaded.
+DOC_STORE_COLUMNS = ('wiki_ids', 'doc_len', 'pagerank', 'pageviews')
+
+
+class DocStore:
+    """ Per-document NumPy columns indexed by dense doc id: wiki_ids
+        (ascending), doc_len (None when the index has no doc lengths),
+        pagerank and pageviews.
+    """
+    def __init__(self, wiki_ids, doc_len=None, pagerank=None, pageviews=None):
+        self.wiki_ids = wiki_ids
+        self.doc_len = doc_len
+        self.pagerank = np.zeros(len(wiki_ids)) if pagerank is None else pagerank
+        self.pageviews = np.zeros(len(wiki_ids), dtype=np.int64) if pageviews is None else pageviews
+
+    def __len__(self):
+        return len(self.wiki_ids)
+
+    @staticmethod
+    def build(wiki_ids, doc_lengths=None, pagerank=None, pageviews=None):
+        """ Builds the store for the given wiki ids from dicts keyed by wiki id
+            (values missing from pagerank / pageviews are 0).
+        """
+        wiki_ids = np.unique(np.fromiter(wiki_ids, dtype=np.int64))
+        if len(wiki_ids) and (wiki_ids[0] < 0 or wiki_ids[-1] > np.iinfo(np.uint32).max):
+            raise ValueError('wiki ids must fit in uint32')
+        ids = wiki_ids.tolist()
+
+        def column(values, dtype):
+            return np.fromiter(map(values.get, ids, itertools.repeat(0)),
+                               dtype=dtype, count=len(ids))
+
+        doc_len = None if doc_lengths is None else column(doc_lengths, '<u4')
+        return DocStore(wiki_ids.astype('<u4'), doc_len,
+                        column(pagerank or {}, '<f8'), column(pageviews or {}, '<i8'))
+
+    def to_dense(self, wiki_ids):
+        """ Dense ids (int64) of an array of wiki ids, -1 for unknown ones. """
+        wiki_ids = np.asarray(wiki_ids, dtype=np.int64)
+        if len(self.wiki_ids) == 0:
+            return np.full(len(wiki_ids), -1, dtype=np.int64)
+        in_range = (wiki_ids >= 0) & (wiki_ids <= np.iinfo(np.uint32).max)
+        probe = np.where(in_range, wiki_ids, 0).astype(np.uint32)
+        pos = np.minimum(np.searchsorted(self.wiki_ids, probe), len(self.wiki_ids) - 1)
+        found = in_range & (self.wiki_ids[pos] == probe)
+        return np.where(found, pos, -1)
+
+    def to_wiki(self, dense_ids):
+        """ Wiki ids of an array of dense ids. """
+        return self.wiki_ids[np.asarray(dense_ids, dtype=np.int64)]
+
+    def save(self, base_dir, name, bucket_name=None):
+        for column in DOC_STORE_COLUMNS:
+            values = getattr(self, column)
+            if values is not None:
+                _save_array(base_dir, f'{name}_docs_{column}.npy', values, bucket_name)
+
+    @staticmethod
+    def exists(base_dir, name, bucket_name=None):
+        return _array_exists(base_dir, f'{name}_docs_wiki_ids.npy', bucket_name)
+
+    @staticmethod
+    def load(base_dir, name, bucket_name=None):
+        """ Loads the columns, memory-mapped when they are on local disk. """
+        columns = {}
+        for column in DOC_STORE_COLUMNS:
+            file_name = f'{name}_docs_{column}.npy'
+            if _array_exists(base_dir, file_name, bucket_name):
+                columns[column] = _load_array(base_dir, file_name, bucket_name)
+        return DocStore(**columns)
 
 
 class InvertedIndex:  
@@ -133,6 +1363,10 @@ class InvertedIndex:
         # the number of bytes from the beginning of the file where the posting list
         # starts. 
         self.posting_locs = defaultdict(list)
+        # on-disk layout of the posting lists (POSTINGS_V1 or POSTINGS_V2). v2
+        # lists are variable-length, so their size in bytes is kept per term.
+        self.posting_format = POSTINGS_V1
+        self.posting_sizes = Counter()
 
         for doc_id, tokens in docs.items():
             self.add_doc(doc_id, tokens)
@@ -151,9 +1385,37 @@ class InvertedIndex:
     def write_index(self, base_dir, name, bucket_name=None):
         """ Write the in-memory index to disk. Results in the file: 
             (1) `name`.pkl containing the global term stats (e.g. df).
+            (2) `name`_blocks.npy / `name`_block_slices.pickle with the block
+                side tables, if the index has them (see BlockMaxTable).
+            (3) `name`_impacts.npy / `name`_impact_slices.pickle with the
+                quantized BM25 impacts, if the index has them (see ImpactTable).
+            (4) the impact-ordered copies of long posting lists, if the index
+                has them (see ImpactOrderedTable).
+            (5) `name`.termdict with df, term_total and the posting locations,
+                if the index was loaded from one (they are left out of
+                `name`.pkl then, see TermDictionary). Posting lists of up to
+                INLINE_POSTINGS_MAX_BYTES are embedded in it, read from the
+                posting files under `base_dir`.
+            (6) `name`_docs_*.npy with the per-document columns, if the index
+                uses dense doc ids (see DocStore).
         """
         #### GLOBAL DICTIONARIES ####
+        if getattr(self, '_term_dict', None) is not None:
+            # Loaded from a term dictionary: write one for the current mappings
+            inline = self.collect_inline_postings(base_dir, bucket_name)
+            term_dict = TermDictionary.build(self.df, self.term_total, self.posting_locs,
+                                             getattr(self, 'posting_sizes', None),
+                                             inline, INLINE_POSTINGS_MAX_BYTES)
+            term_dict.save(base_dir, name, bucket_name)
+            self.use_term_dict(term_dict)
         self._write_globals(base_dir, name, bucket_name)
+        for table_name in ('block_table', 'impact_table', 'impact_order_table'):
+            table = getattr(self, table_name, None)
+            if table is not None and len(table) > 0:
+                table.save(base_dir, name, bucket_name)
+        doc_store = getattr(self, 'doc_store', None)
+        if doc_store is not None:
+            doc_store.save(base_dir, name, bucket_name)
 
     def _write_globals(self, base_dir, name, bucket_name):
         path = str(Path(base_dir) / f'{name}.pkl')
@@ -166,46 +1428,259 @@ class InvertedIndex:
             from the object's state dictionary. 
         """
         state = self.__dict__.copy()
-        del state['_posting_list']
+        state.pop('_posting_list', None)
+        state.pop('_readers', None)
+        state.pop('block_table', None)
+        state.pop('impact_table', None)
+        state.pop('impact_order_table', None)
+        state.pop('champion_index', None)
+        state.pop('doc_store', None)
+        state.pop('_doc_stats', None)
+        if state.pop('_term_dict', None) is not None:
+            for key in ('df', 'term_total', 'posting_locs', 'posting_sizes'):
+                state.pop(key, None)
         return state
 
+    def use_term_dict(self, term_dict):
+        """ Serves df, term_total, posting_locs and posting_sizes from a
+            TermDictionary instead of the in-memory Counters.
+        """
+        self._term_dict = term_dict
+        self.df = _TermColumn(term_dict, term_dict.df)
+        self.term_total = _TermColumn(term_dict, term_dict.term_total)
+        self.posting_sizes = _TermColumn(term_dict, term_dict.posting_sizes)
+        self.posting_locs = _PostingLocsView(term_dict)
+
+    def collect_inline_postings(self, base_dir, bucket_name=None, max_bytes=None):
+        """ Stored posting list bytes of every term whose list is at most
+            `max_bytes` (default INLINE_POSTINGS_MAX_BYTES) long, as a dict
+            term -> bytes. Lists are read from the posting files under
+            `base_dir` in file order; terms that are already inline and have
+            no posting locations keep their inline bytes whatever their size.
+        """
+        if max_bytes is None:
+            max_bytes = INLINE_POSTINGS_MAX_BYTES
+        inline, to_read = {}, []
+        for w, locs in self.posting_locs.items():
+            if not locs:
+                b = self.inline_posting_bytes(w)
+                if b is not None:
+                    inline[w] = bytes(b)
+            elif self.posting_nbytes(w) <= max_bytes:
+                to_read.append((locs[0], w))
+        if to_read:
+            reader = self.posting_reader(base_dir, bucket_name)
+            for _, w in sorted(to_read):
+                inline[w] = bytes(reader.read(self.posting_locs[w], self.posting_nbytes(w)))
+        return inline
+
+    def inline_posting_bytes(self, w):
+        """ Stored posting list bytes of `w` when they are embedded in the
+            term dictionary, otherwise None.
+        """
+        term_dict = getattr(self, '_term_dict', None)
+        if term_dict is None:
+            return None
+        term_id = term_dict.term_id(w)
+        return None if term_id < 0 else term_dict.inline_postings(term_id)
+
+    def doc_lengths(self, doc_ids, default=0):
+        """ Lengths (float64) of the documents in the doc_id array, `default`
+            for documents without one. None when the index has no doc lengths.
+        """
+        doc_store = getattr(self, 'doc_store', None)
+        if doc_store is not None and doc_store.doc_len is not None:
+            return doc_store.doc_len[doc_ids].astype(np.float64)
+        if not hasattr(self, 'DL'):
+            return None
+        lookup = getattr(self.DL, 'lookup', None)
+        if lookup is not None:
+            # Doc lengths kept as a sorted id/value table (engine snapshots)
+            return lookup(doc_ids, default).astype(np.float64)
+        return np.fromiter(map(self.DL.get, doc_ids.tolist(), itertools.repeat(default)),
+                           dtype=np.float64, count=len(doc_ids))
+
+    def doc_length_stats(self):
+        """ (n_docs, total length, min length) of the indexed documents, or
+            None when the index has no doc lengths. Computed once per load.
+        """
+        if '_doc_stats' in self.__dict__:
+            return self._doc_stats
+        doc_store = getattr(self, 'doc_store', None)
+        if doc_store is not None and doc_store.doc_len is not None:
+            doc_len = doc_store.doc_len
+            stats = (len(doc_len), int(doc_len.sum(dtype=np.uint64)),
+                     int(doc_len.min()) if len(doc_len) else 0)
+        elif hasattr(self, 'DL'):
+            stats = (len(self.DL), sum(self.DL.values()),
+                     min(self.DL.values()) if self.DL else 0)
+        else:
+            stats = None
+        self._doc_stats = stats
+        return stats
+
+    def posting_reader(self, base_dir, bucket_name=None):
+        """ Returns the long-lived reader for posting files under `base_dir`.
+            Readers are created once per (base_dir, bucket_name) and reused by
+            every query until close_readers() is called.
+        """
+        key = (str(base_dir), bucket_name)
+        readers = self.__dict__.get('_readers')
+        if readers is not None and key in readers:
+            return readers[key]
+        with _READERS_LOCK:
+            readers = self.__dict__.setdefault('_readers', {})
+            if key not in readers:
+                readers[key] = open_posting_reader(base_dir, bucket_name)
+            return readers[key]
+
+    def close_readers(self):
+        """ Closes every reader opened by posting_reader(). """
+        with _READERS_LOCK:
+            readers = self.__dict__.pop('_readers', {})
+        for reader in readers.values():
+            reader.close()
+
+    @property
+    def version(self):
+        """ Posting format of this index. Indexes pickled before the v2 format
+            existed carry no `posting_format` and are v1.
+        """
+        return getattr(self, 'posting_format', POSTINGS_V1)
+
+    def posting_nbytes(self, w):
+        """ Size in bytes of the stored posting list of `w`. """
+        if self.version == POSTINGS_V2:
+            return self.posting_sizes[w]
+        return self.df[w] * TUPLE_SIZE
+
+    def posting_ranges(self, w, start=0, length=None):
+        """ Byte ranges holding the posting list of `w` (or its bytes
+            [start, start + length) only), as a list of (file_name, offset,
+            length) following its posting_locs. Empty for inline terms.
+        """
+        if length is None:
+            length = self.posting_nbytes(w) - start
+        end = start + length
+        ranges = []
+        n_bytes = self.posting_nbytes(w)
+        pos = 0
+        for f_name, offset in self.posting_locs.get(w, []):
+            n_read = min(n_bytes, BLOCK_SIZE - offset)
+            lo, hi = max(start, pos), min(end, pos + n_read)
+            if lo < hi:
+                ranges.append((f_name, offset + lo - pos, hi - lo))
+            pos += n_read
+            n_bytes -= n_read
+        return ranges
+
+    def term_blocks(self, w):
+        """ Block side table rows (BLOCK_META_DTYPE) of `w`, or None when the
+            index was loaded without a block table.
+        """
+        block_table = getattr(self, 'block_table', None)
+        if block_table is None or w not in block_table:
+            return None
+        return block_table.term_blocks(w)
+
+    def term_impacts(self, w):
+        """ Quantized BM25 impacts of `w` aligned with its decoded postings, or
+            None when the index was loaded without an impact table.
+        """
+        impact_table = getattr(self, 'impact_table', None)
+        if impact_table is None or w not in impact_table:
+            return None
+        return impact_table.term_impacts(w)
+
+    def decode_posting_bytes(self, w, b):
+        """ Decodes the raw posting list bytes of `w` according to the index
+            version into (doc_ids:uint32, tfs:uint16) arrays.
+        """
+        if self.version == POSTINGS_V2:
+            return decode_posting_list_v2(b)
+        return decode_posting_list(b, self.df[w])
+
     def posting_lists_iter(self, base_dir, bucket_name=None):
         """ A generator that reads one posting list from disk and yields 
             a (word:str, [(doc_id:int, tf:int), ...]) tuple.
         """
-        with closing(MultiFileReader(base_dir, bucket_name)) as reader:
-            for w, locs in self.posting_locs.items():
-                b = reader.read(locs, self.df[w] * TUPLE_SIZE)
-                posting_list = []
-                for i in range(self.df[w]):
-                    doc_id = int.from_bytes(b[i*TUPLE_SIZE:i*TUPLE_SIZE+4], 'big')
-                    tf = int.from_bytes(b[i*TUPLE_SIZE+4:(i+1)*TUPLE_SIZE], 'big')
-                    posting_list.append((doc_id, tf))
-                yield w, posting_list
+        for w in self.posting_locs:
+            doc_ids, tfs = self.read_a_posting_arrays(base_dir, w, bucket_name)
+            yield w, list(zip(doc_ids.tolist(), tfs.tolist()))
+
+    def read_a_posting_arrays(self, base_dir, w, bucket_name=None):
+        """ Reads the posting list of `w` as parallel NumPy arrays.
+            Returns (doc_ids:uint32[df], tfs:uint16[df]), empty if `w` is unknown.
+            Inline postings are decoded straight from the term dictionary.
+        """
+        b = self.inline_posting_bytes(w)
+        if b is None:
+            if not w in self.posting_locs:
+                return empty_posting_arrays()
+            reader = self.posting_reader(base_dir, bucket_name)
+            b = reader.read(self.posting_locs[w], self.posting_nbytes(w))
+        return self.decode_posting_bytes(w, b)
+
+    def read_posting_blocks(self, base_dir, w, first, last, bucket_name=None):
+        """ Reads and decodes only blocks [first, last) of the posting list of
+            `w`, using the byte offsets of the block side table to skip the rest
+            (see ranking_v2.BlockPostings). Returns (doc_ids:uint32, tfs:uint16)
+            arrays.
+        """
+        blocks = self.term_blocks(w)
+        if blocks is None or self.inline_posting_bytes(w) is not None:
+            doc_ids, tfs = self.read_a_posting_arrays(base_dir, w, bucket_name)
+            return (doc_ids[first * BLOCK_POSTINGS:last * BLOCK_POSTINGS],
+                    tfs[first * BLOCK_POSTINGS:last * BLOCK_POSTINGS])
+        last = min(last, len(blocks))
+        if first >= last:
+            return empty_posting_arrays()
+        start = int(blocks['offset'][first])
+        end = int(blocks['offset'][last]) if last < len(blocks) else self.posting_nbytes(w)
+        reader = self.posting_reader(base_dir, bucket_name)
+        locs = [(f_name, offset) for f_name, offset, _ in self.posting_ranges(w, start, end - start)]
+        b = reader.read(locs, end - start)
+        if self.version == POSTINGS_V2:
+            base = int(blocks['last_doc_id'][first - 1]) if first > 0 else 0
+            return decode_posting_list_v2(varint_encode([last - first]) + bytes(b), base)
+        return decode_posting_list(b, (end - start) // TUPLE_SIZE)
 
     def read_a_posting_list(self, base_dir, w, bucket_name=None):
-        posting_list = []
-        if not w in self.posting_locs:
-            return posting_list
-        with closing(MultiFileReader(base_dir, bucket_name)) as reader:
-            locs = self.posting_locs[w]
-            b = reader.read(locs, self.df[w] * TUPLE_SIZE)
-            for i in range(self.df[w]):
-                doc_id = int.from_bytes(b[i*TUPLE_SIZE:i*TUPLE_SIZE+4], 'big')
-                tf = int.from_bytes(b[i*TUPLE_SIZE+4:(i+1)*TUPLE_SIZE], 'big')
-                posting_list.append((doc_id, tf))
-        return posting_list
+        doc_ids, tfs = self.read_a_posting_arrays(base_dir, w, bucket_name)
+        return list(zip(doc_ids.tolist(), tfs.tolist()))
 
     @staticmethod
-    def write_a_posting_list(b_w_pl, base_dir, bucket_name=None):
+    def write_a_posting_list(b_w_pl, base_dir, bucket_name=None, version=POSTINGS_V1,
+                             doc_lengths=None):
+        """ Writes the posting lists of one bucket and pickles their locations
+            to `bucket_id`_posting_locs.pickle. With version=POSTINGS_V2 the
+            lists are block-compressed and their byte sizes go to
+            `bucket_id`_posting_sizes.pickle. The block side tables are saved as
+            `bucket_id`_blocks.npy / `bucket_id`_block_slices.pickle, with min
+            doc lengths taken from the `doc_lengths` dict when given (see
+            BlockMaxTable.merge). Postings must be sorted by doc_id.
+        """
         posting_locs = defaultdict(list)
+        posting_sizes = Counter()
+        block_table = BlockMaxTable()
         bucket_id, list_w_pl = b_w_pl
         
         with closing(MultiFileWriter(base_dir, bucket_id, bucket_name)) as writer:
             for w, pl in list_w_pl: 
+                doc_ids = [doc_id for doc_id, _ in pl]
+                tfs = [tf for _, tf in pl]
                 # convert to bytes
-                b = b''.join([(doc_id << 16 | (tf & TF_MASK)).to_bytes(TUPLE_SIZE, 'big')
-                              for doc_id, tf in pl])
+                if version == POSTINGS_V2:
+                    b, offsets = encode_posting_list_v2(doc_ids, tfs, with_offsets=True)
+                    posting_sizes[w] = len(b)
+                else:
+                    b = b''.join([(doc_id << 16 | (tf & TF_MASK)).to_bytes(TUPLE_SIZE, 'big')
+                                  for doc_id, tf in pl])
+                    offsets = None
+                doc_lens = None
+                if doc_lengths is not None:
+                    doc_lens = [doc_lengths.get(doc_id, 0) for doc_id in doc_ids]
+                block_table.add(w, build_block_meta(doc_ids, tfs, doc_lens, offsets))
                 # write to file(s)
                 locs = writer.write(b)
                 # save file locations to index
@@ -214,6 +1689,11 @@ class InvertedIndex:
             bucket = None if bucket_name is None else get_bucket(bucket_name)
             with _open(path, 'wb', bucket) as f:
                 pickle.dump(posting_locs, f)
+            if version == POSTINGS_V2:
+                path = str(Path(base_dir) / f'{bucket_id}_posting_sizes.pickle')
+                with _open(path, 'wb', bucket) as f:
+                    pickle.dump(posting_sizes, f)
+            block_table.save(base_dir, f'{bucket_id}', bucket_name)
         return bucket_id
 
 
@@ -227,4 +1707,22 @@ class InvertedIndex:
             
         bucket = None if bucket_name is None else get_bucket(bucket_name)
         with _open(path, 'rb', bucket) as f:
-            return pickle.load(f)
\ No newline at end of file
+            index = pickle.load(f)
+        if TermDictionary.exists(base_dir, name, bucket_name):
+            index.use_term_dict(TermDictionary.load(base_dir, name, bucket_name))
+        elif not hasattr(index, 'df'):
+            raise FileNotFoundError(f"{name}.pkl has no terms and {name}.termdict is missing")
+        for table_name, table_cls in (('block_table', BlockMaxTable),
+                                      ('impact_table', ImpactTable),
+                                      ('impact_order_table', ImpactOrderedTable)):
+            try:
+                if table_cls.exists(base_dir, name, bucket_name):
+                    setattr(index, table_name, table_cls.load(base_dir, name, bucket_name))
+            except Exception as e:
+                print(f"Could not load {table_name} of {name}: {e}")
+        if getattr(index, 'dense_doc_ids', False):
+            # Postings of a dense index are meaningless without their wiki ids
+            if not DocStore.exists(base_dir, name, bucket_name):
+                raise FileNotFoundError(f"{name}.pkl uses dense doc ids but {name}_docs_*.npy are missing")
+            index.doc_store = DocStore.load(base_dir, name, bucket_name)
+        return index
\ No newline at end of file
@@ -1,18 +1,59 @@
 from Backend.data_Loader import (
     load_index,
-    load_pagerank,
-    load_pageviews,
-    load_id_to_title,
+    load_champion_tier,
+    load_pagerank_table,
+    load_pageviews_table,
+    load_titles,
 )
 from Backend.ranking_v2 import (
-    get_candidate_documents,
+    retrieve_candidates,
+    tier_stats,
+    inline_stats,
     calculate_unique_term_count,
     calculate_tfidf_score_with_dir,
+    fetch_postings_async,
+    read_posting_arrays,
+    FULL_LIST_STRATEGIES,
 )
+from Backend.posting_fetch import prefetched_postings
+from Backend.fusion import PageRankPrior, load_pagerank_prior, fuse_top_n
+from Backend.artifact_cache import SortedIdTable
+from Backend.title_store import TitleStore, TITLE_STORE_FILES
+from Backend.snapshot import (
+    Snapshot,
+    SnapshotWriter,
+    add_index,
+    open_index,
+    add_table,
+    open_table,
+)
+from Backend.component_loader import ComponentLoader, READY
 from Backend.tokenizer import tokenize
-from Backend.semantic_expansion import SemanticExpander
-import math
-import heapq
+from Backend.semantic_expansion import SemanticExpander, ArrayKeyedVectors
+from inverted_index_gcp import close_storage_client
+from config import Config
+import numpy as np
+import asyncio
+import time
+
+
+def _empty_table(dtype):
+    return SortedIdTable(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=dtype))
+
+
+class EngineNotReady(RuntimeError):
+    """
+    A query needs a component that is still loading or failed to load.
+
+    Attributes:
+        component (str): The component.
+        state (str): Its load state.
+    """
+
+    def __init__(self, component, state):
+        super().__init__(f"Component {component} is not ready ({state})")
+        self.component = component
+        self.state = state
 
 
 class SearchEngine:
@@ -22,65 +63,341 @@ class SearchEngine:
 
     Attributes:
         text_index (InvertedIndex): The inverted index for the text body.
-        pagerank (dict): PageRank scores for documents.
-        pageviews (dict): Page view counts for documents.
-        id_to_title (dict): Mapping from document IDs to titles.
+        doc_store (DocStore): Per-document arrays of a dense-id index, or None.
+        pagerank (SortedIdTable): PageRank per wiki id (empty with a DocStore).
+        pagerank_prior (PageRankPrior): Normalized log PageRank per document.
+        pageviews (SortedIdTable): Page views per wiki id (empty with a DocStore).
+        id_to_title (TitleStore): Memory-mapped titles by wiki id (the
+                                  id_to_title dict when no store was built).
+        components (ComponentLoader): Load state and timings of every component.
     """
 
-    def __init__(self):
+    def __init__(self, background=False):
         """
         Initializes the Search Engine by loading necessary data structures.
         Loads inverted index (text), PageRank scores, page views, and title mappings.
+
+        Args:
+            background (bool): Load the components concurrently on background
+                               threads and return at once. Queries are served
+                               as soon as the index is loaded, in degraded mode
+                               (no expansion, titles or PageRank prior) until
+                               the other components are; see status().
         """
         print("Initializing Search Engine")
-        self.text_index = load_index("text")
-        # self.title_index = load_index('title') # Removed
-        # self.anchor_index = load_index('anchor') # Removed
-        self.pagerank = load_pagerank()
-        self.pageviews = load_pageviews()
-        self.id_to_title = load_id_to_title()
-
-        # Initialize Semantic Expander
-        self.expander = SemanticExpander(model_path="data/word2vec.model")
-
-        # Compute AvgDL for BM25 if DL is available
+        # Placeholders, replaced as each component finishes loading
+        self.text_index = None
+        self.doc_store = None
         self.avgdl = 0
-        if hasattr(self.text_index, "DL"):
-            self.avgdl = sum(self.text_index.DL.values()) / len(self.text_index.DL)
+        self.pagerank = _empty_table(np.float64)
+        self.pageviews = _empty_table(np.int64)
+        self.pagerank_prior = PageRankPrior.from_arrays(
+            np.zeros(0), np.zeros(0, dtype=np.int64), 0.0, 0.0
+        )
+        self.id_to_title = {}
+        self.expander = SemanticExpander(model_path=None)
+
+        self.components = ComponentLoader()
+        for name, load, after in (
+            ("index", self._load_index, ()),
+            # Champion tier of head terms, used by RETRIEVAL_STRATEGY=tiered
+            ("champion", self._load_champion, ("index",)),
+            # Dense-id indexes carry PageRank and pageviews as arrays
+            ("pagerank", self._load_pagerank, ("index",)),
+            ("pageviews", self._load_pageviews, ("index",)),
+            ("titles", self._load_titles, ()),
+            ("expander", self._load_expander, ()),
+        ):
+            self.components.load(name, load, after=after, background=background)
+        if background:
+            print("Search Engine loading in the background.")
+            return
+        error = self.components.status()["index"].get("error")
+        if error is not None:
+            raise RuntimeError(f"Loading the index failed: {error}")
+        print("Search Engine initialized.")
+
+    def _load_index(self):
+        index = load_index("text")
+        # Compute AvgDL for BM25 if doc lengths are available
+        doc_stats = index.doc_length_stats()
+        if doc_stats is not None:
+            self.avgdl = doc_stats[1] / doc_stats[0]
             # Monkey patch the index to have avgdl property if we want consistency
-            self.text_index.avgdl = self.avgdl
+            index.avgdl = self.avgdl
+        self.doc_store = getattr(index, "doc_store", None)
+        # Published last: queries are served once text_index is set
+        self.text_index = index
+
+    def _load_champion(self):
+        champion = load_champion_tier()
+        if champion is not None and self.text_index is not None:
+            self.text_index.champion_index = champion
+
+    def _load_pagerank(self):
+        if self.doc_store is None:
+            self.pagerank = load_pagerank_table()
+        # Normalized log PageRank of every document, for the Stage 2 fusion
+        self.pagerank_prior = load_pagerank_prior(self.doc_store, self.pagerank)
+
+    def _load_pageviews(self):
+        if self.doc_store is None:
+            self.pageviews = load_pageviews_table()
+
+    def _load_titles(self):
+        self.id_to_title = load_titles()
+
+    def _load_expander(self):
+        self.expander = SemanticExpander(model_path="data/word2vec.model")
 
-        print("Search Engine initialized.")
+    def wait_until_loaded(self, timeout=None):
+        """
+        Waits for the background loading to finish.
+
+        Args:
+            timeout (float): Seconds to wait at most.
+
+        Returns:
+            bool: True if every component finished loading (or failed).
+        """
+        return self.components.wait(timeout)
+
+    def status(self):
+        """
+        Load state of the engine, for the health endpoints.
+
+        Returns:
+            dict: 'ready' (the index is loaded, queries are served), 'degraded'
+                  (components not loaded yet or failed, left out of the
+                  results) and per component its state and timings.
+        """
+        components = self.components.status()
+        return {
+            "ready": components["index"]["state"] == READY,
+            "degraded": sorted(name for name, c in components.items() if c["state"] != READY),
+            "components": components,
+        }
+
+    def _require(self, name):
+        """
+        Raises EngineNotReady unless the component is loaded.
+        """
+        if not self.components.is_ready(name):
+            state = self.components.status().get(name, {}).get("state")
+            raise EngineNotReady(name, state)
+
+    @classmethod
+    def from_snapshot(cls, path=None):
+        """
+        Opens an engine from a snapshot written by save_snapshot. Every
+        structure is a view of the memory-mapped file, so nothing is parsed
+        or summed up front and pages are read as queries touch them.
+
+        Args:
+            path (str): Snapshot file, defaults to Config.SNAPSHOT_PATH.
+
+        Returns:
+            SearchEngine: The engine.
+
+        Raises:
+            ValueError: If the file is not a current snapshot or the local
+                        index it was built from has changed.
+        """
+        path = Config.SNAPSHOT_PATH if path is None else path
+        start = time.perf_counter()
+        snapshot = Snapshot(path)
+        info = snapshot.manifest["engine"]
+
+        engine = cls.__new__(cls)
+        engine.components = ComponentLoader()
+        engine.text_index = open_index(snapshot, "index")
+        if "champion" in snapshot.manifest:
+            engine.text_index.champion_index = open_index(snapshot, "champion")
+        engine.doc_store = getattr(engine.text_index, "doc_store", None)
+        if engine.doc_store is None:
+            engine.pagerank = open_table(snapshot, "pagerank")
+            engine.pageviews = open_table(snapshot, "pageviews")
+        else:
+            engine.pagerank = _empty_table(np.float64)
+            engine.pageviews = _empty_table(np.int64)
+        engine.id_to_title = TitleStore(
+            **{attr: snapshot.array(f"titles.{attr}") for attr in TITLE_STORE_FILES}
+        )
+        prior = info["prior"]
+        engine.pagerank_prior = PageRankPrior.from_arrays(
+            snapshot.array("prior.values"),
+            snapshot.array("prior.doc_ids") if "prior.doc_ids" in snapshot else None,
+            prior["min_log_pr"], prior["max_log_pr"],
+        )
+        expander = info["expander"]
+        if expander is None:
+            engine.expander = SemanticExpander(model_path=None)
+        else:
+            vectors = ArrayKeyedVectors(
+                *(snapshot.array(f"expander.{attr}")
+                  for attr in ("vectors", "word_offsets", "word_blob", "sorted_rows"))
+            )
+            engine.expander = SemanticExpander(
+                model_path=None, topn=expander["topn"], threshold=expander["threshold"], model=vectors
+            )
+        engine.avgdl = info["avgdl"]
+        if engine.avgdl:
+            engine.text_index.avgdl = engine.avgdl
+        seconds = time.perf_counter() - start
+        for name in ("index", "champion", "pagerank", "pageviews", "titles", "expander"):
+            engine.components.mark_ready(name, seconds)
+        print(f"Search Engine opened from snapshot {path} ({snapshot.manifest['created']}) "
+              f"in {seconds:.3f}s.")
+        return engine
+
+    def save_snapshot(self, path=None):
+        """
+        Writes every static structure of the loaded engine (index, side
+        tables, champion tier, PageRank, pageviews, titles, PageRank prior,
+        Word2Vec vectors, avgdl) into one snapshot file for from_snapshot.
+
+        Args:
+            path (str): Snapshot file, defaults to Config.SNAPSHOT_PATH.
 
-    def search(self, query):
+        Returns:
+            int: Size of the snapshot in bytes.
+        """
+        path = Config.SNAPSHOT_PATH if path is None else path
+        writer = SnapshotWriter()
+        add_index(writer, "index", self.text_index, "data/postings_gcp")
+        champion = getattr(self.text_index, "champion_index", None)
+        if champion is not None:
+            add_index(writer, "champion", champion, "data/postings_champion")
+        if self.doc_store is None:
+            add_table(writer, "pagerank", self.pagerank)
+            add_table(writer, "pageviews", self.pageviews)
+
+        titles = self.id_to_title
+        if not isinstance(titles, TitleStore):
+            titles = TitleStore.build(titles.keys(), titles.values())
+        for attr in TITLE_STORE_FILES:
+            writer.add_array(f"titles.{attr}", getattr(titles, attr))
+
+        writer.add_array("prior.values", self.pagerank_prior.values)
+        if self.pagerank_prior.doc_ids is not None:
+            writer.add_array("prior.doc_ids", self.pagerank_prior.doc_ids)
+
+        expander = None
+        if self.expander.model_loaded:
+            vectors = self.expander.model
+            if not isinstance(vectors, ArrayKeyedVectors):
+                vectors = ArrayKeyedVectors.from_keyed_vectors(vectors)
+            for attr in ("vectors", "word_offsets", "word_blob", "sorted_rows"):
+                writer.add_array(f"expander.{attr}", getattr(vectors, attr))
+            expander = {"topn": self.expander.topn, "threshold": self.expander.threshold,
+                        "words": len(vectors)}
+
+        writer.manifest["created"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        writer.manifest["engine"] = {
+            "avgdl": self.avgdl,
+            "prior": {"min_log_pr": self.pagerank_prior.min_log_pr,
+                      "max_log_pr": self.pagerank_prior.max_log_pr},
+            "expander": expander,
+        }
+        return writer.write(path)
+
+    def search(self, query, strategy=None):
         """
         Executes a combined search using only Body index and PageRank.
         Uses efficient 2-stage retrieval:
-        1. BM25 scoring with candidate limiting (Heap)
+        1. BM25 scoring with candidate limiting (Config.RETRIEVAL_STRATEGY)
         2. Re-ranking top candidates with PageRank
 
         Args:
             query (str): The search query string.
+            strategy (str): Stage 1 strategy, e.g. 'tiered' to answer from the
+                            champion tier when possible. Defaults to
+                            Config.RETRIEVAL_STRATEGY.
 
         Returns:
             list: A list of tuples (doc_id, title) for the top ranked documents.
                   Returns up to 100 results.
+
+        Raises:
+            EngineNotReady: If the index is still loading or failed to load.
         """
-        tokens = tokenize(query)
+        self._require("index")
+        tokens, token_weights = self._query_terms(query)
         if not tokens:
             return []
+        return self._search_terms(tokens, token_weights, strategy)
 
-        token_weights = {t: 1.0 for t in tokens}
+    async def search_async(self, query, strategy=None, executor=None):
+        """
+        search() for the asyncio server: the posting reads are awaited, so
+        they overlap with those of other requests without holding a thread,
+        and the CPU work (expansion, decoding, scoring, fusion) runs on
+        `executor`.
 
-        # --- Query Expansion (Weak Queries) ---
-        # Heuristic: Short queries or low unique terms
-        if len(tokens) <= 2:
-            expanded = self.expander.expand(tokens)
-            for t in expanded:
-                if t not in token_weights:
-                    token_weights[t] = 0.3  # Constraint: weight <= 0.3
-                    tokens.append(t)
+        Args:
+            query (str): The search query string.
+            strategy (str): Stage 1 strategy, defaults to Config.RETRIEVAL_STRATEGY.
+            executor (concurrent.futures.Executor): Runs the CPU work; None
+                                                    for the loop's default one.
+
+        Returns:
+            list: Same results as search().
+
+        Raises:
+            EngineNotReady: If the index is still loading or failed to load.
+        """
+        self._require("index")
+        loop = asyncio.get_running_loop()
+        tokens, token_weights = await loop.run_in_executor(executor, self._query_terms, query)
+        if not tokens:
+            return []
+        raw = await fetch_postings_async(tokens, self.text_index, "postings_gcp", strategy)
+        return await loop.run_in_executor(
+            executor, self._with_postings, raw, self._search_terms, tokens, token_weights, strategy
+        )
 
+    def search_many(self, queries, strategy=None):
+        """
+        search() for a batch of queries, reading every distinct term's posting
+        list once for the whole batch: all queries are tokenized and expanded
+        up front, the union of their terms is read and decoded, and each query
+        is scored from those shared arrays.
+
+        Args:
+            queries (list): Query strings.
+            strategy (str): Stage 1 strategy, defaults to Config.RETRIEVAL_STRATEGY.
+                            'bmw', 'maxscore', 'tiered' and 'saat' read parts
+                            of the lists, so their queries read their own
+                            postings.
+
+        Returns:
+            list: The search() results of every query, in order.
+
+        Raises:
+            EngineNotReady: If the index is still loading or failed to load.
+        """
+        self._require("index")
+        terms = [self._query_terms(query) for query in queries]
+        shared = {}
+        if (strategy or Config.RETRIEVAL_STRATEGY) in FULL_LIST_STRATEGIES:
+            shared = read_posting_arrays(
+                (t for tokens, _ in terms for t in tokens), self.text_index, "postings_gcp"
+            )
+        with prefetched_postings(self.text_index, arrays=shared):
+            return [
+                self._search_terms(tokens, token_weights, strategy) if tokens else []
+                for tokens, token_weights in terms
+            ]
+
+    def _with_postings(self, raw, fn, *args):
+        with prefetched_postings(self.text_index, raw):
+            return fn(*args)
+
+    def _search_terms(self, tokens, token_weights, strategy=None):
+        """
+        Stage 1 retrieval and Stage 2 fusion of search() for tokenized,
+        expanded query terms.
+        """
         # --- Index Elimination / Pruning ---
         # Sort tokens by IDF (assuming high IDF > low IDF)
         # N = len(self.text_index.posting_locs)
@@ -97,63 +414,106 @@ class SearchEngine:
         # --- Stage 1: Candidate Limiting (BM25) ---
         # Get top 2000 docs roughly
         N_CANDIDATES = 2000
-        candidates_list = get_candidate_documents(
+        candidates_list = retrieve_candidates(
             pruned_tokens,
             self.text_index,
             "postings_gcp",
             k=N_CANDIDATES,
             token_weights=token_weights,
+            strategy=strategy,
         )
 
         if not candidates_list:
             return []
 
         # --- Stage 2: PageRank Integration ---
-        # Normalize BM25 scores
-        max_score = candidates_list[0][
-            1
-        ]  # Sorted/Heap returns descend? heapq.nlargest returns desc.
-        if max_score <= 0:
-            max_score = 1
-
-        w_text = 0.85
-        w_pr = 0.15
-
-        # Pre-calculated Min/Max Log(PR+1)
-        min_log_pr = 0.14
-        max_log_pr = 9.2  # From given context
-
-        final_scores = []
-
-        for doc_id, bm25_score in candidates_list:
-            norm_bm25 = bm25_score / max_score
-
-            pr_val = self.pagerank.get(doc_id, 0)
-            log_pr = math.log(pr_val + 1)
-            norm_pr = (log_pr - min_log_pr) / (max_log_pr - min_log_pr)
-            norm_pr = max(0.0, min(1.0, norm_pr))
-
-            final_score = (w_text * norm_bm25) + (w_pr * norm_pr)
-            final_scores.append((str(doc_id), final_score))
-
-        # Sort top 100
-        # final_scores is typically small (2000 items), sorted is fast.
-        top_100 = sorted(final_scores, key=lambda x: x[1], reverse=True)[:100]
-
-        # Format (Fetch titles ONLY for top 100)
-        res = []
-        for doc_id, score in top_100:
-            title = None
-            try:
-                title = self.id_to_title.get(int(doc_id))
-            except:
-                pass
-            if title is None:
-                title = self.id_to_title.get(doc_id, str(doc_id))
-            res.append((doc_id, title))
+        # BM25 normalized by the best candidate, blended with the precomputed
+        # PageRank prior (Config.FUSION_TEXT_WEIGHT / FUSION_PAGERANK_WEIGHT)
+        top_ids, _ = fuse_top_n(candidates_list, self.pagerank_prior, n=100)
+
+        # Format (wiki ids, strings and titles ONLY for the top 100)
+        wiki_ids = self._to_wiki_ids(top_ids)
+        res = self._result_rows(wiki_ids)
 
         return res
 
+    def _query_terms(self, query):
+        """
+        Tokenizes the query and expands weak queries with Word2Vec neighbours.
+
+        Args:
+            query (str): The search query string.
+
+        Returns:
+            tuple: (tokens, token_weights). Expansion terms are appended to
+                   tokens with weight 0.3; original tokens have weight 1.0.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return [], {}
+
+        token_weights = {t: 1.0 for t in tokens}
+
+        # --- Query Expansion (Weak Queries) ---
+        # Heuristic: Short queries or low unique terms
+        if len(tokens) <= 2:
+            expanded = self.expander.expand(tokens)
+            for t in expanded:
+                if t not in token_weights:
+                    token_weights[t] = 0.3  # Constraint: weight <= 0.3
+                    tokens.append(t)
+
+        return tokens, token_weights
+
+    def _to_wiki_ids(self, doc_ids):
+        """
+        Translates index doc ids to wiki ids, for the API boundary.
+
+        Args:
+            doc_ids (list): Doc ids as returned by retrieve_candidates.
+
+        Returns:
+            list: Wiki ids (the same ids unless the index uses dense ids).
+        """
+        if self.doc_store is not None:
+            return self.doc_store.to_wiki(doc_ids).tolist()
+        return [int(doc_id) for doc_id in doc_ids]
+
+    def _doc_column(self, values, wiki_ids, column):
+        """
+        Looks up a per-document value for wiki ids from the API, vectorized
+        over the whole batch.
+
+        Args:
+            values (SortedIdTable): The value per wiki id, used without a DocStore.
+            wiki_ids (list): Wiki ids, as sent by the client.
+            column (str): DocStore column ('pagerank' or 'pageviews').
+
+        Returns:
+            list: The values, 0 for unknown ids.
+        """
+        ids = np.asarray(wiki_ids)
+        if ids.dtype.kind == "i" and ids.ndim == 1:
+            ids = ids.astype(np.int64, copy=False)
+            found = np.ones(len(ids), dtype=bool)
+        else:
+            # Ids that are not ints are unknown, as they were for the dicts
+            int64 = np.iinfo(np.int64)
+            ids = np.fromiter(
+                (w if isinstance(w, int) and int64.min <= w <= int64.max else -1 for w in wiki_ids),
+                dtype=np.int64, count=len(wiki_ids),
+            )
+            found = np.fromiter((isinstance(w, int) for w in wiki_ids), dtype=bool, count=len(wiki_ids))
+        if self.doc_store is None:
+            result = values.lookup(ids)
+            result[~found] = 0
+            return result.tolist()
+        dense = self.doc_store.to_dense(ids)
+        found &= dense >= 0
+        result = np.zeros(len(ids), dtype=getattr(self.doc_store, column).dtype)
+        result[found] = getattr(self.doc_store, column)[dense[found]]
+        return result.tolist()
+
     def search_body(self, query):
         """
         Searches using only the body text index.
@@ -164,8 +524,37 @@ class SearchEngine:
 
         Returns:
             list: A list of tuples (doc_id, title) for the top ranked documents.
+
+        Raises:
+            EngineNotReady: If the index is still loading or failed to load.
         """
+        self._require("index")
         tokens = tokenize(query)
+        return self._search_body_terms(tokens)
+
+    async def search_body_async(self, query, executor=None):
+        """
+        search_body() for the asyncio server, see search_async().
+
+        Args:
+            query (str): The search query string.
+            executor (concurrent.futures.Executor): Runs the CPU work.
+
+        Returns:
+            list: Same results as search_body().
+
+        Raises:
+            EngineNotReady: If the index is still loading or failed to load.
+        """
+        self._require("index")
+        tokens = tokenize(query)
+        raw = await fetch_postings_async(tokens, self.text_index, "postings_gcp", "tfidf")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, self._with_postings, raw, self._search_body_terms, tokens
+        )
+
+    def _search_body_terms(self, tokens):
         # Use existing legacy/debug function, but formats it
         res = calculate_tfidf_score_with_dir(tokens, self.text_index, "postings_gcp")
         return self._format(res)
@@ -205,20 +594,72 @@ class SearchEngine:
         Returns:
             list: A list of tuples (doc_id, title) sorted by score.
         """
-        final_res = []
         # Sort if not sorted? results might be from legacy dict items
         sorted_res = sorted(results, key=lambda x: x[1], reverse=True)[:100]
+        wiki_ids = self._to_wiki_ids([doc_id for doc_id, _ in sorted_res])
+
+        return self._result_rows(wiki_ids)
+
+    def _result_rows(self, wiki_ids):
+        """
+        Result rows of wiki ids: the id string and the title, or the id
+        string again when the title is unknown (or titles are still loading).
+
+        Args:
+            wiki_ids (list): Integer wiki ids, best first.
+
+        Returns:
+            list: (doc_id, title) string tuples.
+        """
+        return [
+            (str(wiki_id), str(wiki_id) if title is None else title)
+            for wiki_id, title in zip(wiki_ids, self._titles(wiki_ids))
+        ]
+
+    def _titles(self, wiki_ids):
+        """
+        Titles of the wiki ids of one response; only these are decoded from
+        the title store.
+
+        Args:
+            wiki_ids (list): Integer wiki ids.
+
+        Returns:
+            list: Titles aligned with wiki_ids (None when unknown).
+        """
+        if hasattr(self.id_to_title, "titles"):
+            return self.id_to_title.titles(wiki_ids)
+        return [self.id_to_title.get(wiki_id) for wiki_id in wiki_ids]
 
-        for doc_id, score in sorted_res:
-            title = None
-            try:
-                title = self.id_to_title.get(int(doc_id))
-            except:
-                pass
-            if title is None:
-                title = self.id_to_title.get(doc_id, str(doc_id))
-            final_res.append((str(doc_id), title))
-        return final_res
+    def close(self):
+        """
+        Releases the posting readers (mapped blocks, open files, blob readers)
+        and the shared storage client. Registered as a shutdown hook by the server.
+        """
+        if self.text_index is not None:
+            self.text_index.close_readers()
+            champion = getattr(self.text_index, "champion_index", None)
+            if champion is not None:
+                champion.close_readers()
+        close_storage_client()
+
+    def tier_stats(self):
+        """
+        Champion tier hit rate of the tiered searches served so far.
+
+        Returns:
+            dict: Counts per outcome and the hit rate (see ranking_v2.tier_stats).
+        """
+        return tier_stats()
+
+    def inline_stats(self):
+        """
+        Share of query terms whose postings were read from the term dictionary.
+
+        Returns:
+            dict: Inline and file counts and the inline rate (see ranking_v2.inline_stats).
+        """
+        return inline_stats()
 
     def get_pagerank(self, wiki_ids):
         """
@@ -229,8 +670,13 @@ class SearchEngine:
 
         Returns:
             list: List of PageRank scores corresponding to the input IDs.
+
+        Raises:
+            EngineNotReady: If they are still loading or failed to load.
         """
-        return [self.pagerank.get(doc_id, 0) for doc_id in wiki_ids]
+        # With a DocStore the values come with the index
+        self._require("index" if self.doc_store is not None else "pagerank")
+        return self._doc_column(self.pagerank, wiki_ids, "pagerank")
 
     def get_pageviews(self, wiki_ids):
         """
@@ -241,5 +687,10 @@ class SearchEngine:
 
         Returns:
             list: List of page view counts corresponding to the input IDs.
+
+        Raises:
+            EngineNotReady: If they are still loading or failed to load.
         """
-        return [self.pageviews.get(doc_id, 0) for doc_id in wiki_ids]
+        # With a DocStore the values come with the index
+        self._require("index" if self.doc_store is not None else "pageviews")
+        return self._doc_column(self.pageviews, wiki_ids, "pageviews")
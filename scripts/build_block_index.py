@@ -0,0 +1,63 @@
+import sys
+import argparse
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root))
+
+from inverted_index_gcp import (
+    InvertedIndex,
+    BlockMaxTable,
+    POSTINGS_V2,
+    build_block_meta,
+    encode_posting_list_v2,
+)
+
+
+def build_block_table(index_dir, name="index", bucket_name=None):
+    """
+    Builds the block side table (last doc_id, max tf, min doc length and byte
+    offset per block of postings) for an index that was written without one,
+    e.g. the body index built on Spark, and saves it next to `name`.pkl.
+
+    Args:
+        index_dir (str): Directory (or bucket prefix) of the index.
+        name (str): Index name (`name`.pkl).
+        bucket_name (str): GCS bucket, None for local.
+
+    Returns:
+        BlockMaxTable: The new table.
+    """
+    index = InvertedIndex.read_index(index_dir, name, bucket_name)
+    if index.doc_length_stats() is None:
+        print("Index has no DL, min doc lengths are left at 0.")
+
+    table = BlockMaxTable()
+    print(f"Building block table for {len(index.posting_locs)} terms...")
+    for i, term in enumerate(sorted(index.posting_locs)):
+        doc_ids, tfs = index.read_a_posting_arrays(index_dir, term, bucket_name)
+        offsets = None
+        if index.version == POSTINGS_V2:
+            _, offsets = encode_posting_list_v2(doc_ids, tfs, with_offsets=True)
+        doc_lens = index.doc_lengths(doc_ids)
+        table.add(term, build_block_meta(doc_ids, tfs, doc_lens, offsets))
+        if (i + 1) % 100000 == 0:
+            print(f"  {i + 1} terms done")
+
+    table.save(index_dir, name, bucket_name)
+    print(f"Saved {len(table.blocks)} blocks to {index_dir}/{name}_blocks.npy")
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the block-max side table of an existing index"
+    )
+    parser.add_argument("--index_dir", type=str, default="data/postings_gcp", help="Index directory")
+    parser.add_argument("--name", type=str, default="index", help="Index name")
+    parser.add_argument("--bucket", type=str, default=None, help="GCS bucket, local if omitted")
+    args = parser.parse_args()
+
+    build_block_table(args.index_dir, args.name, args.bucket)
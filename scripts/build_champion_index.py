@@ -0,0 +1,135 @@
+import sys
+import argparse
+from collections import Counter, defaultdict
+from pathlib import Path
+import numpy as np
+
+# Add project root to path
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root))
+
+from config import Config
+from inverted_index_gcp import (
+    InvertedIndex,
+    MultiFileWriter,
+    POSTINGS_V2,
+    encode_posting_list_v2,
+)
+from Backend.data_Loader import load_pagerank_table
+from Backend.ranking_v2 import BM25_K1, BM25_B, bm25_impact_params, bm25_impacts
+from Backend.fusion import load_pagerank_prior
+
+
+def build_champion_index(index_dir, out_dir, name="index", bucket_name=None,
+                         min_df=None, size=None, prior_weight=None):
+    """
+    Builds the champion tier: for every term with df >= `min_df`, the `size`
+    postings with the best BM25 contribution (normalized by the term's best
+    one) plus `prior_weight` times the PageRank prior used by the Stage 2
+    fusion (see Backend.fusion.PageRankPrior). The lists are
+    written as a separate v2 posting set in `out_dir`, with the largest BM25
+    contribution left out of each list (its tail bound), which the tiered
+    search uses to decide whether the champions are enough.
+
+    Args:
+        index_dir (str): Directory (or bucket prefix) of the full index.
+        out_dir (str): Directory (or bucket prefix) of the champion tier.
+        name (str): Index name (`name`.pkl), used for both.
+        bucket_name (str): GCS bucket for both, None for local.
+        min_df (int): df threshold, defaults to Config.CHAMPION_MIN_DF.
+        size (int): Champions per term, defaults to Config.CHAMPION_SIZE.
+        prior_weight (float): Weight of the PageRank prior, defaults to
+                              Config.CHAMPION_PRIOR_WEIGHT.
+
+    Returns:
+        InvertedIndex: The champion index.
+    """
+    min_df = min_df or Config.CHAMPION_MIN_DF
+    size = size or Config.CHAMPION_SIZE
+    prior_weight = Config.CHAMPION_PRIOR_WEIGHT if prior_weight is None else prior_weight
+
+    index = InvertedIndex.read_index(index_dir, name, bucket_name)
+    doc_store = getattr(index, "doc_store", None)
+    pagerank = load_pagerank_table() if doc_store is None else None
+    if doc_store is None and not pagerank:
+        print("No PageRank found, champions are picked by BM25 only.")
+    prior = load_pagerank_prior(doc_store, pagerank)
+    # Unquantized: only k1, b, N and avgdl are used
+    params = bm25_impact_params(index, 16, BM25_K1, BM25_B)
+    terms = sorted(t for t, df in index.df.items() if df >= min_df and t in index.posting_locs)
+
+    if bucket_name is None:
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+
+    champion = InvertedIndex()
+    champion.posting_format = POSTINGS_V2
+    champion.posting_locs = defaultdict(list)
+    champion.posting_sizes = Counter()
+    champion.tail_bounds = {}
+    champion.params = {
+        "k1": params["k1"], "b": params["b"], "N": params["N"],
+        "min_df": min_df, "size": size, "prior_weight": prior_weight,
+        "dense_doc_ids": getattr(index, "dense_doc_ids", False),
+    }
+
+    kept, total = 0, 0
+    print(f"Building champion lists of {size} postings for {len(terms)} terms (df >= {min_df})...")
+    writer = MultiFileWriter(out_dir, "champion", bucket_name)
+    try:
+        for i, term in enumerate(terms):
+            doc_ids, tfs = index.read_a_posting_arrays(index_dir, term, bucket_name)
+            bm25 = bm25_impacts(index, term, doc_ids, tfs, params)
+            if len(doc_ids) > size:
+                goodness = bm25 / max(bm25.max(), 1e-12)
+                goodness += prior_weight * prior.lookup(doc_ids)
+                chosen = np.zeros(len(doc_ids), dtype=bool)
+                chosen[np.argpartition(-goodness, size - 1)[:size]] = True
+                tail_bound = float(bm25[~chosen].max())
+                doc_ids, tfs = doc_ids[chosen], tfs[chosen]
+            else:
+                tail_bound = 0.0
+
+            b = encode_posting_list_v2(doc_ids, tfs)
+            # The reader joins base_dir with the stored name, keep file names only
+            champion.posting_locs[term] = [
+                (Path(f_name).name, offset) for f_name, offset in writer.write(b)
+            ]
+            champion.posting_sizes[term] = len(b)
+            champion.df[term] = len(doc_ids)
+            champion.tail_bounds[term] = tail_bound
+            kept += len(doc_ids)
+            total += index.df[term]
+            if (i + 1) % 1000 == 0:
+                print(f"  {i + 1} terms done")
+    finally:
+        writer.close()
+
+    champion.write_index(out_dir, name, bucket_name)
+    print(
+        f"Done. {kept:,} of {total:,} postings kept "
+        f"({kept / max(total, 1):.1%}) in {out_dir}"
+    )
+    return champion
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the champion tier (top postings of high-df terms) of the body index"
+    )
+    parser.add_argument("--index_dir", type=str, default="data/postings_gcp", help="Full index directory")
+    parser.add_argument("--out_dir", type=str, default="data/postings_champion", help="Champion tier directory")
+    parser.add_argument("--name", type=str, default="index", help="Index name")
+    parser.add_argument("--bucket", type=str, default=None, help="GCS bucket, local if omitted")
+    parser.add_argument("--min_df", type=int, default=None, help="df threshold (default Config.CHAMPION_MIN_DF)")
+    parser.add_argument("--size", type=int, default=None, help="Champions per term (default Config.CHAMPION_SIZE)")
+    parser.add_argument(
+        "--prior_weight", type=float, default=None,
+        help="PageRank prior weight (default Config.CHAMPION_PRIOR_WEIGHT)",
+    )
+    args = parser.parse_args()
+
+    build_champion_index(
+        args.index_dir, args.out_dir, args.name, args.bucket,
+        args.min_df, args.size, args.prior_weight,
+    )
@@ -0,0 +1,210 @@
+import sys
+import argparse
+from pathlib import Path
+import numpy as np
+
+# Add project root to path
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root))
+
+from config import Config
+from inverted_index_gcp import (
+    InvertedIndex,
+    ImpactTable,
+    ImpactOrderedTable,
+    build_impact_segments,
+    quantize_impacts,
+)
+from Backend.ranking_v2 import (
+    BM25_K1,
+    BM25_B,
+    bm25_impact_params,
+    bm25_impacts,
+    impact_scale,
+)
+
+
+def _top_doc_ids(doc_ids, scores, k):
+    """
+    Doc ids of the k best scores, ties broken by ascending doc id as the
+    search engine does.
+    """
+    return doc_ids[np.lexsort((doc_ids, -scores))[:k]]
+
+
+def build_impact_table(index_dir, name="index", bucket_name=None, bits=None,
+                       k1=BM25_K1, b=BM25_B, order_min_df=None):
+    """
+    Precomputes the BM25 contribution of every posting for the given k1/b and
+    the index's collection stats, quantizes it and saves the impact table next
+    to `name`.pkl. Terms with df >= `order_min_df` also get an impact-ordered
+    copy of their postings for score-at-a-time retrieval. Run it again whenever
+    k1, b or the index change: the search engine ignores tables built for other
+    BM25 parameters.
+
+    Args:
+        index_dir (str): Directory (or bucket prefix) of the index.
+        name (str): Index name (`name`.pkl).
+        bucket_name (str): GCS bucket, None for local.
+        bits (int): 8 or 16, defaults to Config.IMPACT_BITS.
+        k1 (float): BM25 k1.
+        b (float): BM25 b.
+        order_min_df (int): df threshold of the impact-ordered copies, defaults
+                            to Config.IMPACT_ORDER_MIN_DF (0 disables them).
+
+    Returns:
+        tuple: (index, table) with the new ImpactTable attached to the index.
+    """
+    bits = bits or Config.IMPACT_BITS
+    if order_min_df is None:
+        order_min_df = Config.IMPACT_ORDER_MIN_DF
+    index = InvertedIndex.read_index(index_dir, name, bucket_name)
+    if index.doc_length_stats() is None:
+        print("Index has no DL, impacts are computed with b=0.")
+
+    params = bm25_impact_params(index, bits, k1, b)
+    table = ImpactTable(params)
+    order_table = ImpactOrderedTable(params)
+    print(
+        f"Building {bits}-bit impacts for {len(index.posting_locs)} terms "
+        f"(k1={params['k1']}, b={params['b']}, one scale per term)..."
+    )
+    for i, term in enumerate(sorted(index.posting_locs)):
+        doc_ids, tfs = index.read_a_posting_arrays(index_dir, term, bucket_name)
+        scores = bm25_impacts(index, term, doc_ids, tfs, params)
+        impacts = quantize_impacts(scores, impact_scale(params, index.df[term]), bits)
+        table.add(term, impacts)
+        if order_min_df and index.df[term] >= order_min_df:
+            order_table.add(term, *build_impact_segments(doc_ids, impacts))
+        if (i + 1) % 100000 == 0:
+            print(f"  {i + 1} terms done")
+
+    table.save(index_dir, name, bucket_name)
+    print(f"Saved {len(table.rows):,} impacts to {index_dir}/{name}_impacts.npy")
+    index.impact_table = table
+    if len(order_table) > 0:
+        order_table.save(index_dir, name, bucket_name)
+        print(f"Saved impact-ordered copies of {len(order_table)} terms (df >= {order_min_df})")
+        index.impact_order_table = order_table
+    return index, table
+
+
+def check_impact_table(index, index_dir, bucket_name=None, n_terms=1000, seed=0,
+                       n_head_terms=100, k=2000, min_overlap=None):
+    """
+    Compares the dequantized impacts of a random sample of terms with the
+    float BM25 scorer. Rounding is off by at most half a quantization step;
+    impacts below half a step are stored as 1, so the bound is one step.
+    Quantization also turns near-ties into ties, which matters most for the
+    terms with the most postings, so for the `n_head_terms` most frequent
+    terms the top-k of a single-term query by impact is compared with the
+    float top-k.
+
+    Args:
+        index (InvertedIndex): Index with an impact_table attached.
+        index_dir (str): Directory (or bucket prefix) of the index.
+        bucket_name (str): GCS bucket, None for local.
+        n_terms (int): Number of terms to check.
+        seed (int): Sampling seed.
+        n_head_terms (int): Most frequent terms whose top-k overlap is checked.
+        k (int): Top-k size of the overlap check (2000 in SearchEngine.search).
+        min_overlap (float): Smallest accepted top-k overlap, defaults to
+                             Config.IMPACT_MIN_OVERLAP.
+
+    Returns:
+        bool: True if every checked posting is within one step and the top-k
+              overlap of every head term is at least min_overlap.
+    """
+    if min_overlap is None:
+        min_overlap = Config.IMPACT_MIN_OVERLAP
+    table = index.impact_table
+    params = table.params
+    terms = sorted(table.slices)
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(terms), size=min(n_terms, len(terms)), replace=False)
+
+    worst, total_err, n_postings, misaligned = 0.0, 0.0, 0, 0
+    for i in sample:
+        term = terms[i]
+        doc_ids, tfs = index.read_a_posting_arrays(index_dir, term, bucket_name)
+        impacts = table.term_impacts(term)
+        if len(impacts) != len(doc_ids):
+            misaligned += 1
+            continue
+        scale = impact_scale(params, index.df[term])
+        exact = bm25_impacts(index, term, doc_ids, tfs, params)
+        err = np.abs(impacts.astype(np.float64) * scale - exact) / scale
+        if len(err):
+            worst = max(worst, float(err.max()))
+            total_err += float(err.sum())
+            n_postings += len(err)
+
+    print(
+        f"Checked {len(sample)} terms / {n_postings:,} postings: "
+        f"max error {worst:.3f} steps, mean {total_err / max(n_postings, 1):.3f} steps, "
+        f"misaligned terms: {misaligned}"
+    )
+
+    heads = sorted(
+        (t for t in terms if index.df[t] > k), key=lambda t: index.df[t], reverse=True
+    )[:n_head_terms]
+    overlaps = []
+    for term in heads:
+        doc_ids, tfs = index.read_a_posting_arrays(index_dir, term, bucket_name)
+        impacts = table.term_impacts(term)
+        if len(impacts) != len(doc_ids):
+            continue
+        exact = bm25_impacts(index, term, doc_ids, tfs, params)
+        expected = _top_doc_ids(doc_ids, exact, k)
+        got = _top_doc_ids(doc_ids, impacts.astype(np.float64), k)
+        overlaps.append((len(np.intersect1d(expected, got)) / len(expected), term))
+    worst_overlap = min(overlaps) if overlaps else (1.0, None)
+    if overlaps:
+        print(
+            f"Top-{k} overlap with the float scorer over {len(overlaps)} head terms: "
+            f"mean {np.mean([o for o, _ in overlaps]):.4f}, "
+            f"min {worst_overlap[0]:.4f} ('{worst_overlap[1]}'), required {min_overlap}"
+        )
+
+    return misaligned == 0 and worst <= 1.0 + 1e-6 and worst_overlap[0] >= min_overlap
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build (or rebuild for new k1/b) the quantized BM25 impact table of an index"
+    )
+    parser.add_argument("--index_dir", type=str, default="data/postings_gcp", help="Index directory")
+    parser.add_argument("--name", type=str, default="index", help="Index name")
+    parser.add_argument("--bucket", type=str, default=None, help="GCS bucket, local if omitted")
+    parser.add_argument("--bits", type=int, default=None, choices=[8, 16], help="Bits per impact")
+    parser.add_argument("--k1", type=float, default=BM25_K1, help="BM25 k1")
+    parser.add_argument("--b", type=float, default=BM25_B, help="BM25 b")
+    parser.add_argument(
+        "--order_min_df", type=int, default=None,
+        help="df threshold for impact-ordered copies (default Config.IMPACT_ORDER_MIN_DF, 0 to skip)",
+    )
+    parser.add_argument("--check_terms", type=int, default=1000, help="Terms to verify, 0 to skip")
+    parser.add_argument(
+        "--min_overlap", type=float, default=None,
+        help="Smallest accepted top-2000 overlap of a head term (default Config.IMPACT_MIN_OVERLAP)",
+    )
+    parser.add_argument("--check_only", action="store_true", help="Verify the existing table only")
+    args = parser.parse_args()
+
+    if args.check_only:
+        index = InvertedIndex.read_index(args.index_dir, args.name, args.bucket)
+        if getattr(index, "impact_table", None) is None:
+            sys.exit(f"No impact table in {args.index_dir}")
+    else:
+        index, _ = build_impact_table(
+            args.index_dir, args.name, args.bucket, args.bits, args.k1, args.b,
+            args.order_min_df,
+        )
+
+    if args.check_terms > 0:
+        ok = check_impact_table(
+            index, args.index_dir, args.bucket, args.check_terms, min_overlap=args.min_overlap
+        )
+        if not ok:
+            sys.exit("Impact check failed")
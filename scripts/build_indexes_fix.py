@@ -10,7 +10,7 @@ project_root = current_dir.parent
 sys.path.append(str(project_root))
 sys.path.append(str(project_root.parent / 'IR_Project' / 'Backend'))
 
-from inverted_index_gcp import InvertedIndex, MultiFileWriter
+from inverted_index_gcp import InvertedIndex, MultiFileWriter, BlockMaxTable, build_block_meta
 from tokenizer import tokenize
 
 # Ensure TUPLE_SIZE is consistent
@@ -19,7 +19,9 @@ TUPLE_SIZE = 6
 def write_memory_index_to_disk(index, base_dir, name):
     """
     Writes the in-memory `_posting_list` of the index to disk using MultiFileWriter
-    and updates `posting_locs`. Then writes the index metadata.
+    and updates `posting_locs`. Builds the block side table (last doc_id, max tf,
+    min doc length, byte offset per block of postings) along the way, then writes
+    the index metadata and the table.
     """
     base_dir = Path(base_dir)
     base_dir.mkdir(parents=True, exist_ok=True)
@@ -28,6 +30,8 @@ def write_memory_index_to_disk(index, base_dir, name):
     
     # Use MultiFileWriter
     writer = MultiFileWriter(base_dir, name)
+    index.block_table = BlockMaxTable()
+    doc_lengths = getattr(index, 'DL', None)
     try:
         # Sort terms
         sorted_terms = sorted(index._posting_list.keys())
@@ -45,6 +49,13 @@ def write_memory_index_to_disk(index, base_dir, name):
                    tf = 65535
                 b.extend(tf.to_bytes(2, 'big'))
             
+            doc_ids = [doc_id for doc_id, _ in pl]
+            tfs = [min(tf, 65535) for _, tf in pl]
+            doc_lens = None
+            if doc_lengths is not None:
+                doc_lens = [doc_lengths.get(doc_id, 0) for doc_id in doc_ids]
+            index.block_table.add(term, build_block_meta(doc_ids, tfs, doc_lens))
+
             # Write to file
             locs = writer.write(b)
             index.posting_locs[term].extend(locs)
@@ -0,0 +1,111 @@
+import sys
+import os
+import glob
+import pickle
+import random
+import argparse
+from pathlib import Path
+import pandas as pd
+
+# Add project root to path
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root))
+
+from config import Config
+from Backend.data_Loader import get_bucket, read_id_to_title_parquet
+from Backend.title_store import TitleStore, TITLE_STORE_FILES
+
+
+def _read_columns(pkl_path=None, parquet_dir=None):
+    """
+    Reads (ids, titles) from a pickled dict, a local directory of parquet
+    files, or the id_to_title parquet files in GCS (the default).
+    """
+    if pkl_path:
+        print(f"Reading {pkl_path}...")
+        with open(pkl_path, "rb") as f:
+            id_to_title = pickle.load(f)
+        return list(id_to_title.keys()), list(id_to_title.values())
+    if parquet_dir:
+        files = sorted(glob.glob(os.path.join(parquet_dir, "*.parquet")))
+        print(f"Reading {len(files)} parquet files from {parquet_dir}...")
+        if not files:
+            return None
+        df = pd.concat([pd.read_parquet(f) for f in files])
+        if "id" in df.columns and "title" in df.columns:
+            return df["id"], df["title"]
+        return df.iloc[:, 0], df.iloc[:, 1]
+    print(f"Reading parquet files from gs://{Config.BUCKET_NAME}/{Config.ID_TO_TITLE_PARQUET_DIR_GCS}...")
+    return read_id_to_title_parquet()
+
+
+def _check_store(store, ids, titles, n_samples=10000, seed=0):
+    """
+    Compares lookups of a sample of ids with the source columns (the last
+    title wins for repeated ids, as in a dict).
+
+    Returns:
+        bool: True if every sampled title matches.
+    """
+    expected = dict(zip(ids, titles))
+    sample = random.Random(seed).sample(list(expected), min(n_samples, len(expected)))
+    got = store.titles(sample)
+    bad = [
+        i for i, title in zip(sample, got)
+        if title != ("" if expected[i] is None else str(expected[i]))
+    ]
+    if bad:
+        print(f"{len(bad)} of {len(sample)} sampled titles differ, e.g. id {bad[0]}")
+    return not bad
+
+
+def build_title_store(out_dir, pkl_path=None, parquet_dir=None, upload=False):
+    """
+    Builds the memory-mapped title store (see Backend.title_store) and
+    optionally uploads it to Config.TITLE_STORE_DIR_GCS, where servers
+    download it from on startup.
+
+    Args:
+        out_dir (str): Local directory of the store.
+        pkl_path (str): Pickled {id: title} dict to read instead of parquet.
+        parquet_dir (str): Local directory of id_to_title parquet files.
+        upload (bool): Upload the store files to GCS.
+
+    Returns:
+        TitleStore: The store, opened from `out_dir`.
+    """
+    columns = _read_columns(pkl_path, parquet_dir)
+    if columns is None:
+        raise FileNotFoundError("No id_to_title source found")
+    ids, titles = columns
+    ids = [int(i) for i in ids]
+    titles = list(titles)
+
+    store = TitleStore.build(ids, titles)
+    store.save(out_dir)
+    store = TitleStore.load(out_dir)
+    print(f"Wrote {len(store):,} titles ({len(store.blob) / 1024 ** 2:.1f} MB of UTF-8) to {out_dir}")
+    if not _check_store(store, ids, titles):
+        raise ValueError("Title store does not match its source")
+
+    if upload:
+        bucket = get_bucket()
+        for name in TITLE_STORE_FILES.values():
+            blob_name = f"{Config.TITLE_STORE_DIR_GCS}/{name}"
+            bucket.blob(blob_name).upload_from_filename(os.path.join(out_dir, name))
+            print(f"Uploaded gs://{Config.BUCKET_NAME}/{blob_name}")
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the memory-mapped title store from id_to_title"
+    )
+    parser.add_argument("--out_dir", type=str, default=Config.TITLE_STORE_DIR, help="Store directory")
+    parser.add_argument("--pkl", type=str, default=None, help="Read a pickled id_to_title dict")
+    parser.add_argument("--parquet_dir", type=str, default=None, help="Read local parquet files")
+    parser.add_argument("--upload", action="store_true", help="Upload the store to Config.TITLE_STORE_DIR_GCS")
+    args = parser.parse_args()
+
+    build_title_store(args.out_dir, args.pkl, args.parquet_dir, args.upload)
@@ -0,0 +1,96 @@
+import sys
+import os
+import argparse
+from collections import Counter, defaultdict
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root))
+
+from inverted_index_gcp import (
+    InvertedIndex,
+    MultiFileWriter,
+    BlockMaxTable,
+    POSTINGS_V2,
+    build_block_meta,
+    encode_posting_list_v2,
+)
+
+
+def convert_index_to_v2(src_dir, dst_dir, name="index", bucket_name=None):
+    """
+    Streams every posting list of an existing (v1) index into the compressed
+    v2 block format and writes a matching `name`.pkl next to the new files.
+
+    Only one posting list is held in memory at a time, so the body index can be
+    converted on the same VM that serves it. The block side table is rebuilt
+    for the new layout, since block byte offsets change.
+
+    Args:
+        src_dir (str): Directory (or bucket prefix) of the v1 index, e.g. 'data/postings_gcp'.
+        dst_dir (str): Directory (or bucket prefix) for the v2 files.
+        name (str): Index name (`name`.pkl).
+        bucket_name (str): GCS bucket for both source and destination, None for local.
+
+    Returns:
+        tuple: (bytes_before, bytes_after) posting list sizes.
+    """
+    index = InvertedIndex.read_index(src_dir, name, bucket_name)
+    if index.version == POSTINGS_V2:
+        print(f"{src_dir}/{name}.pkl is already v2, nothing to do.")
+        return 0, 0
+
+    if bucket_name is None:
+        Path(dst_dir).mkdir(parents=True, exist_ok=True)
+
+    posting_locs = defaultdict(list)
+    posting_sizes = Counter()
+    block_table = BlockMaxTable()
+    bytes_before = 0
+
+    print(f"Converting {len(index.posting_locs)} posting lists from {src_dir} to {dst_dir}...")
+    writer = MultiFileWriter(dst_dir, "v2", bucket_name)
+    try:
+        for i, term in enumerate(sorted(index.posting_locs)):
+            doc_ids, tfs = index.read_a_posting_arrays(src_dir, term, bucket_name)
+            b, offsets = encode_posting_list_v2(doc_ids, tfs, with_offsets=True)
+            doc_lens = index.doc_lengths(doc_ids)
+            block_table.add(term, build_block_meta(doc_ids, tfs, doc_lens, offsets))
+            # The reader joins base_dir with the stored name, keep file names only
+            posting_locs[term] = [
+                (Path(f_name).name, offset) for f_name, offset in writer.write(b)
+            ]
+            posting_sizes[term] = len(b)
+            bytes_before += index.posting_nbytes(term)
+            if (i + 1) % 100000 == 0:
+                print(f"  {i + 1} terms converted")
+    finally:
+        writer.close()
+
+    index.posting_locs = posting_locs
+    index.posting_sizes = posting_sizes
+    index.posting_format = POSTINGS_V2
+    index.block_table = block_table
+    index.write_index(dst_dir, name, bucket_name)
+
+    bytes_after = sum(posting_sizes.values())
+    print(
+        f"Done. Posting bytes: {bytes_before:,} -> {bytes_after:,} "
+        f"({bytes_after / max(bytes_before, 1):.1%})"
+    )
+    return bytes_before, bytes_after
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert a v1 posting index to the compressed v2 format"
+    )
+    parser.add_argument("--src", type=str, default="data/postings_gcp", help="Source index directory")
+    parser.add_argument("--dst", type=str, default="data/postings_gcp_v2", help="Destination directory")
+    parser.add_argument("--name", type=str, default="index", help="Index name")
+    parser.add_argument("--bucket", type=str, default=None, help="GCS bucket (source and destination)")
+    args = parser.parse_args()
+
+    convert_index_to_v2(args.src, args.dst, args.name, args.bucket)
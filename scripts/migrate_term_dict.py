@@ -0,0 +1,140 @@
+import sys
+import os
+import time
+import shutil
+import random
+import argparse
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root))
+
+from config import Config
+from inverted_index_gcp import InvertedIndex, TermDictionary, get_bucket
+
+
+def _check_term_dict(index, term_dict, inline, n_samples=10000, seed=0):
+    """
+    Compares the dictionary with the index mappings: every column in term
+    order, inline postings against `inline`, and binary-search lookups for a
+    sample of terms.
+
+    Returns:
+        bool: True if everything matches.
+    """
+    terms = sorted(set(index.df) | set(index.posting_locs), key=lambda t: t.encode("utf-8"))
+    posting_sizes = getattr(index, "posting_sizes", {})
+    if list(term_dict.iter_terms()) != terms:
+        print("Term lists differ")
+        return False
+    for i, term in enumerate(terms):
+        if (
+            term_dict.df[i] != index.df.get(term, 0)
+            or term_dict.term_total[i] != index.term_total.get(term, 0)
+            or term_dict.posting_sizes[i] != posting_sizes.get(term, 0)
+            or term_dict.locations(i) != ([] if term in inline else list(index.posting_locs.get(term, [])))
+            or term_dict.inline_postings(i) != inline.get(term)
+        ):
+            print(f"Mismatch for term {term!r}")
+            return False
+    rng = random.Random(seed)
+    for term in rng.sample(terms, min(n_samples, len(terms))):
+        if terms[term_dict.term_id(term)] != term:
+            print(f"Lookup of {term!r} failed")
+            return False
+    for missing in ("", terms[-1] + "\x00" if terms else "x", terms[0][:-1] + "\x00" if terms else "y"):
+        if missing not in index.df and term_dict.term_id(missing) != -1:
+            print(f"Lookup of missing term {missing!r} succeeded")
+            return False
+    return True
+
+
+def migrate_term_dict(index_dir, name="index", bucket_name=None, keep_backup=True,
+                      inline_max_bytes=None):
+    """
+    Moves df, term_total, posting_locs and posting_sizes of an index out of
+    the pickle into a memory-mapped `name`.termdict, then rewrites `name`.pkl
+    without them. The old pickle is kept as `name`.pkl.legacy. Posting lists
+    of up to `inline_max_bytes` are embedded in the dictionary. Running it on
+    an index that already has a dictionary rebuilds the dictionary only, e.g.
+    for a new inline cutoff.
+
+    Args:
+        index_dir (str): Directory (or bucket prefix) of the index.
+        name (str): Index name (`name`.pkl).
+        bucket_name (str): GCS bucket, None for local.
+        keep_backup (bool): Keep a copy of the old pickle.
+        inline_max_bytes (int): Inline size cutoff, defaults to
+                                Config.INLINE_POSTINGS_MAX_BYTES (0 disables it).
+
+    Returns:
+        bool: True if the dictionary was written.
+    """
+    if inline_max_bytes is None:
+        inline_max_bytes = Config.INLINE_POSTINGS_MAX_BYTES
+    start = time.perf_counter()
+    index = InvertedIndex.read_index(index_dir, name, bucket_name)
+    legacy_load = time.perf_counter() - start
+    migrated = getattr(index, "_term_dict", None) is not None
+    if migrated:
+        print(f"{index_dir}/{name} already uses a term dictionary, rebuilding it.")
+
+    print(f"Building term dictionary for {len(index.df)} terms...")
+    inline = index.collect_inline_postings(index_dir, bucket_name, inline_max_bytes)
+    # Indexes written before the v2 format have no posting_sizes
+    term_dict = TermDictionary.build(
+        index.df, index.term_total, index.posting_locs, getattr(index, "posting_sizes", None),
+        inline, inline_max_bytes,
+    )
+    if not _check_term_dict(index, term_dict, inline):
+        print("Term dictionary check failed, index left unchanged.")
+        return False
+    stats = term_dict.inline_stats()
+    print(
+        f"Inline postings (<= {inline_max_bytes} bytes): {stats['terms']:,} of "
+        f"{len(term_dict):,} terms, {stats['bytes']:,} bytes"
+    )
+
+    pkl = f"{name}.pkl"
+    if migrated:
+        term_dict.save(index_dir, name, bucket_name)
+        return True
+    if keep_backup:
+        if bucket_name is None:
+            shutil.copy2(Path(index_dir) / pkl, Path(index_dir) / f"{pkl}.legacy")
+        else:
+            bucket = get_bucket(bucket_name)
+            bucket.copy_blob(bucket.blob(f"{index_dir}/{pkl}"), bucket, f"{index_dir}/{pkl}.legacy")
+
+    term_dict.save(index_dir, name, bucket_name)
+    index.use_term_dict(term_dict)
+    index._write_globals(index_dir, name, bucket_name)
+
+    start = time.perf_counter()
+    InvertedIndex.read_index(index_dir, name, bucket_name)
+    new_load = time.perf_counter() - start
+    print(f"Load time: {legacy_load:.2f}s -> {new_load:.2f}s")
+    if bucket_name is None:
+        dict_size = os.path.getsize(Path(index_dir) / f"{name}.termdict")
+        print(f"{pkl}: {os.path.getsize(Path(index_dir) / pkl):,} bytes, "
+              f"{name}.termdict: {dict_size:,} bytes")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Move the term statistics and posting locations of an index into a memory-mapped term dictionary"
+    )
+    parser.add_argument("--index_dir", type=str, default="data/postings_gcp", help="Index directory")
+    parser.add_argument("--name", type=str, default="index", help="Index name")
+    parser.add_argument("--bucket", type=str, default=None, help="GCS bucket, local if omitted")
+    parser.add_argument("--no_backup", action="store_true", help="Do not keep `name`.pkl.legacy")
+    parser.add_argument(
+        "--inline_max_bytes", type=int, default=None,
+        help="Embed posting lists up to this size (default Config.INLINE_POSTINGS_MAX_BYTES, 0 to disable)",
+    )
+    args = parser.parse_args()
+
+    migrate_term_dict(args.index_dir, args.name, args.bucket, not args.no_backup, args.inline_max_bytes)
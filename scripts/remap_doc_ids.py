@@ -0,0 +1,140 @@
+import sys
+import argparse
+from collections import Counter, defaultdict
+from pathlib import Path
+import numpy as np
+
+# Add project root to path
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root))
+
+from inverted_index_gcp import (
+    InvertedIndex,
+    MultiFileWriter,
+    BlockMaxTable,
+    ImpactOrderedTable,
+    DocStore,
+    POSTINGS_V2,
+    build_block_meta,
+    encode_posting_list,
+    encode_posting_list_v2,
+)
+from Backend.data_Loader import load_pagerank, load_pageviews
+
+
+def _indexed_wiki_ids(index, src_dir, bucket_name):
+    """
+    Wiki ids of all indexed documents: the DL keys, or every doc_id found in
+    the posting lists when the index has no DL.
+    """
+    if hasattr(index, "DL"):
+        return index.DL.keys()
+    print("Index has no DL, collecting doc ids from the posting lists...")
+    wiki_ids = set()
+    for term in index.posting_locs:
+        doc_ids, _ = index.read_a_posting_arrays(src_dir, term, bucket_name)
+        wiki_ids.update(doc_ids.tolist())
+    return wiki_ids
+
+
+def remap_doc_ids(src_dir, dst_dir, name="index", bucket_name=None):
+    """
+    Rewrites an index with dense doc ids [0, N): dense id i is the i-th
+    smallest indexed wiki id, so every posting list keeps its order. Doc
+    lengths, PageRank and pageviews are saved next to the new index as NumPy
+    arrays indexed by dense id (see DocStore), and the pickled DL is dropped.
+    The impact table is kept as is (postings keep their order); the doc ids of
+    the impact-ordered copies are remapped. A champion tier must be rebuilt
+    from the new index.
+
+    Args:
+        src_dir (str): Directory (or bucket prefix) of the index, e.g. 'data/postings_gcp'.
+        dst_dir (str): Directory (or bucket prefix) for the dense index.
+        name (str): Index name (`name`.pkl).
+        bucket_name (str): GCS bucket for both source and destination, None for local.
+
+    Returns:
+        DocStore: The per-document arrays of the new index.
+    """
+    index = InvertedIndex.read_index(src_dir, name, bucket_name)
+    if getattr(index, "dense_doc_ids", False):
+        print(f"{src_dir}/{name}.pkl already uses dense doc ids, nothing to do.")
+        return index.doc_store
+
+    if bucket_name is None:
+        Path(dst_dir).mkdir(parents=True, exist_ok=True)
+
+    pagerank = load_pagerank()
+    pageviews = load_pageviews()
+    doc_store = DocStore.build(
+        _indexed_wiki_ids(index, src_dir, bucket_name),
+        getattr(index, "DL", None), pagerank, pageviews,
+    )
+    print(
+        f"{len(doc_store):,} documents, {np.count_nonzero(doc_store.pagerank):,} with PageRank, "
+        f"{np.count_nonzero(doc_store.pageviews):,} with pageviews"
+    )
+
+    posting_locs = defaultdict(list)
+    posting_sizes = Counter()
+    block_table = BlockMaxTable()
+
+    print(f"Remapping {len(index.posting_locs)} posting lists from {src_dir} to {dst_dir}...")
+    writer = MultiFileWriter(dst_dir, "dense", bucket_name)
+    try:
+        for i, term in enumerate(sorted(index.posting_locs)):
+            doc_ids, tfs = index.read_a_posting_arrays(src_dir, term, bucket_name)
+            dense = doc_store.to_dense(doc_ids)
+            if len(dense) and dense.min() < 0:
+                raise ValueError(f"Posting list of {term!r} has documents missing from DL")
+            dense = dense.astype(np.uint32)
+            if index.version == POSTINGS_V2:
+                b, offsets = encode_posting_list_v2(dense, tfs, with_offsets=True)
+                posting_sizes[term] = len(b)
+            else:
+                b, offsets = encode_posting_list(dense, tfs), None
+            doc_lens = None if doc_store.doc_len is None else doc_store.doc_len[dense]
+            block_table.add(term, build_block_meta(dense, tfs, doc_lens, offsets))
+            # The reader joins base_dir with the stored name, keep file names only
+            posting_locs[term] = [
+                (Path(f_name).name, offset) for f_name, offset in writer.write(b)
+            ]
+            if (i + 1) % 100000 == 0:
+                print(f"  {i + 1} terms remapped")
+    finally:
+        writer.close()
+
+    order_table = getattr(index, "impact_order_table", None)
+    if order_table is not None:
+        order_table._flush()
+        index.impact_order_table = ImpactOrderedTable(
+            order_table.params,
+            doc_store.to_dense(order_table.rows).astype(np.uint32),
+            order_table.slices, order_table.impacts, order_table.segments,
+        )
+
+    index.posting_locs = posting_locs
+    if index.version == POSTINGS_V2:
+        index.posting_sizes = posting_sizes
+    index.block_table = block_table
+    index.doc_store = doc_store
+    index.dense_doc_ids = True
+    if hasattr(index, "DL"):
+        del index.DL
+    index.write_index(dst_dir, name, bucket_name)
+    print(f"Done. Dense index written to {dst_dir}")
+    return doc_store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rewrite an index with dense doc ids and per-document NumPy arrays"
+    )
+    parser.add_argument("--src", type=str, default="data/postings_gcp", help="Source index directory")
+    parser.add_argument("--dst", type=str, default="data/postings_dense", help="Destination directory")
+    parser.add_argument("--name", type=str, default="index", help="Index name")
+    parser.add_argument("--bucket", type=str, default=None, help="GCS bucket (source and destination)")
+    args = parser.parse_args()
+
+    remap_doc_ids(args.src, args.dst, args.name, args.bucket)
@@ -0,0 +1,99 @@
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root))
+
+from config import Config
+from query_engine import SearchEngine
+from Backend.snapshot import Snapshot, describe
+
+
+def _check_queries(engine, snapshot_engine, queries):
+    """
+    Runs the queries on both engines.
+
+    Returns:
+        int: Number of queries whose results differ.
+    """
+    mismatches = 0
+    for query in queries:
+        for method in ("search", "search_body"):
+            if getattr(engine, method)(query) != getattr(snapshot_engine, method)(query):
+                print(f"{method}({query!r}) differs between the sources and the snapshot")
+                mismatches += 1
+    return mismatches
+
+
+def build_snapshot(out_path, queries_path=None, max_queries=None):
+    """
+    Loads the engine from its usual sources (local files / GCS), writes the
+    snapshot, reopens it and checks that both engines answer the same.
+
+    Args:
+        out_path (str): Snapshot file.
+        queries_path (str): JSON file whose keys are queries to compare.
+        max_queries (int): Optional limit on the number of queries.
+
+    Returns:
+        bool: True if the snapshot answers every query like the sources.
+    """
+    start = time.perf_counter()
+    engine = SearchEngine()
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    size = engine.save_snapshot(out_path)
+    print(f"Wrote {out_path} ({size / 1024 ** 2:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    snapshot_engine = SearchEngine.from_snapshot(out_path)
+    open_time = time.perf_counter() - start
+    queries = ["united states history", "mount everest"]
+    if queries_path:
+        with open(queries_path, "r", encoding="utf-8") as f:
+            queries = list(json.load(f).keys())[:max_queries]
+    start = time.perf_counter()
+    snapshot_engine.search(queries[0])
+    first_query = time.perf_counter() - start
+    print(f"Load from sources {load_time:.2f}s; open snapshot {open_time:.3f}s, "
+          f"first query {first_query * 1000:.1f} ms")
+
+    mismatches = _check_queries(engine, snapshot_engine, queries)
+    print(f"{len(queries)} queries compared, {mismatches} mismatches")
+    return mismatches == 0
+
+
+def show_snapshot(path):
+    """
+    Prints the manifest and sections of a snapshot.
+
+    Args:
+        path (str): Snapshot file.
+    """
+    snapshot = Snapshot(path)
+    print(json.dumps(snapshot.manifest, indent=2))
+    for line in describe(snapshot):
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect the engine snapshot")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Load the engine from its sources and write the snapshot")
+    build.add_argument("--out", type=str, default=Config.SNAPSHOT_PATH, help="Snapshot file")
+    build.add_argument("--queries", type=str, default=None, help="Queries JSON to compare (keys are the queries)")
+    build.add_argument("--max_queries", type=int, default=None, help="Limit number of queries")
+    info = commands.add_parser("info", help="Print the manifest and sections of a snapshot")
+    info.add_argument("path", type=str, nargs="?", default=Config.SNAPSHOT_PATH, help="Snapshot file")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        ok = build_snapshot(args.out, args.queries, args.max_queries)
+        sys.exit(0 if ok else 1)
+    show_snapshot(args.path)
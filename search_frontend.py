@@ -1,5 +1,7 @@
 from flask import Flask, request, jsonify, render_template
-from query_engine import SearchEngine
+from query_engine import SearchEngine, EngineNotReady
+from config import Config
+import atexit
 import os
 
 class MyFlaskApp(Flask):
@@ -12,8 +14,38 @@ app = MyFlaskApp(__name__,
                  static_url_path='/static')
 app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
 
+def load_search_engine():
+    ''' Opens the engine snapshot when there is one (sub-second start), otherwise loads every source,
+        on background threads when Config.BACKGROUND_LOADING is set. '''
+    if os.path.exists(Config.SNAPSHOT_PATH):
+        try:
+            return SearchEngine.from_snapshot(Config.SNAPSHOT_PATH)
+        except (OSError, ValueError) as e:
+            print(f"Not using snapshot {Config.SNAPSHOT_PATH}: {e}")
+    return SearchEngine(background=Config.BACKGROUND_LOADING)
+
 # Initialize Search Engine
-search_engine = SearchEngine()
+search_engine = load_search_engine()
+atexit.register(search_engine.close)
+
+@app.errorhandler(EngineNotReady)
+def engine_not_ready(e):
+    ''' A request needs a component that is still loading (or failed): 503, try again later. '''
+    response = jsonify({"error": str(e), "component": e.component, "state": e.state})
+    response.status_code = 503
+    response.headers["Retry-After"] = "5"
+    return response
+
+@app.route("/healthz")
+def healthz():
+    ''' Liveness: the process is up and answering, whether or not the engine has loaded. '''
+    return jsonify({"status": "alive", "components": search_engine.status()["components"]})
+
+@app.route("/readyz")
+def readyz():
+    ''' Readiness: 200 once queries can be served (possibly degraded), 503 while the index loads or if it failed. '''
+    status = search_engine.status()
+    return jsonify(status), (200 if status["ready"] else 503)
 
 @app.route("/")
 def home():
@@ -29,6 +61,21 @@ def search():
     res = search_engine.search(query)
     return jsonify(res)
 
+@app.route("/search_batch", methods=['POST'])
+def search_batch():
+    ''' Returns the search results of every query in a JSON list of queries, in order.
+        Each distinct term's postings are read once for the whole batch. '''
+    res = []
+    queries = request.get_json()
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+      return jsonify({"error": "Expected a JSON list of query strings"}), 400
+    if len(queries) == 0:
+      return jsonify(res)
+    if len(queries) > Config.SEARCH_BATCH_MAX_QUERIES:
+      return jsonify({"error": f"At most {Config.SEARCH_BATCH_MAX_QUERIES} queries per batch"}), 400
+    res = search_engine.search_many(queries)
+    return jsonify(res)
+
 @app.route("/search_body")
 def search_body():
     ''' Returns up to a 100 search results for the query using TFIDF AND COSINE SIMILARITY OF THE BODY. '''
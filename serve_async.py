@@ -0,0 +1,408 @@
+import io
+import os
+import sys
+import json
+import signal
+import asyncio
+import argparse
+import functools
+import traceback
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from query_engine import EngineNotReady
+
+
+def _json_body(payload):
+    # Same encoding as Flask's jsonify outside debug mode
+    return (json.dumps(payload, separators=(",", ":"), sort_keys=True) + "\n").encode()
+
+
+class AsyncSearchApp:
+    """
+    ASGI application serving the routes of search_frontend.py from one event
+    loop. Searches await their posting reads (see SearchEngine.search_async),
+    so a query waiting on GCS or disk holds no thread and the reads of many
+    requests overlap; decoding and scoring run on a bounded CPU pool. Paths
+    without an async route (the home page, static files) are passed to the
+    Flask app on that pool.
+
+    Attributes:
+        engine (SearchEngine): The engine, possibly still loading.
+        executor (ThreadPoolExecutor): Runs the CPU work of the requests.
+    """
+
+    def __init__(self, engine, wsgi_app=None, cpu_workers=None):
+        """
+        Args:
+            engine (SearchEngine): The engine.
+            wsgi_app (callable): WSGI app for the other paths, or None (404).
+            cpu_workers (int): Threads of the CPU pool, defaults to
+                               Config.ASYNC_CPU_WORKERS (0 = one per CPU).
+        """
+        self.engine = engine
+        self.wsgi_app = wsgi_app
+        cpu_workers = Config.ASYNC_CPU_WORKERS if cpu_workers is None else cpu_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=cpu_workers or os.cpu_count() or 1, thread_name_prefix="async-cpu"
+        )
+        self.routes = {
+            "/search": ("GET", self._search),
+            "/search_body": ("GET", self._search_body),
+            "/search_batch": ("POST", self._search_batch),
+            "/search_title": ("GET", self._search_title),
+            "/search_anchor": ("GET", self._search_anchor),
+            "/get_pagerank": ("POST", self._get_pagerank),
+            "/get_pageview": ("POST", self._get_pageview),
+            "/healthz": ("GET", self._healthz),
+            "/readyz": ("GET", self._readyz),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        body = await self._read_body(receive)
+        if body is None:
+            await self._respond(send, 413, {"error": "Payload Too Large"})
+            return
+        route = self.routes.get(scope["path"])
+        if route is None:
+            if self.wsgi_app is None:
+                await self._respond(send, 404, {"error": "Not Found"})
+                return
+            loop = asyncio.get_running_loop()
+            try:
+                status, headers, content = await loop.run_in_executor(
+                    self.executor, self._call_wsgi, scope, body
+                )
+            except Exception:
+                traceback.print_exc()
+                await self._respond(send, 500, {"error": "Internal Server Error"})
+                return
+            await self._send(send, status, headers, content)
+            return
+
+        method, handler = route
+        if scope["method"] != method and not (method == "GET" and scope["method"] == "HEAD"):
+            await self._respond(send, 405, {"error": "Method Not Allowed"}, [(b"allow", method.encode())])
+            return
+        headers = []
+        try:
+            payload, status = await handler(scope, body)
+        except EngineNotReady as e:
+            payload = {"error": str(e), "component": e.component, "state": e.state}
+            status = 503
+            headers.append((b"retry-after", b"5"))
+        except Exception:
+            traceback.print_exc()
+            payload, status = {"error": "Internal Server Error"}, 500
+        await self._respond(send, status, payload, headers)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_body(self, receive):
+        """
+        Reads the request body, or returns None once it exceeds
+        Config.ASYNC_MAX_BODY_BYTES.
+        """
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > Config.ASYNC_MAX_BODY_BYTES:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    async def _respond(self, send, status, payload, headers=()):
+        await self._send(send, status, [(b"content-type", b"application/json"), *headers], _json_body(payload))
+
+    async def _send(self, send, status, headers, content):
+        headers = [*headers, (b"content-length", str(len(content)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": content})
+
+    def _query(self, scope):
+        return parse_qs(scope["query_string"].decode("latin-1")).get("query", [""])[0]
+
+    async def _search(self, scope, body):
+        query = self._query(scope)
+        if len(query) == 0:
+            return [], 200
+        return await self.engine.search_async(query, executor=self.executor), 200
+
+    async def _search_body(self, scope, body):
+        query = self._query(scope)
+        if len(query) == 0:
+            return [], 200
+        return await self.engine.search_body_async(query, executor=self.executor), 200
+
+    async def _search_batch(self, scope, body):
+        try:
+            queries = json.loads(body)
+        except ValueError:
+            return {"error": "Bad Request: the body is not JSON"}, 400
+        if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+            return {"error": "Expected a JSON list of query strings"}, 400
+        if len(queries) == 0:
+            return [], 200
+        if len(queries) > Config.SEARCH_BATCH_MAX_QUERIES:
+            return {"error": f"At most {Config.SEARCH_BATCH_MAX_QUERIES} queries per batch"}, 400
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.engine.search_many, queries), 200
+
+    async def _search_title(self, scope, body):
+        query = self._query(scope)
+        return (self.engine.search_title(query) if query else []), 200
+
+    async def _search_anchor(self, scope, body):
+        query = self._query(scope)
+        return (self.engine.search_anchor(query) if query else []), 200
+
+    async def _doc_values(self, body, lookup):
+        try:
+            wiki_ids = json.loads(body) if body else None
+        except ValueError:
+            return {"error": "Bad Request: the body is not JSON"}, 400
+        if not wiki_ids or len(wiki_ids) == 0:
+            return [], 200
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lookup, wiki_ids), 200
+
+    async def _get_pagerank(self, scope, body):
+        return await self._doc_values(body, self.engine.get_pagerank)
+
+    async def _get_pageview(self, scope, body):
+        return await self._doc_values(body, self.engine.get_pageviews)
+
+    async def _healthz(self, scope, body):
+        return {"status": "alive", "components": self.engine.status()["components"]}, 200
+
+    async def _readyz(self, scope, body):
+        status = self.engine.status()
+        return status, (200 if status["ready"] else 503)
+
+    def _call_wsgi(self, scope, body):
+        """
+        Runs one request through the WSGI app.
+
+        Returns:
+            tuple: (status, headers, body) of the response.
+        """
+        host, port = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": "",
+            "PATH_INFO": scope["path"],
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": host,
+            "SERVER_PORT": str(port),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope["headers"]:
+            name = name.decode("latin-1").upper().replace("-", "_")
+            if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                name = "HTTP_" + name
+            environ[name] = value.decode("latin-1")
+
+        response = []
+
+        def start_response(status, headers, exc_info=None):
+            response[:] = [status, headers]
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            content = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        status, headers = response
+        headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers if name.lower() != "content-length"
+        ]
+        return int(status.split()[0]), headers, content
+
+
+async def _handle_connection(app, reader, writer):
+    """
+    Minimal HTTP/1.1 server side of one connection: reads requests (with
+    keep-alive), runs them through the ASGI app and writes the responses.
+    """
+    server = writer.get_extra_info("sockname")
+    client = writer.get_extra_info("peername")
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+            lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, target, version = lines[0].split(" ", 2)
+                headers = []
+                for line in lines[1:]:
+                    if line:
+                        name, _, value = line.partition(":")
+                        headers.append((name.strip().lower().encode("latin-1"),
+                                        value.strip().encode("latin-1")))
+                fields = dict(headers)
+                length = int(fields.get(b"content-length", b"0"))
+                if length < 0:
+                    raise ValueError(length)
+            except ValueError:
+                writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                break
+            if length > Config.ASYNC_MAX_BODY_BYTES:
+                writer.write(b"HTTP/1.1 413 Payload Too Large\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                break
+            try:
+                body = await reader.readexactly(length) if length else b""
+            except asyncio.IncompleteReadError:
+                break
+            connection = fields.get(b"connection", b"").lower()
+            keep_alive = connection == b"keep-alive" or (version == "HTTP/1.1" and connection != b"close")
+
+            path, _, query = target.partition("?")
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": version[5:],
+                "method": method,
+                "scheme": "http",
+                "path": unquote(path),
+                "raw_path": path.encode("latin-1"),
+                "query_string": query.encode("latin-1"),
+                "root_path": "",
+                "headers": headers,
+                "server": server[:2] if server else None,
+                "client": client[:2] if client else None,
+            }
+            messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                return {"type": "http.disconnect"}
+
+            response = {"status": 500, "headers": []}
+            chunks = []
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    response.update(message)
+                elif message["type"] == "http.response.body":
+                    chunks.append(message.get("body", b""))
+
+            await app(scope, receive, send)
+            content = b"".join(chunks)
+            status = response["status"]
+            out = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n".encode("latin-1")]
+            for name, value in response["headers"]:
+                if name.lower() not in (b"content-length", b"connection"):
+                    out.append(name + b": " + value + b"\r\n")
+            out.append(f"Content-Length: {len(content)}\r\n".encode("latin-1"))
+            out.append(b"Connection: keep-alive\r\n\r\n" if keep_alive else b"Connection: close\r\n\r\n")
+            writer.write(b"".join(out) + (b"" if method == "HEAD" else content))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def serve(app, host, port, backlog=None):
+    """
+    Serves an ASGI app with the built-in asyncio HTTP server until SIGTERM
+    or SIGINT.
+
+    Args:
+        app (callable): The ASGI application.
+        host (str): Interface to listen on.
+        port (int): Port to listen on.
+        backlog (int): Listen backlog, defaults to Config.PREFORK_BACKLOG.
+    """
+    backlog = Config.PREFORK_BACKLOG if backlog is None else backlog
+
+    async def _main():
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        server = await asyncio.start_server(
+            functools.partial(_handle_connection, app), host, port, backlog=backlog, reuse_address=True
+        )
+        print(f"Serving on http://{host}:{port} (asyncio)")
+        async with server:
+            await stop.wait()
+        print("Server stopped.")
+
+    asyncio.run(_main())
+    app.executor.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve the search routes from an asyncio event loop with awaitable posting reads"
+    )
+    parser.add_argument("--host", type=str, default="0.0.0.0", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument(
+        "--server", choices=("auto", "uvicorn", "asyncio"), default="auto",
+        help="HTTP server: uvicorn when installed (auto), or the built-in asyncio one",
+    )
+    parser.add_argument(
+        "--cpu_workers", type=int, default=Config.ASYNC_CPU_WORKERS,
+        help="Threads scoring queries (0 = one per CPU)",
+    )
+    parser.add_argument("--backlog", type=int, default=Config.PREFORK_BACKLOG, help="Listen backlog")
+    args = parser.parse_args()
+
+    uvicorn = None
+    if args.server != "asyncio":
+        try:
+            import uvicorn
+        except ImportError:
+            if args.server == "uvicorn":
+                raise
+            print("uvicorn is not installed, using the built-in asyncio server.")
+
+    from search_frontend import app as flask_app, search_engine
+
+    app = AsyncSearchApp(search_engine, flask_app, args.cpu_workers)
+    if uvicorn is not None:
+        uvicorn.run(app, host=args.host, port=args.port, backlog=args.backlog, log_level="warning")
+    else:
+        serve(app, args.host, args.port, args.backlog)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from config import Config
+
+_STOPPING = False
+
+
+def _stop(signum, frame):
+    global _STOPPING
+    _STOPPING = True
+
+
+class _OneRequestHandler(WSGIRequestHandler):
+    # One request per connection: an idle kept-alive connection would hold
+    # one of the few request threads of a worker
+    protocol_version = "HTTP/1.0"
+
+
+class PreforkWSGIServer(BaseWSGIServer):
+    """
+    WSGI server of one forked worker, on the listening socket shared by all
+    workers. A connection is accepted only while one of the worker's request
+    threads is free, so waiting connections stay in the kernel backlog where
+    any idle worker can take them.
+
+    Attributes:
+        requests_started (int): Requests accepted by this worker.
+    """
+
+    def __init__(self, host, port, app, fd, threads):
+        """
+        Args:
+            host (str): Host the socket is bound to.
+            port (int): Port the socket is bound to.
+            app (callable): The WSGI application.
+            fd (int): Descriptor of the shared listening socket.
+            threads (int): Requests handled concurrently.
+        """
+        super().__init__(host, port, app, handler=_OneRequestHandler, fd=fd)
+        self.multithread = threads > 1
+        self.multiprocess = True
+        # handle_request() returns at least this often to check for shutdown
+        self.timeout = 0.5
+        self.requests_started = 0
+        self._slots = threading.BoundedSemaphore(threads)
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="request")
+
+    def get_request(self):
+        self._slots.acquire()
+        try:
+            return super().get_request()
+        except BaseException:
+            # Another worker took the connection first
+            self._slots.release()
+            raise
+
+    def process_request(self, request, client_address):
+        self.requests_started += 1
+        self._pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def close(self):
+        """
+        Waits for the requests in flight, then closes the socket.
+        """
+        self._pool.shutdown(wait=True)
+        self.server_close()
+
+
+def _run_worker(sock, app, host, port, threads, max_requests):
+    """
+    Serves requests in a forked worker until it is told to stop or has
+    accepted `max_requests` requests.
+    """
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    # Objects inherited from the parent stay frozen, so collections in the
+    # worker do not write to (and un-share) their pages
+    gc.enable()
+    server = PreforkWSGIServer(host, port, app, sock.fileno(), threads)
+    sock.close()
+    print(f"Worker {os.getpid()} ready")
+    while not _STOPPING and not (max_requests and server.requests_started >= max_requests):
+        server.handle_request()
+    server.close()
+    print(f"Worker {os.getpid()} exiting after {server.requests_started} requests")
+
+
+def _fork_worker(sock, app, host, port, threads, max_requests):
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+        return pid
+    code = 0
+    try:
+        _run_worker(sock, app, host, port, threads, max_requests)
+    except BaseException as e:
+        print(f"Worker {os.getpid()} failed: {e!r}")
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def serve(app, host, port, workers, threads, backlog, max_requests):
+    """
+    Binds the listening socket, freezes the heap of the loaded application
+    and forks `workers` processes that share it copy-on-write. Replaces
+    workers that exit until SIGTERM/SIGINT, which stops all of them after
+    their requests in flight.
+
+    Args:
+        app (callable): The loaded WSGI application.
+        host (str): Interface to bind.
+        port (int): Port to bind.
+        workers (int): Worker processes.
+        threads (int): Concurrent requests per worker.
+        backlog (int): Listen backlog of the shared socket.
+        max_requests (int): Requests after which a worker is replaced (0 = never).
+    """
+    sock = socket.create_server((host, port), backlog=backlog)
+    # Every worker waits on the socket; the ones that lose the race for a
+    # connection get an error from accept() instead of blocking
+    sock.setblocking(False)
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    gc.freeze()
+
+    children = {}
+
+    def _spawn():
+        pid = _fork_worker(sock, app, host, port, threads, max_requests)
+        children[pid] = time.monotonic()
+
+    print(f"Serving on {host}:{port} with {workers} workers x {threads} threads")
+    for _ in range(workers):
+        _spawn()
+    stop_sent = False
+    # Polls instead of blocking in waitpid, which resumes after the signal
+    # handler returns and would not notice the stop request
+    while children:
+        if _STOPPING and not stop_sent:
+            for pid in children:
+                os.kill(pid, signal.SIGTERM)
+            stop_sent = True
+        try:
+            pid, status = os.waitpid(-1, 0 if stop_sent else os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+        started = children.pop(pid, None)
+        if started is None or _STOPPING:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        if code != 0:
+            print(f"Worker {pid} exited with {code}, replacing it")
+            if time.monotonic() - started < 1:
+                # Do not fork in a tight loop when workers fail on start
+                time.sleep(1)
+        _spawn()
+    sock.close()
+    print("Server stopped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve the search frontend from forked workers sharing one loaded engine"
+    )
+    parser.add_argument("--host", type=str, default="0.0.0.0", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8080, help="Port to bind")
+    parser.add_argument(
+        "--workers", type=int, default=Config.PREFORK_WORKERS, help="Worker processes (0 = one per CPU)"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=Config.PREFORK_THREADS, help="Concurrent requests per worker"
+    )
+    parser.add_argument("--backlog", type=int, default=Config.PREFORK_BACKLOG, help="Listen backlog")
+    parser.add_argument(
+        "--max_requests", type=int, default=Config.PREFORK_MAX_REQUESTS,
+        help="Requests after which a worker is replaced (0 = never)",
+    )
+    args = parser.parse_args()
+
+    # No collections while loading: objects freed by them would leave holes
+    # in shared pages that the workers later fill, copying those pages
+    gc.disable()
+    from search_frontend import app, search_engine
+
+    # Workers only share what is loaded before the fork: components still
+    # loading on background threads would never reach them
+    search_engine.wait_until_loaded()
+
+    serve(
+        app, args.host, args.port, args.workers or os.cpu_count() or 1,
+        max(args.threads, 1), args.backlog, args.max_requests,
+    )
+
+
+if __name__ == "__main__":
+    main()